@@ -0,0 +1,41 @@
+"""
+Cursor keyset pagination yang dipakai bersama endpoint daftar tiket, jadwal
+dan review.
+
+Cursor adalah base64url dari nilai kolom urutan baris terakhir, dipisah '|':
+
+    encode_cursor(date(2025, 5, 1), time(8, 0), 42)  ->  base64("2025-05-01|08:00:00|42")
+
+Nilai date/time/datetime ditulis dengan isoformat(). Saat decode setiap bagian
+dilewatkan ke parser-nya (mis. int, date.fromisoformat, aware_datetime); cursor
+rusak apa pun menjadi ValueError supaya view cukup membalas 400.
+"""
+import base64
+import binascii
+from datetime import datetime
+
+SEPARATOR = '|'
+
+
+def aware_datetime(value):
+    """Parser datetime yang menolak nilai tanpa zona waktu (USE_TZ=True)."""
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        raise ValueError('Cursor tidak valid.')
+    return parsed
+
+
+def encode_cursor(*values):
+    raw = SEPARATOR.join(v.isoformat() if hasattr(v, 'isoformat') else str(v) for v in values)
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor, *parsers):
+    """Return tuple nilai cursor sesuai `parsers`; ValueError jika rusak."""
+    try:
+        parts = base64.urlsafe_b64decode(cursor.encode()).decode().split(SEPARATOR)
+        if len(parts) != len(parsers):
+            raise ValueError
+        return tuple(parse(part) for parse, part in zip(parsers, parts))
+    except (ValueError, TypeError, UnicodeError, binascii.Error):
+        raise ValueError('Cursor tidak valid.')
@@ -0,0 +1,409 @@
+"""
+Proxy gambar eksternal (banner jadwal, foto merchandise) dengan cache disk.
+
+Setiap URL disimpan sekali di disk, dengan nama file = sha256 dari URL:
+
+    <IMAGE_PROXY_ROOT>/<2 huruf pertama>/<digest>.body   isi gambar
+    <IMAGE_PROXY_ROOT>/<2 huruf pertama>/<digest>.json   metadata (content type,
+                                                         ETag/Last-Modified upstream,
+                                                         waktu fetch, sha256 isi)
+
+Alur per request:
+
+- entry masih segar (< IMAGE_PROXY_FRESH_SECONDS) -> dikirim langsung dari disk
+- entry basi -> GET kondisional (If-None-Match / If-Modified-Since) ke upstream;
+  304 cukup memperbarui waktu fetch, kalau upstream error entry lama tetap dipakai
+- belum ada -> body upstream di-stream ke client sambil ditulis ke file sementara,
+  lalu di-rename setelah lengkap
+
+Ukuran total cache dibatasi IMAGE_PROXY_CACHE_BYTES; entry yang paling lama tidak
+dipakai (mtime file body, diperbarui saat hit) dihapus lebih dulu. Direktori cache
+hanya di-scan kalau perkiraan ukuran per proses melewati batas atau setiap
+EVICT_RESCAN_SECONDS (menangkap tulisan worker lain), bukan di setiap miss.
+
+Koneksi ke upstream memakai satu `requests.Session` dengan connection pool. Host
+di-resolve sekali, alamatnya dicek (bukan privat/loopback), lalu koneksi dibuat ke
+IP itu juga; nama host asli tetap dipakai untuk header Host, SNI dan verifikasi
+sertifikat, jadi jawaban DNS kedua yang berbeda (DNS rebinding) tidak dipakai.
+"""
+import hashlib
+import ipaddress
+import json
+import logging
+import os
+import socket
+import tempfile
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urljoin, urlsplit, urlunsplit
+
+import requests
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+MAX_REDIRECTS = 3
+# Jangan perbarui mtime (penanda LRU) di setiap hit, cukup sesekali
+TOUCH_INTERVAL = 300
+# File .part yang tertinggal (proses mati di tengah download) dibersihkan setelah ini
+STALE_PART_SECONDS = 3600
+# Perkiraan ukuran cache per proses di-scan ulang paling lambat setelah ini
+EVICT_RESCAN_SECONDS = 300
+# SVG sengaja tidak diizinkan: bisa berisi script dan dilayani dari origin kita
+ALLOWED_CONTENT_TYPES = frozenset({
+    'image/jpeg', 'image/jpg', 'image/png', 'image/gif',
+    'image/webp', 'image/avif', 'image/bmp', 'image/x-icon',
+})
+
+
+class ProxyError(Exception):
+    def __init__(self, message, status=502):
+        super().__init__(message)
+        self.status = status
+
+
+def cache_root():
+    return Path(getattr(settings, 'IMAGE_PROXY_ROOT', Path(settings.MEDIA_ROOT) / 'image-proxy'))
+
+
+def max_bytes():
+    return getattr(settings, 'IMAGE_PROXY_MAX_BYTES', 5 * 1024 * 1024)
+
+
+def cache_limit_bytes():
+    return getattr(settings, 'IMAGE_PROXY_CACHE_BYTES', 512 * 1024 * 1024)
+
+
+def fresh_seconds():
+    return getattr(settings, 'IMAGE_PROXY_FRESH_SECONDS', 6 * 3600)
+
+
+def browser_max_age():
+    return getattr(settings, 'IMAGE_PROXY_MAX_AGE', 7 * 24 * 3600)
+
+
+class _PinnedHostAdapter(HTTPAdapter):
+    """
+    URL yang dikirim sudah memakai IP hasil `_resolve`; TLS (SNI dan pencocokan
+    sertifikat) tetap memakai nama host dari header Host.
+    """
+
+    def build_connection_pool_key_attributes(self, request, verify, cert=None):
+        host_params, pool_kwargs = super().build_connection_pool_key_attributes(request, verify, cert)
+        if host_params['scheme'] == 'https' and 'Host' in request.headers:
+            hostname = urlsplit('//' + request.headers['Host']).hostname
+            pool_kwargs['server_hostname'] = hostname
+            pool_kwargs['assert_hostname'] = hostname
+        return host_params, pool_kwargs
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Session bersama; koneksi keep-alive ke host yang sama dipakai ulang antar request."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = _PinnedHostAdapter(pool_connections=16, pool_maxsize=32)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                _session = session
+    return _session
+
+
+def _entry_paths(url):
+    digest = hashlib.sha256(url.encode()).hexdigest()
+    directory = cache_root() / digest[:2]
+    return directory / f'{digest}.body', directory / f'{digest}.json'
+
+
+def _validate_url(url):
+    parts = urlsplit(url)
+    if parts.scheme not in ('http', 'https') or not parts.hostname:
+        raise ProxyError('URL gambar tidak valid.', status=400)
+    return parts
+
+
+def _resolve(parts):
+    """
+    Alamat IP tujuan koneksi untuk `parts`. Tolak host yang resolve ke alamat
+    privat/loopback (mencegah SSRF ke jaringan internal).
+    """
+    try:
+        port = parts.port or (443 if parts.scheme == 'https' else 80)
+        infos = socket.getaddrinfo(parts.hostname, port, type=socket.SOCK_STREAM)
+    except (ValueError, socket.gaierror):
+        raise ProxyError('Host gambar tidak dapat di-resolve.', status=502)
+    addresses = [ipaddress.ip_address(info[4][0].split('%')[0]) for info in infos]
+    if not getattr(settings, 'IMAGE_PROXY_ALLOW_PRIVATE', False):
+        if not addresses or any(not address.is_global for address in addresses):
+            raise ProxyError('Host gambar tidak diizinkan.', status=400)
+    return addresses[0]
+
+
+def _pin(parts, address):
+    """Return (URL dengan host diganti `address`, nilai header Host asli)."""
+    def netloc(host):
+        host = f'[{host}]' if ':' in host else host
+        return f'{host}:{parts.port}' if parts.port else host
+
+    return urlunsplit(parts._replace(netloc=netloc(str(address)))), netloc(parts.hostname)
+
+
+def _fetch(url, headers):
+    """GET streaming ke upstream; redirect diikuti manual supaya tiap hop ikut dicek."""
+    session = get_session()
+    timeout = getattr(settings, 'IMAGE_PROXY_TIMEOUT', (3.05, 10))
+    for _ in range(MAX_REDIRECTS + 1):
+        parts = _validate_url(url)
+        pinned_url, host = _pin(parts, _resolve(parts))
+        upstream = session.get(pinned_url, headers=dict(headers, Host=host), stream=True,
+                               timeout=timeout, allow_redirects=False)
+        if not upstream.is_redirect:
+            return upstream
+        upstream.close()
+        url = urljoin(url, upstream.headers['Location'])
+    raise ProxyError('Terlalu banyak redirect.', status=502)
+
+
+def _load_entry(url):
+    """Return (meta, file body terbuka) atau (None, None) kalau belum/tidak lagi di cache."""
+    body_path, meta_path = _entry_paths(url)
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+        body = open(body_path, 'rb')
+    except (OSError, ValueError):
+        return None, None
+    if meta.get('url') != url:
+        body.close()
+        return None, None
+    return meta, body
+
+
+def _write_meta(meta_path, meta):
+    fd, tmp_name = tempfile.mkstemp(dir=meta_path.parent, suffix='.tmp')
+    with os.fdopen(fd, 'w') as tmp:
+        json.dump(meta, tmp)
+    os.replace(tmp_name, meta_path)
+
+
+def _touch(body_path):
+    try:
+        if time.time() - body_path.stat().st_mtime > TOUCH_INTERVAL:
+            os.utime(body_path)
+    except OSError:
+        pass
+
+
+# root cache -> [perkiraan total bytes, waktu scan terakhir], per proses
+_usage = {}
+_usage_lock = threading.Lock()
+
+
+def _record_stored(size):
+    """Tambahkan `size` ke perkiraan ukuran cache; scan + evict hanya jika perlu."""
+    root = str(cache_root())
+    with _usage_lock:
+        usage = _usage.get(root)
+        if usage is not None:
+            usage[0] += size
+        due = (usage is None or usage[0] > cache_limit_bytes()
+               or time.time() - usage[1] > EVICT_RESCAN_SECONDS)
+    if due:
+        evict()
+
+
+def evict(limit=None):
+    """
+    Hapus entry paling lama tidak dipakai sampai total ukuran <= 90% `limit`.
+    Return jumlah entry yang dihapus.
+    """
+    limit = cache_limit_bytes() if limit is None else limit
+    root = cache_root()
+    if not root.is_dir():
+        return 0
+
+    now = time.time()
+    entries = []
+    total = 0
+    for directory in os.scandir(root):
+        if not directory.is_dir():
+            continue
+        for item in os.scandir(directory.path):
+            try:
+                stat = item.stat()
+            except FileNotFoundError:
+                continue
+            if item.name.endswith('.body'):
+                entries.append((stat.st_mtime, stat.st_size, item.path))
+                total += stat.st_size
+            elif item.name.endswith(('.part', '.tmp')) and now - stat.st_mtime > STALE_PART_SECONDS:
+                _unlink(item.path)
+
+    removed = 0
+    if total > limit:
+        target = limit * 0.9
+        for _mtime, size, path in sorted(entries):
+            if total <= target:
+                break
+            _unlink(path)
+            _unlink(path[:-len('.body')] + '.json')
+            total -= size
+            removed += 1
+    with _usage_lock:
+        _usage[str(root)] = [total, now]
+    return removed
+
+
+def _unlink(path):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+def _apply_cache_headers(response, meta):
+    patch_cache_control(response, public=True, max_age=browser_max_age())
+    response['X-Content-Type-Options'] = 'nosniff'
+    if meta.get('digest'):
+        response['ETag'] = f'"{meta["digest"][:32]}"'
+    if meta.get('last_modified'):
+        response['Last-Modified'] = http_date(meta['last_modified'])
+    return response
+
+
+def _from_disk(request, url, meta, body, state):
+    body_path, _meta_path = _entry_paths(url)
+    _touch(body_path)
+    etag = f'"{meta["digest"][:32]}"' if meta.get('digest') else None
+    not_modified = get_conditional_response(request, etag=etag, last_modified=meta.get('last_modified'))
+    if not_modified is not None:
+        body.close()
+        response = not_modified
+    else:
+        response = FileResponse(body, content_type=meta['content_type'])
+    response['X-Image-Proxy'] = state
+    return _apply_cache_headers(response, meta)
+
+
+def _content_type(upstream):
+    content_type = upstream.headers.get('Content-Type', '').split(';')[0].strip().lower()
+    if content_type not in ALLOWED_CONTENT_TYPES:
+        raise ProxyError(f'Tipe konten tidak didukung: {content_type or "-"}', status=502)
+    return content_type
+
+
+def _stream_and_store(upstream, url, meta):
+    """Kirim body upstream per potongan sambil menulisnya ke cache; hanya disimpan jika lengkap."""
+    body_path, meta_path = _entry_paths(url)
+    limit = max_bytes()
+    complete = False
+    tmp_name = None
+    try:
+        body_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=body_path.parent, suffix='.part')
+        hasher = hashlib.sha256()
+        size = 0
+        with os.fdopen(fd, 'wb') as tmp:
+            for chunk in upstream.iter_content(CHUNK_SIZE):
+                size += len(chunk)
+                if size > limit:
+                    logger.warning('Gambar %s melebihi %d bytes, download dihentikan.', url, limit)
+                    return
+                tmp.write(chunk)
+                hasher.update(chunk)
+                yield chunk
+        complete = True
+    except requests.RequestException as e:
+        logger.warning('Download gambar %s terputus: %s', url, e)
+    finally:
+        upstream.close()
+        if complete:
+            os.replace(tmp_name, body_path)
+            _write_meta(meta_path, dict(meta, size=size, digest=hasher.hexdigest(), fetched_at=time.time()))
+            _record_stored(size)
+        elif tmp_name:
+            _unlink(tmp_name)
+
+
+def serve(request, url):
+    """Response untuk gambar `url`, dari cache disk kalau bisa."""
+    _validate_url(url)
+    meta, body = _load_entry(url)
+    if meta is not None and time.time() - meta['fetched_at'] < fresh_seconds():
+        return _from_disk(request, url, meta, body, 'HIT')
+
+    headers = {}
+    if meta is not None:
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = http_date(meta['last_modified'])
+
+    try:
+        upstream = _fetch(url, headers)
+    except (requests.RequestException, ProxyError) as e:
+        if meta is not None:
+            logger.warning('Revalidasi gambar %s gagal, pakai cache lama: %s', url, e)
+            return _from_disk(request, url, meta, body, 'STALE')
+        if isinstance(e, ProxyError):
+            raise
+        raise ProxyError(f'Error fetching image: {e}', status=502)
+
+    if meta is not None and upstream.status_code == 304:
+        upstream.close()
+        meta['fetched_at'] = time.time()
+        _write_meta(_entry_paths(url)[1], meta)
+        return _from_disk(request, url, meta, body, 'REVALIDATED')
+
+    if meta is not None and upstream.status_code >= 500:
+        upstream.close()
+        logger.warning('Upstream gambar %s error %d, pakai cache lama.', url, upstream.status_code)
+        return _from_disk(request, url, meta, body, 'STALE')
+
+    if body is not None:
+        body.close()
+    try:
+        if upstream.status_code != 200:
+            raise ProxyError(f'Error fetching image: upstream {upstream.status_code}', status=502)
+        content_type = _content_type(upstream)
+        length = upstream.headers.get('Content-Length')
+        if length and length.isdigit() and int(length) > max_bytes():
+            raise ProxyError('Gambar terlalu besar.', status=502)
+    except ProxyError:
+        upstream.close()
+        raise
+
+    new_meta = {
+        'url': url,
+        'content_type': content_type,
+        'etag': upstream.headers.get('ETag'),
+        'last_modified': parse_http_date_safe(upstream.headers.get('Last-Modified', '')),
+    }
+    response = StreamingHttpResponse(_stream_and_store(upstream, url, new_meta), content_type=content_type)
+    if length and length.isdigit() and 'Content-Encoding' not in upstream.headers:
+        response['Content-Length'] = length
+    response['X-Image-Proxy'] = 'MISS'
+    return _apply_cache_headers(response, new_meta)
+
+
+def proxy_image(request):
+    """GET ?url=<url gambar> — gambar eksternal lewat cache disk bersama."""
+    image_url = request.GET.get('url')
+    if not image_url:
+        return HttpResponse('No URL provided', status=400)
+    try:
+        return serve(request, image_url)
+    except ProxyError as e:
+        return HttpResponse(str(e), status=e.status)
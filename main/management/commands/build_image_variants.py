@@ -0,0 +1,93 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from main import responsive_images as ri
+from users.models import User
+
+
+def _kb(size):
+    return f'{size / 1024:,.0f} KB'
+
+
+class Command(BaseCommand):
+    help = 'Buat varian resize + WebP untuk gambar static (dan foto profil) lalu catat di manifest'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', default='images',
+                            help='Subfolder static yang diproses (default: images)')
+        parser.add_argument('--widths',
+                            help='Daftar lebar dipisah koma (default: RESPONSIVE_IMAGE_WIDTHS / 320,640,1024)')
+        parser.add_argument('--processes', type=int, default=None,
+                            help='Jumlah proses paralel (default: jumlah CPU)')
+        parser.add_argument('--force', action='store_true',
+                            help='Buat ulang walau sumber tidak berubah sejak manifest terakhir')
+        parser.add_argument('--profile-pictures', action='store_true',
+                            help='Proses juga foto profil user yang sudah ada di MEDIA_ROOT')
+
+    def handle(self, *args, **options):
+        if options['widths']:
+            try:
+                widths = tuple(sorted(int(w) for w in options['widths'].split(',') if w.strip()))
+            except ValueError:
+                raise CommandError('--widths harus berupa daftar angka, mis. 320,640,1024')
+        else:
+            widths = ri.variant_widths()
+
+        root = ri.static_root()
+        base = root / options['dir']
+        if not base.is_dir():
+            raise CommandError(f'Folder {base} tidak ditemukan.')
+        sources = sorted(
+            path.relative_to(root).as_posix() for path in base.rglob('*')
+            if path.suffix.lower() in ri.SOURCE_SUFFIXES and ri.VARIANTS_DIR not in path.relative_to(root).parts
+        )
+        self._process(root, sources, widths, options)
+
+        if options['profile_pictures']:
+            media = ri.media_root()
+            names = (
+                User.objects.exclude(profile_picture='').exclude(profile_picture__isnull=True)
+                .values_list('profile_picture', flat=True).distinct()
+            )
+            self._process(media, sorted(n for n in names if (media / n).is_file()), widths, options)
+
+    def _process(self, root, sources, widths, options):
+        manifest = ri.load_manifest(root)
+        if not options['force']:
+            sources = [s for s in sources if not self._up_to_date(root, s, manifest.get(s), widths)]
+        if not sources:
+            self.stdout.write(f'{root}: semua varian sudah terbaru.')
+            return
+
+        total_original = total_saved = 0
+        entries = {}
+        for source_rel, entry in ri.build_many(root, sources, widths, options['processes']):
+            entries[source_rel] = entry
+            full = next(v for v in entry['variants'] if v['format'] == 'webp' and v['width'] == entry['width'])
+            saved = entry['bytes'] - full['bytes']
+            total_original += entry['bytes']
+            total_saved += max(saved, 0)
+            smaller = ', '.join(
+                f"{v['width']}w {_kb(v['bytes'])}" for v in entry['variants']
+                if v['format'] == 'webp' and v['width'] < entry['width']
+            )
+            self.stdout.write(
+                f"  {source_rel}: {_kb(entry['bytes'])} -> webp {entry['width']}w {_kb(full['bytes'])} "
+                f"(hemat {saved * 100 / entry['bytes']:.0f}%)" + (f' | {smaller}' if smaller else '')
+            )
+
+        ri.update_manifest(root, entries)
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(entries)} gambar di {root} diproses: {_kb(total_original)} asli, '
+            f'hemat {_kb(total_saved)} dengan WebP ukuran penuh.'
+        ))
+
+    @staticmethod
+    def _up_to_date(root, source_rel, entry, widths):
+        if not entry:
+            return False
+        stat = (root / source_rel).stat()
+        expected = {w for w in widths if w < entry['width']} | {entry['width']}
+        return (
+            entry['bytes'] == stat.st_size and entry['mtime'] == int(stat.st_mtime)
+            and {v['width'] for v in entry['variants']} == expected
+        )
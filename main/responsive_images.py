@@ -0,0 +1,239 @@
+"""
+Varian gambar responsif (resize + WebP) untuk aset statis dan foto profil.
+
+Untuk setiap gambar sumber dibuat:
+
+- WebP di setiap lebar VARIANT_WIDTHS yang lebih kecil dari aslinya, plus satu
+  WebP seukuran aslinya
+- fallback di lebar yang sama (JPEG, atau PNG kalau gambarnya transparan) untuk
+  client yang tidak menerima WebP; untuk ukuran asli fallback-nya file sumber
+
+Semua varian ditulis ke `<root>/variants/` dan dicatat di manifest JSON per root:
+
+    {"images/futsal.png": {"width": 1600, "height": 900, "bytes": 1712345, "mtime": ...,
+                           "variants": [{"width": 320, "format": "webp",
+                                         "path": "variants/images/futsal-320w.webp",
+                                         "bytes": 9876}, ...]}}
+
+Root-nya folder static (dipakai lewat {% static %}) atau MEDIA_ROOT (MEDIA_URL).
+Resize/encode itu CPU-bound, jadi command build_image_variants menjalankannya di
+process pool; fungsi worker hanya menerima path dan lebar sehingga tidak butuh
+akses database. Proses web tidak pernah membuat pool: upload foto profil (satu
+gambar) diproses langsung setelah commit.
+"""
+import json
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.templatetags.static import static
+from PIL import Image, ImageOps
+
+try:
+    import fcntl
+except ImportError:  # Windows: manifest ditulis tanpa lock
+    fcntl = None
+
+VARIANT_WIDTHS = (320, 640, 1024)
+VARIANTS_DIR = 'variants'
+MANIFEST_NAME = 'manifest.json'
+WEBP_QUALITY = 80
+JPEG_QUALITY = 82
+SOURCE_SUFFIXES = ('.png', '.jpg', '.jpeg', '.webp', '.gif', '.bmp')
+
+
+def variant_widths():
+    return tuple(sorted(getattr(settings, 'RESPONSIVE_IMAGE_WIDTHS', VARIANT_WIDTHS)))
+
+
+def static_root():
+    return Path(getattr(settings, 'RESPONSIVE_STATIC_ROOT', settings.STATICFILES_DIRS[0]))
+
+
+def media_root():
+    return Path(settings.MEDIA_ROOT)
+
+
+def manifest_path(root):
+    return Path(root) / VARIANTS_DIR / MANIFEST_NAME
+
+
+# ---------------------------------------------------------------------------
+# Worker (dijalankan di process pool)
+# ---------------------------------------------------------------------------
+
+def _save(image, path, fmt):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    with os.fdopen(fd, 'wb') as tmp:
+        if fmt == 'webp':
+            image.save(tmp, format='WEBP', quality=WEBP_QUALITY, method=4)
+        elif fmt == 'jpeg':
+            image.save(tmp, format='JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+        else:
+            image.save(tmp, format='PNG', optimize=True)
+    os.replace(tmp_name, path)
+    return path.stat().st_size
+
+
+def build_variants(root, source_rel, widths=VARIANT_WIDTHS):
+    """Buat semua varian untuk `<root>/<source_rel>`, return entry manifest-nya."""
+    root = Path(root)
+    source = root / source_rel
+    stat = source.stat()
+
+    with Image.open(source) as opened:
+        image = ImageOps.exif_transpose(opened)
+        has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+
+    fallback = 'png' if has_alpha else 'jpeg'
+    width, height = image.size
+    stem = Path(VARIANTS_DIR) / Path(source_rel).with_suffix('')
+    variants = []
+    for target in [w for w in widths if w < width] + [width]:
+        resized = image if target == width else image.resize(
+            (target, max(1, round(height * target / width))), Image.LANCZOS, reducing_gap=2.0,
+        )
+        formats = ('webp',) if target == width else ('webp', fallback)
+        for fmt in formats:
+            rel = f'{stem}-{target}w.{"jpg" if fmt == "jpeg" else fmt}'
+            size = _save(resized, root / rel, fmt)
+            variants.append({'width': target, 'format': fmt, 'path': rel, 'bytes': size})
+
+    return {
+        'width': width,
+        'height': height,
+        'bytes': stat.st_size,
+        'mtime': int(stat.st_mtime),
+        'variants': variants,
+    }
+
+
+def _build_job(job):
+    root, source_rel, widths = job
+    return source_rel, build_variants(root, source_rel, widths)
+
+
+def build_many(root, sources, widths=None, processes=None):
+    """Yield (source_rel, entry) untuk setiap sumber, dikerjakan paralel per gambar."""
+    widths = tuple(widths or variant_widths())
+    jobs = [(str(root), source_rel, widths) for source_rel in sources]
+    processes = processes or os.cpu_count() or 1
+    if processes == 1 or len(jobs) <= 1:
+        yield from map(_build_job, jobs)
+        return
+    with ProcessPoolExecutor(max_workers=min(processes, len(jobs))) as pool:
+        yield from pool.map(_build_job, jobs)
+
+
+# ---------------------------------------------------------------------------
+# Manifest
+# ---------------------------------------------------------------------------
+
+_manifest_cache = {}
+
+
+def load_manifest(root):
+    """Manifest untuk `root`, di-cache per proses dan dibaca ulang kalau file berubah."""
+    path = manifest_path(root)
+    try:
+        mtime = path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return {}
+    cached = _manifest_cache.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    with open(path) as f:
+        data = json.load(f)
+    _manifest_cache[path] = (mtime, data)
+    return data
+
+
+def update_manifest(root, entries, remove=()):
+    """Gabungkan `entries` ({source_rel: entry}) ke manifest (read-modify-write dengan lock)."""
+    path = manifest_path(root)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path.with_suffix('.lock'), 'w') as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            data = {}
+        data.update(entries)
+        for source_rel in remove:
+            data.pop(source_rel, None)
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+        with os.fdopen(fd, 'w') as tmp:
+            json.dump(data, tmp, indent=1, sort_keys=True)
+        os.replace(tmp_name, path)
+    return data
+
+
+# ---------------------------------------------------------------------------
+# Pemilihan varian
+# ---------------------------------------------------------------------------
+
+def pick_variant(entry, width, webp=True):
+    """
+    Path varian terkecil yang lebarnya >= `width` (atau yang terbesar kalau
+    tidak ada). Return None kalau file sumber sendiri yang paling cocok.
+    """
+    if not entry:
+        return None
+    fmt = 'webp' if webp else ('png' if any(v['format'] == 'png' for v in entry['variants']) else 'jpeg')
+    candidates = sorted((v for v in entry['variants'] if v['format'] == fmt), key=lambda v: v['width'])
+    for variant in candidates:
+        if variant['width'] >= width:
+            return variant['path']
+    if webp and candidates:
+        return candidates[-1]['path']
+    return None
+
+
+def accepts_webp(request):
+    return request is not None and 'image/webp' in request.META.get('HTTP_ACCEPT', '')
+
+
+def static_variant_url(path, width, webp=True):
+    """URL varian untuk aset static `path` (mis. 'images/futsal.png'); fallback ke aslinya."""
+    chosen = pick_variant(load_manifest(static_root()).get(path), width, webp)
+    if chosen:
+        try:
+            return static(chosen)
+        except ValueError:
+            # Varian belum ikut collectstatic (manifest whitenoise tidak mengenalnya)
+            pass
+    return static(path)
+
+
+def media_variant_url(name, width, webp=True):
+    """URL varian untuk file upload `name` (FieldFile.name); fallback ke aslinya."""
+    if not name:
+        return None
+    chosen = pick_variant(load_manifest(media_root()).get(name), width, webp)
+    return settings.MEDIA_URL + (chosen or name)
+
+
+# ---------------------------------------------------------------------------
+# Hook upload
+# ---------------------------------------------------------------------------
+
+def schedule_media_variants(name):
+    """
+    Buat varian untuk upload `name` setelah transaksi commit, langsung di
+    proses ini (satu gambar, tanpa pool). Foto lama/massal lewat
+    `manage.py build_image_variants --profile-pictures`.
+    """
+    root, widths = media_root(), variant_widths()
+
+    def run():
+        update_manifest(root, {name: build_variants(root, name, widths)})
+
+    # robust: gambar rusak cukup dicatat di log, request upload tetap sukses
+    transaction.on_commit(run, robust=True)
@@ -0,0 +1,42 @@
+"""
+Helper bersama untuk tabel agregat per schedule (ScheduleSalesStats,
+ScheduleRatingStats): satu baris per schedule, primary key = schedule.
+
+- `bump_counters`: update inkremental F() + delta dari view/sinyal
+- `schedule_id_batches` + `upsert_rows`: hitung ulang penuh dari command rebuild_*
+"""
+from django.db import IntegrityError, transaction
+
+
+def bump_counters(model, schedule_id, changes, create=None):
+    """
+    UPDATE baris `schedule_id` dengan `changes` (ekspresi F()). Kalau barisnya
+    belum ada dan `create` diisi, INSERT baris baru dengan nilai `create`.
+    """
+    rows = model.objects.filter(schedule_id=schedule_id)
+    if rows.update(**changes) or create is None:
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(schedule_id=schedule_id, **create)
+    except IntegrityError:
+        # Baris dibuat request lain di antara UPDATE dan INSERT di atas
+        rows.update(**changes)
+
+
+def schedule_id_batches(schedule_ids, batch_size):
+    """Keyset per id schedule: yield list id (terurut) sebanyak `batch_size` per batch."""
+    schedule_ids = schedule_ids.order_by('id')
+    last_id = 0
+    while True:
+        batch = list(schedule_ids.filter(id__gt=last_id)[:batch_size])
+        if not batch:
+            return
+        yield batch
+        last_id = batch[-1]
+
+
+def upsert_rows(model, rows, fields):
+    """INSERT ... ON CONFLICT (schedule) DO UPDATE untuk `rows` dalam satu transaksi."""
+    with transaction.atomic():
+        model.objects.bulk_create(rows, update_conflicts=True, unique_fields=['schedule'], update_fields=fields)
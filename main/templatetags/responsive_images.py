@@ -0,0 +1,21 @@
+from django import template
+
+from main import responsive_images
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def static_variant(context, path, width):
+    """{% static_variant 'images/futsal.png' 640 %} -> URL varian terdekat untuk lebar 640px."""
+    webp = responsive_images.accepts_webp(context.get('request'))
+    return responsive_images.static_variant_url(path, int(width), webp=webp)
+
+
+@register.simple_tag(takes_context=True)
+def media_variant(context, image, width):
+    """{% media_variant user.profile_picture 160 %} -> URL varian foto upload."""
+    if not image:
+        return ''
+    webp = responsive_images.accepts_webp(context.get('request'))
+    return responsive_images.media_variant_url(image.name, int(width), webp=webp)
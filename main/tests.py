@@ -1,3 +1,425 @@
-from django.test import TestCase
+import ipaddress
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import date, datetime, time as dtime, timedelta, timezone as dt_timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO, StringIO
+from pathlib import Path
+from urllib.parse import urlsplit
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.template import Context, Template
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from main import image_proxy, views as main_views
+from main.cursors import aware_datetime, decode_cursor, encode_cursor
+from main import responsive_images as ri
+from reviews.models import ScheduleRatingStats
+from scheduling.models import Schedule
+from ticketing.cache import bump_schedules_version
+from ticketing.models import ScheduleSalesStats
+from users.models import User
+
+PNG_BODY = b'\x89PNG\r\n\x1a\n' + b'x' * 92
+
+
+class _ImageHandler(BaseHTTPRequestHandler):
+    """Upstream tiruan: mencatat setiap request di `server.requests`."""
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self.server.requests.append((self.path, self.headers.get('If-None-Match')))
+        self.server.hosts.append(self.headers.get('Host'))
+        path = self.path.split('?')[0]
+        if path == '/banner.png':
+            if self.headers.get('If-None-Match') == '"v1"':
+                self.send_response(304)
+                self.end_headers()
+                return
+            self._send(200, PNG_BODY, 'image/png', {'ETag': '"v1"'})
+        elif path == '/page.html':
+            self._send(200, b'<script>alert(1)</script>', 'text/html')
+        elif path == '/big.png':
+            self._send(200, b'x' * 4096, 'image/png')
+        elif path == '/big-unknown-length.png':
+            self.send_response(200)
+            self.send_header('Content-Type', 'image/png')
+            self.end_headers()
+            self.wfile.write(b'x' * 4096)
+        elif path == '/redirect.png':
+            self.send_response(302)
+            self.send_header('Location', '/banner.png')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+        elif path == '/down.png':
+            self._send(503, b'down', 'text/plain')
+        else:
+            self._send(404, b'not found', 'text/plain')
+
+    def _send(self, status, body, content_type, headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class ImageProxyTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), _ImageHandler)
+        cls.server.requests = []
+        cls.server.hosts = []
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.base = f'http://127.0.0.1:{cls.server.server_address[1]}'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.server.requests.clear()
+        self.server.hosts.clear()
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir, ignore_errors=True)
+        overrides = override_settings(
+            IMAGE_PROXY_ROOT=self.cache_dir,
+            IMAGE_PROXY_ALLOW_PRIVATE=True,
+            IMAGE_PROXY_MAX_BYTES=1024,
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def fetch(self, path, url_name='scheduling:proxy_image', **headers):
+        response = self.client.get(reverse(url_name), {'url': self.base + path}, **headers)
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        response.close()
+        return response, body
+
+    def cached_bodies(self):
+        return [name for _, _, files in os.walk(self.cache_dir) for name in files if name.endswith('.body')]
+
+    def test_miss_then_hit_from_disk(self):
+        response, body = self.fetch('/banner.png')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(body, PNG_BODY)
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertEqual(response['X-Image-Proxy'], 'MISS')
+        self.assertIn('max-age=', response['Cache-Control'])
+        self.assertIn('public', response['Cache-Control'])
+
+        response, body = self.fetch('/banner.png', url_name='merchandise:proxy_image')
+        self.assertEqual(response['X-Image-Proxy'], 'HIT')
+        self.assertEqual(body, PNG_BODY)
+        self.assertTrue(response.has_header('ETag'))
+        # Hit kedua tidak menyentuh upstream sama sekali
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_client_conditional_get_returns_304(self):
+        self.fetch('/banner.png')
+        response, _ = self.fetch('/banner.png')
+        response, body = self.fetch('/banner.png', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(body, b'')
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_stale_entry_is_revalidated_with_etag(self):
+        self.fetch('/banner.png')
+        with override_settings(IMAGE_PROXY_FRESH_SECONDS=0):
+            response, body = self.fetch('/banner.png')
+        self.assertEqual(response['X-Image-Proxy'], 'REVALIDATED')
+        self.assertEqual(body, PNG_BODY)
+        self.assertEqual(self.server.requests[-1], ('/banner.png', '"v1"'))
+
+    def test_stale_entry_served_when_upstream_fails(self):
+        url = self.base + '/down.png'
+        body_path, meta_path = image_proxy._entry_paths(url)
+        body_path.parent.mkdir(parents=True)
+        body_path.write_bytes(PNG_BODY)
+        image_proxy._write_meta(meta_path, {
+            'url': url, 'content_type': 'image/png', 'etag': None,
+            'last_modified': None, 'digest': 'ab' * 32, 'fetched_at': 0,
+        })
+        response, body = self.fetch('/down.png')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Image-Proxy'], 'STALE')
+        self.assertEqual(body, PNG_BODY)
+
+    def test_redirect_is_followed(self):
+        response, body = self.fetch('/redirect.png')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(body, PNG_BODY)
+
+    def test_rejects_non_image_content(self):
+        response, _ = self.fetch('/page.html')
+        self.assertEqual(response.status_code, 502)
+        self.assertEqual(self.cached_bodies(), [])
+
+    def test_rejects_oversized_image(self):
+        response, _ = self.fetch('/big.png')
+        self.assertEqual(response.status_code, 502)
+
+        # Tanpa Content-Length: stream dipotong dan tidak disimpan ke cache
+        response, body = self.fetch('/big-unknown-length.png')
+        self.assertLessEqual(len(body), 1024)
+        self.assertEqual(self.cached_bodies(), [])
+
+    def test_upstream_error_and_bad_url(self):
+        response, _ = self.fetch('/missing.png')
+        self.assertEqual(response.status_code, 502)
+
+        response = self.client.get(reverse('scheduling:proxy_image'), {'url': 'file:///etc/passwd'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(reverse('scheduling:proxy_image'))
+        self.assertEqual(response.status_code, 400)
+
+    def test_private_hosts_blocked_by_default(self):
+        with override_settings(IMAGE_PROXY_ALLOW_PRIVATE=False):
+            response, _ = self.fetch('/banner.png')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.server.requests, [])
+
+    def test_lru_eviction_keeps_cache_bounded(self):
+        self.fetch('/banner.png?v=1')
+        self.fetch('/banner.png?v=2')
+        # Jadikan v=1 entry yang paling lama tidak dipakai
+        old_body, _ = image_proxy._entry_paths(self.base + '/banner.png?v=1')
+        past = time.time() - 3600
+        os.utime(old_body, (past, past))
+
+        with override_settings(IMAGE_PROXY_CACHE_BYTES=len(PNG_BODY) * 2 + 50):
+            self.fetch('/banner.png?v=3')
+
+        self.assertEqual(len(self.cached_bodies()), 2)
+        self.assertFalse(old_body.exists())
+        response, _ = self.fetch('/banner.png?v=3')
+        self.assertEqual(response['X-Image-Proxy'], 'HIT')
+
+    def test_cache_directory_scanned_only_when_over_budget(self):
+        self.fetch('/banner.png?v=1')  # ukuran awal belum diketahui -> scan
+        sub = next(d.path for d in os.scandir(self.cache_dir) if d.is_dir())
+        leftover = os.path.join(sub, 'sisa.part')
+        open(leftover, 'wb').close()
+        past = time.time() - image_proxy.STALE_PART_SECONDS - 1
+        os.utime(leftover, (past, past))
+
+        self.fetch('/banner.png?v=2')  # masih di bawah batas: tanpa scan
+        self.assertTrue(os.path.exists(leftover))
+
+        with override_settings(IMAGE_PROXY_CACHE_BYTES=len(PNG_BODY) * 2 + 50):
+            self.fetch('/banner.png?v=3')
+        self.assertFalse(os.path.exists(leftover))
+        self.assertEqual(len(self.cached_bodies()), 2)
+
+    def test_connects_to_resolved_address_with_original_host(self):
+        port = self.server.server_address[1]
+        pinned_url, host = image_proxy._pin(urlsplit(f'https://example.com:{port}/a.png?x=1'),
+                                            ipaddress.ip_address('93.184.216.34'))
+        self.assertEqual((pinned_url, host), (f'https://93.184.216.34:{port}/a.png?x=1', f'example.com:{port}'))
+        self.assertEqual(image_proxy._pin(urlsplit('http://example.com/a.png'), ipaddress.ip_address('::1'))[0],
+                         'http://[::1]/a.png')
+
+        response = self.client.get(reverse('scheduling:proxy_image'),
+                                   {'url': f'http://localhost:{port}/banner.png'})
+        b''.join(response.streaming_content)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.server.hosts, [f'localhost:{port}'])
+
+
+def _image_bytes(size, mode='RGB', fmt='PNG'):
+    buffer = BytesIO()
+    Image.new(mode, size, (200, 30, 30, 128) if mode == 'RGBA' else (200, 30, 30)).save(buffer, format=fmt)
+    return buffer.getvalue()
+
+
+class ResponsiveImagesTestCase(TestCase):
+    def setUp(self):
+        self.root = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        (self.root / 'images').mkdir()
+        (self.root / 'images' / 'banner.jpg').write_bytes(_image_bytes((1200, 600), fmt='JPEG'))
+        (self.root / 'images' / 'logo.png').write_bytes(_image_bytes((500, 500), mode='RGBA'))
+        overrides = override_settings(
+            RESPONSIVE_STATIC_ROOT=str(self.root),
+            MEDIA_ROOT=str(self.root),
+            RESPONSIVE_IMAGE_WIDTHS=(320, 640),
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def test_build_variants_resizes_and_picks_fallback_format(self):
+        entry = ri.build_variants(self.root, 'images/banner.jpg', (320, 640))
+        self.assertEqual((entry['width'], entry['height']), (1200, 600))
+        widths = sorted((v['width'], v['format']) for v in entry['variants'])
+        self.assertEqual(widths, [(320, 'jpeg'), (320, 'webp'), (640, 'jpeg'), (640, 'webp'), (1200, 'webp')])
+        for variant in entry['variants']:
+            with Image.open(self.root / variant['path']) as image:
+                self.assertEqual(image.width, variant['width'])
+
+        # PNG transparan: fallback tetap PNG, dan lebar >= aslinya tidak di-upscale
+        entry = ri.build_variants(self.root, 'images/logo.png', (320, 640))
+        self.assertEqual(sorted((v['width'], v['format']) for v in entry['variants']),
+                         [(320, 'png'), (320, 'webp'), (500, 'webp')])
+
+    def test_pick_variant_by_width(self):
+        entry = ri.build_variants(self.root, 'images/banner.jpg', (320, 640))
+        self.assertEqual(ri.pick_variant(entry, 100), 'variants/images/banner-320w.webp')
+        self.assertEqual(ri.pick_variant(entry, 500), 'variants/images/banner-640w.webp')
+        self.assertEqual(ri.pick_variant(entry, 5000), 'variants/images/banner-1200w.webp')
+        self.assertEqual(ri.pick_variant(entry, 500, webp=False), 'variants/images/banner-640w.jpg')
+        # Tanpa WebP dan lebih lebar dari varian mana pun: pakai file sumber
+        self.assertIsNone(ri.pick_variant(entry, 5000, webp=False))
+        self.assertIsNone(ri.pick_variant(None, 320))
+
+    def test_command_writes_manifest_and_skips_unchanged(self):
+        out = StringIO()
+        call_command('build_image_variants', processes=1, stdout=out)
+        self.assertIn('images/banner.jpg', out.getvalue())
+        self.assertIn('hemat', out.getvalue())
+        manifest = ri.load_manifest(self.root)
+        self.assertEqual(set(manifest), {'images/banner.jpg', 'images/logo.png'})
+
+        out = StringIO()
+        call_command('build_image_variants', stdout=out)
+        self.assertIn('sudah terbaru', out.getvalue())
+
+        self.assertTrue(ri.static_variant_url('images/banner.jpg', 300).endswith('variants/images/banner-320w.webp'))
+        self.assertTrue(ri.static_variant_url('images/missing.png', 300).endswith('images/missing.png'))
+
+    def test_template_tag_respects_accept_header(self):
+        call_command('build_image_variants', stdout=StringIO())
+        template = Template("{% load responsive_images %}{% static_variant 'images/banner.jpg' 640 %}")
+        factory = RequestFactory()
+        webp = template.render(Context({'request': factory.get('/', HTTP_ACCEPT='image/webp,*/*')}))
+        plain = template.render(Context({'request': factory.get('/', HTTP_ACCEPT='*/*')}))
+        self.assertTrue(webp.endswith('banner-640w.webp'))
+        self.assertTrue(plain.endswith('banner-640w.jpg'))
+
+    def test_profile_picture_upload_builds_variants(self):
+        upload = SimpleUploadedFile('me.png', _image_bytes((800, 800)), content_type='image/png')
+        with self.captureOnCommitCallbacks(execute=True):
+            user = User.objects.create_user(username='foto', email='foto@example.com', password='x',
+                                            profile_picture=upload)
+        name = user.profile_picture.name
+        self.assertIn(name, ri.load_manifest(self.root))
+        self.assertTrue(ri.media_variant_url(name, 96).endswith('-320w.webp'))
+
+        # Save berikutnya (tanpa foto baru) tidak menjadwalkan build ulang
+        with self.captureOnCommitCallbacks() as callbacks:
+            user.save()
+        self.assertEqual(callbacks, [])
+
+
+class UpcomingSchedulesCacheTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.future = date.today() + timedelta(days=7)
+        self.schedule = Schedule.objects.create(
+            category='Futsal', team1='Fasilkom', team2='FT', location='GOR',
+            date=self.future, time=dtime(15, 0),
+        )
+
+    def get_json(self):
+        return self.client.get(reverse('get_schedules_json')).json()
+
+    def test_json_and_fragment_served_from_cache(self):
+        self.assertEqual([s['team1'] for s in self.get_json()], ['Fasilkom'])
+        self.assertContains(self.client.get(reverse('homepage')), 'Fasilkom vs FT')
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get_json()[0]['date'], self.future.isoformat())
+        with self.assertNumQueries(0):
+            self.assertContains(self.client.get(reverse('homepage')), 'Fasilkom vs FT')
+
+    def test_schedule_signals_invalidate(self):
+        self.get_json()
+        self.client.get(reverse('homepage'))
+
+        Schedule.objects.create(category='Basket', team1='FH', team2='FK', location='GOR',
+                                date=self.future, time=dtime(9, 0))
+        self.assertEqual([s['team1'] for s in self.get_json()], ['FH', 'Fasilkom'])
+        self.assertContains(self.client.get(reverse('homepage')), 'FH vs FK')
+
+        self.schedule.delete()
+        self.assertEqual([s['team1'] for s in self.get_json()], ['FH'])
+        self.assertNotContains(self.client.get(reverse('homepage')), 'Fasilkom vs FT')
+
+    def test_status_transition_invalidates(self):
+        self.get_json()
+        past = Schedule.objects.create(category='Voli', team1='FIB', team2='FEB', location='GOR',
+                                       date=date.today() - timedelta(days=1), time=dtime(9, 0))
+        self.assertEqual(len(self.get_json()), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Schedule.complete_past()
+        self.assertNotIn(past.team1, [s['team1'] for s in self.get_json()])
+
+    def test_stale_value_served_while_another_request_rebuilds(self):
+        self.get_json()
+        Schedule.objects.filter(pk=self.schedule.pk).update(team1='Baru')
+        bump_schedules_version()
+
+        # Request lain sedang membangun ulang (lock dipegang): nilai lama tanpa query
+        cache.add(f'{main_views.SCHEDULES_JSON_KEY}:lock', 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get_json()[0]['team1'], 'Fasilkom')
+
+        cache.delete(f'{main_views.SCHEDULES_JSON_KEY}:lock')
+        self.assertEqual(self.get_json()[0]['team1'], 'Baru')
+
+
+class StatsHelperTestCase(TestCase):
+    def setUp(self):
+        self.schedule = Schedule.objects.create(category='Futsal', team1='FEB', team2='FH', location='GOR',
+                                                date=date.today(), time=dtime(9, 0))
+
+    def test_bump_counters_retries_update_when_insert_races(self):
+        raced = []
+
+        def racing_insert(execute, sql, params, many, context):
+            result = execute(sql, params, many, context)
+            # Request lain membuat barisnya tepat setelah UPDATE kita (0 baris)
+            if sql.startswith('UPDATE "ticketing_schedulesalesstats"') and not raced:
+                raced.append(True)
+                ScheduleSalesStats.objects.create(schedule=self.schedule, tickets_sold=1)
+            return result
+
+        with connection.execute_wrapper(racing_insert):
+            ScheduleSalesStats.bump(self.schedule.id, tickets_sold=1)
+        self.assertEqual(ScheduleSalesStats.objects.get(schedule=self.schedule).tickets_sold, 2)
+
+    def test_negative_delta_does_not_create_row(self):
+        ScheduleSalesStats.bump(self.schedule.id, tickets_sold=-1)
+        ScheduleRatingStats.apply(self.schedule.id, removed=4)
+        self.assertFalse(ScheduleSalesStats.objects.exists())
+        self.assertFalse(ScheduleRatingStats.objects.exists())
+
+
+class CursorTestCase(TestCase):
+    def test_roundtrip_and_rejects_broken_cursors(self):
+        when = datetime(2025, 5, 1, 8, 30, tzinfo=dt_timezone.utc)
+        cursor = encode_cursor(date(2025, 5, 1), dtime(8, 0), 42)
+        self.assertEqual(decode_cursor(cursor, date.fromisoformat, dtime.fromisoformat, int),
+                         (date(2025, 5, 1), dtime(8, 0), 42))
+        self.assertEqual(decode_cursor(encode_cursor(when, 7), aware_datetime, int), (when, 7))
+
+        for broken in ('!!', encode_cursor(1, 2), encode_cursor('2025-05-01T08:30', 7), encode_cursor(when, 'x')):
+            with self.assertRaises(ValueError):
+                decode_cursor(broken, aware_datetime, int)
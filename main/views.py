@@ -1,15 +1,38 @@
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
 from django.shortcuts import render
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
 from scheduling.models import Schedule
-from django.http import JsonResponse
+from ticketing.cache import get_or_build
+
+# Di-invalidasi lewat versi jadwal (post_save/post_delete Schedule dan
+# schedules_bulk_updated, lihat ticketing/signals.py)
+HOMEPAGE_SCHEDULES_KEY = 'main:homepage:upcoming_html'
+SCHEDULES_JSON_KEY = 'main:schedules_json'
+
+
+def _upcoming_schedules():
+    return Schedule.objects.filter(status='upcoming').order_by('date', 'time')[:10]
+
 
 def homepage(request):
-    # Ambil 5 jadwal terdekat (status 'upcoming')
-    schedules = Schedule.objects.filter(status='upcoming').order_by('date', 'time')[:10]
-    return render(request, 'main/homepage.html', {'schedules': schedules})
+    # Ambil 10 jadwal terdekat (status 'upcoming'); fragment HTML-nya di-cache
+    schedules_html = get_or_build(
+        HOMEPAGE_SCHEDULES_KEY,
+        lambda: render_to_string('main/upcoming_schedules_fragment.html', {'schedules': _upcoming_schedules()}),
+    )
+    return render(request, 'main/homepage.html', {'schedules_html': mark_safe(schedules_html)})
 
 def get_schedules_json(request):
     # Filter only upcoming schedules and sort by date/time (nearest first)
-    schedules = Schedule.objects.filter(status='upcoming').order_by('date', 'time')[:10].values(
-        'team1', 'team2', 'category', 'date', 'time', 'location', 'image_url'
-    )
-    return JsonResponse(list(schedules), safe=False)
+    def build():
+        schedules = _upcoming_schedules().values(
+            'team1', 'team2', 'category', 'date', 'time', 'location', 'image_url'
+        )
+        return json.dumps(list(schedules), cls=DjangoJSONEncoder).encode()
+
+    return HttpResponse(get_or_build(SCHEDULES_JSON_KEY, build), content_type='application/json')
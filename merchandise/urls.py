@@ -1,5 +1,6 @@
 from django.urls import path
 from . import views
+from main import image_proxy
 
 app_name = 'merchandise'
 
@@ -19,7 +20,7 @@ urlpatterns = [
     path('list/create/', views.merchandise_create_flutter, name='merchandise_create_flutter'),
     path('list/<uuid:id>/edit/', views.merchandise_update_flutter, name='merchandise_update_flutter'),
     path('list/<uuid:id>/delete/', views.merchandise_delete_flutter, name='merchandise_delete_flutter'),
-    path('proxy-image/', views.proxy_image, name='proxy_image'),
+    path('proxy-image/', image_proxy.proxy_image, name='proxy_image'),
     path('api/cart/', views.cart_detail_api, name='cart_detail_api'),
     path('api/cart/add/<uuid:merchandise_id>/', views.cart_add_item_api, name='cart_add_item_api'),
     path('api/cart/item/<uuid:item_id>/update/', views.cart_update_item_api, name='cart_update_item_api'),
@@ -7,7 +7,6 @@ from django.db import transaction
 from merchandise.forms import MerchandiseForm
 from merchandise.models import Merchandise, Cart, CartItem
 from django.utils.html import strip_tags
-import requests
 import json
 
 def is_organizer(user):
@@ -358,25 +357,7 @@ def merchandise_delete_flutter(request, id):
         # Catch database errors during deletion
         return JsonResponse({"status": "error", "message": f"An error occurred during deletion: {e}"}, status=500)
 
-def proxy_image(request):
-    image_url = request.GET.get('url')
-    if not image_url:
-        return HttpResponse('No URL provided', status=400)
-    
-    try:
-        # Fetch image from external source
-        # print(image_url)
-        response = requests.get(image_url, timeout=10)
-        response.raise_for_status()
-        
-        # Return the image with proper content type
-        return HttpResponse(
-            response.content,
-            content_type=response.headers.get('Content-Type', 'image/jpeg')
-        )
-    except requests.RequestException as e:
-        return HttpResponse(f'Error fetching image: {str(e)}', status=500)
-    
+
 @csrf_exempt
 def cart_detail_api(request):
     cart, created = Cart.objects.get_or_create(user=request.user, status='open')
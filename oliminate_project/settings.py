@@ -121,6 +121,39 @@ DATABASES = {
     }
 }
 
+# Postgres lokal (mis. untuk `manage.py loadtest_flash_sale`): set POSTGRES_DB
+if os.getenv('POSTGRES_DB'):
+    DATABASES['default'] = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.getenv('POSTGRES_DB'),
+        'USER': os.getenv('POSTGRES_USER', 'postgres'),
+        'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
+        'HOST': os.getenv('POSTGRES_HOST', 'localhost'),
+        'PORT': os.getenv('POSTGRES_PORT', '5432'),
+    }
+
+# ============================
+#  CACHE
+# ============================
+
+# Cache harus dipakai bersama semua worker: versi jadwal (ticketing/cache.py)
+# dinaikkan oleh worker mana pun maupun command cron, dan worker lain harus
+# langsung melihatnya. LocMemCache bawaan Django hanya hidup di satu proses.
+# Default: file di disk (cukup untuk semua worker gunicorn di satu server);
+# set REDIS_URL kalau worker tersebar di beberapa server.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv('DJANGO_CACHE_DIR', str(BASE_DIR / '.django_cache')),
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    }
+}
+if os.getenv('REDIS_URL'):
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.getenv('REDIS_URL'),
+    }
+
 # ============================
 #  PASSWORDS & AUTH
 # ============================
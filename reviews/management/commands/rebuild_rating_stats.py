@@ -0,0 +1,79 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from main.stats import schedule_id_batches, upsert_rows
+from reviews.models import Review, ScheduleRatingStats
+from scheduling.models import Schedule
+
+STAR_FIELDS = [f'stars_{star}' for star in range(1, 6)]
+STATS_FIELDS = ['review_count', 'rating_sum', 'avg_rating', *STAR_FIELDS, 'updated_at']
+
+
+class Command(BaseCommand):
+    help = 'Hitung ulang ScheduleRatingStats dari tabel Review (per batch schedule)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Jumlah schedule per batch (default: 500)')
+        parser.add_argument('--schedule', type=int, action='append', dest='schedule_ids',
+                            help='Hanya hitung ulang schedule ini (boleh diulang)')
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options['batch_size'])
+        schedules = Schedule.objects.values_list('id', flat=True)
+        if options['schedule_ids']:
+            schedules = schedules.filter(id__in=options['schedule_ids'])
+
+        start = time.perf_counter()
+        total = fixed = 0
+        for schedule_ids in schedule_id_batches(schedules, batch_size):
+            fixed += self._rebuild(schedule_ids)
+            total += len(schedule_ids)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Agregat rating {total} schedule dihitung ulang ({fixed} berubah) '
+            f'dalam {time.perf_counter() - start:.2f} detik.'
+        ))
+
+    @staticmethod
+    def _rebuild(schedule_ids):
+        """Upsert agregat untuk `schedule_ids`; return jumlah baris yang sebelumnya tidak cocok."""
+        totals = {
+            row['schedule_id']: row
+            for row in Review.objects.filter(schedule_id__in=schedule_ids)
+            .values('schedule_id')
+            .annotate(
+                review_count=Count('id'),
+                rating_sum=Sum('rating'),
+                **{field: Count('id', filter=Q(rating=star)) for star, field in enumerate(STAR_FIELDS, start=1)},
+            )
+            .order_by()
+        }
+        current = {
+            row[0]: row[1:]
+            for row in ScheduleRatingStats.objects.filter(schedule_id__in=schedule_ids)
+            .values_list('schedule_id', 'review_count', 'rating_sum', *STAR_FIELDS)
+        }
+        now = timezone.now()
+        rows = []
+        fixed = 0
+        for schedule_id in schedule_ids:
+            row = totals.get(schedule_id, {})
+            count = row.get('review_count', 0)
+            rating_sum = row.get('rating_sum') or 0
+            stars = [row.get(field, 0) for field in STAR_FIELDS]
+            if current.get(schedule_id, (0, 0, 0, 0, 0, 0, 0)) != (count, rating_sum, *stars):
+                fixed += 1
+            rows.append(ScheduleRatingStats(
+                schedule_id=schedule_id,
+                review_count=count,
+                rating_sum=rating_sum,
+                avg_rating=rating_sum / count if count else 0,
+                updated_at=now,
+                **dict(zip(STAR_FIELDS, stars)),
+            ))
+        upsert_rows(ScheduleRatingStats, rows, STATS_FIELDS)
+        return fixed
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:54
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def backfill_stats(apps, schema_editor):
+    Review = apps.get_model('reviews', 'Review')
+    ScheduleRatingStats = apps.get_model('reviews', 'ScheduleRatingStats')
+    totals = (
+        Review.objects.values('schedule_id')
+        .annotate(
+            review_count=models.Count('id'),
+            rating_sum=models.Sum('rating'),
+            **{f'stars_{star}': models.Count('id', filter=models.Q(rating=star)) for star in range(1, 6)},
+        )
+        .order_by()
+    )
+    ScheduleRatingStats.objects.bulk_create(
+        [
+            ScheduleRatingStats(
+                avg_rating=row['rating_sum'] / row['review_count'],
+                **row,
+            )
+            for row in totals.iterator()
+        ],
+        batch_size=500,
+    )
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0003_review_updated_at'),
+        ('scheduling', '0004_schedule_status_date_time_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScheduleRatingStats',
+            fields=[
+                ('schedule', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='rating_stats', serialize=False, to='scheduling.schedule')),
+                ('review_count', models.PositiveIntegerField(default=0)),
+                ('rating_sum', models.PositiveIntegerField(default=0)),
+                ('avg_rating', models.FloatField(default=0)),
+                ('stars_1', models.PositiveIntegerField(default=0)),
+                ('stars_2', models.PositiveIntegerField(default=0)),
+                ('stars_3', models.PositiveIntegerField(default=0)),
+                ('stars_4', models.PositiveIntegerField(default=0)),
+                ('stars_5', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['avg_rating'], name='reviews_sch_avg_rat_ced4d7_idx'), models.Index(fields=['review_count'], name='reviews_sch_review__8dc3c9_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:56
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0004_schedule_rating_stats'),
+        ('scheduling', '0004_schedule_status_date_time_index'),
+        ('ticketing', '0011_idempotencykey'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['schedule', 'created_at', 'id'], name='reviews_rev_schedul_0d102a_idx'),
+        ),
+    ]
@@ -1,5 +1,8 @@
 from django.db import models
+from django.db.models.functions import Cast, Coalesce, NullIf
 from django.conf import settings
+from django.utils import timezone
+from main.stats import bump_counters
 from scheduling.models import Schedule
 from ticketing.models import Ticket
 
@@ -18,4 +21,84 @@ class Review(models.Model):
     rating = models.IntegerField(choices=RATING_CHOICES)
     comment = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
\ No newline at end of file
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Daftar review per event, terbaru dulu (keyset pada created_at, id)
+            models.Index(fields=['schedule', 'created_at', 'id']),
+        ]
+
+
+class ScheduleRatingStats(models.Model):
+    """
+    Agregat review per schedule (jumlah, total rating, histogram bintang 1-5).
+    Diperbarui inkremental oleh view tambah/edit review (web dan flutter) dan
+    sinyal post_delete Review (semua jalur hapus, termasuk admin dan CASCADE);
+    `manage.py rebuild_rating_stats` menghitung ulang dari tabel Review.
+    """
+    schedule = models.OneToOneField(
+        Schedule,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='rating_stats'
+    )
+    review_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    # rating_sum / review_count, disimpan supaya landing bisa ORDER BY tanpa agregasi
+    avg_rating = models.FloatField(default=0)
+    stars_1 = models.PositiveIntegerField(default=0)
+    stars_2 = models.PositiveIntegerField(default=0)
+    stars_3 = models.PositiveIntegerField(default=0)
+    stars_4 = models.PositiveIntegerField(default=0)
+    stars_5 = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['avg_rating']),
+            models.Index(fields=['review_count']),
+        ]
+
+    def __str__(self):
+        return f"Rating {self.schedule_id}: {self.avg_rating:.1f} ({self.review_count} review)"
+
+    @property
+    def histogram(self):
+        return {star: getattr(self, f'stars_{star}') for star in range(1, 6)}
+
+    @classmethod
+    def for_schedule(cls, schedule_id):
+        """Statistik schedule; objek kosong (tidak disimpan) kalau belum ada review."""
+        return cls.objects.filter(schedule_id=schedule_id).first() or cls(schedule_id=schedule_id)
+
+    @classmethod
+    def apply(cls, schedule_id, added=None, removed=None):
+        """
+        Catat review baru (`added`), review dihapus (`removed`) atau rating
+        yang diedit (keduanya) dengan satu UPDATE F() + delta.
+        """
+        if added == removed:
+            return
+        count = (added is not None) - (removed is not None)
+        total = (added or 0) - (removed or 0)
+        deltas = {}
+        if count:
+            deltas['review_count'] = count
+        if total:
+            deltas['rating_sum'] = total
+        if added is not None:
+            deltas[f'stars_{added}'] = 1
+        if removed is not None:
+            deltas[f'stars_{removed}'] = -1
+
+        changes = {field: models.F(field) + delta for field, delta in deltas.items()}
+        # Ruas kanan SET memakai nilai lama, jadi rata-rata dihitung dari nilai + delta
+        changes['avg_rating'] = Coalesce(
+            Cast(models.F('rating_sum') + total, models.FloatField())
+            / NullIf(models.F('review_count') + count, 0),
+            models.Value(0.0),
+        )
+        changes['updated_at'] = timezone.now()
+        create = None if removed is not None else dict(deltas, avg_rating=float(added))
+        bump_counters(cls, schedule_id, changes, create)
@@ -0,0 +1,10 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from .models import Review, ScheduleRatingStats
+
+
+@receiver(post_delete, sender=Review)
+def remove_from_rating_stats(sender, instance, **kwargs):
+    # Semua jalur hapus (view, admin, CASCADE dari user) lewat sini, bukan dari view
+    ScheduleRatingStats.apply(instance.schedule_id, removed=instance.rating)
@@ -1,3 +1,196 @@
+from datetime import date, time, timedelta
+from io import StringIO
+
+from django.core.management import call_command
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from scheduling.models import Schedule
+from ticketing.models import Ticket
+from users.models import User
+
+from .models import Review, ScheduleRatingStats
+from .views import REVIEW_PAGE_SIZE
+
+
+class RatingStatsTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='penonton', email='penonton@example.com', password='pass123')
+        self.other = User.objects.create_user(username='lain', email='lain@example.com', password='pass123')
+        self.schedule = Schedule.objects.create(
+            category='Futsal', team1='Fasilkom', team2='FT', location='GOR',
+            date=date(2025, 1, 10), time=time(15, 0), status='reviewable',
+        )
+        self.quiet = Schedule.objects.create(
+            category='Basket', team1='FH', team2='FK', location='GOR',
+            date=date(2025, 1, 11), time=time(15, 0), status='reviewable',
+        )
+        for user in (self.user, self.other):
+            Ticket.objects.create(schedule=self.schedule, buyer=user, price=10000, payment_status='paid')
+
+    def stats(self, schedule=None):
+        return ScheduleRatingStats.for_schedule((schedule or self.schedule).id)
+
+    def test_web_views_keep_aggregates_in_sync(self):
+        self.client.login(username='penonton', password='pass123')
+        self.client.post(reverse('add_review', args=[self.schedule.id]), {'rating': 4, 'comment': 'Seru'})
+        stats = self.stats()
+        self.assertEqual((stats.review_count, stats.rating_sum, stats.avg_rating), (1, 4, 4.0))
+        self.assertEqual(stats.histogram, {1: 0, 2: 0, 3: 0, 4: 1, 5: 0})
+
+        review = Review.objects.get(reviewer=self.user)
+        self.client.post(reverse('edit_review', args=[review.id]), {'rating': 2, 'comment': 'Biasa'})
+        stats = self.stats()
+        self.assertEqual((stats.review_count, stats.rating_sum, stats.avg_rating), (1, 2, 2.0))
+        self.assertEqual(stats.histogram, {1: 0, 2: 1, 3: 0, 4: 0, 5: 0})
+
+        self.client.post(reverse('delete_review', args=[review.id]))
+        stats = self.stats()
+        self.assertEqual((stats.review_count, stats.rating_sum, stats.avg_rating), (0, 0, 0.0))
+        self.assertEqual(sum(stats.histogram.values()), 0)
+
+    def test_flutter_views_keep_aggregates_in_sync(self):
+        for user, rating in ((self.user, 5), (self.other, 2)):
+            self.client.force_login(user)
+            response = self.client.post(reverse('add_flutter', args=[self.schedule.id]),
+                                        {'rating': rating, 'comment': 'ok'})
+            self.assertEqual(response.status_code, 200)
+        stats = self.stats()
+        self.assertEqual((stats.review_count, stats.rating_sum, stats.avg_rating), (2, 7, 3.5))
+
+        review = Review.objects.get(reviewer=self.other)
+        self.client.post(reverse('edit_flutter', args=[review.id]), {'rating': 3, 'comment': 'ok'})
+        self.assertEqual(self.stats().histogram, {1: 0, 2: 0, 3: 1, 4: 0, 5: 1})
+
+        response = self.client.post(reverse('edit_flutter', args=[review.id]), {'rating': 9, 'comment': 'ok'})
+        self.assertEqual(response.status_code, 400)
+
+        self.client.post(reverse('delete_flutter', args=[review.id]))
+        stats = self.stats()
+        self.assertEqual((stats.review_count, stats.rating_sum, stats.avg_rating), (1, 5, 5.0))
+
+    def test_deletes_outside_views_update_aggregates(self):
+        for user, rating in ((self.user, 5), (self.other, 2)):
+            self.client.force_login(user)
+            self.client.post(reverse('add_flutter', args=[self.schedule.id]), {'rating': rating, 'comment': 'ok'})
+
+        # Akun dihapus: review ikut terhapus lewat CASCADE
+        self.other.delete()
+        stats = self.stats()
+        self.assertEqual((stats.review_count, stats.rating_sum, stats.avg_rating), (1, 5, 5.0))
+        self.assertEqual(stats.histogram, {1: 0, 2: 0, 3: 0, 4: 0, 5: 1})
+
+        # Hapus lewat queryset (mis. admin "delete selected")
+        Review.objects.filter(schedule=self.schedule).delete()
+        stats = self.stats()
+        self.assertEqual((stats.review_count, stats.rating_sum, stats.avg_rating), (0, 0, 0.0))
+
+    def test_landing_sorts_from_stats_without_aggregating_reviews(self):
+        ScheduleRatingStats.apply(self.schedule.id, added=3)
+        ScheduleRatingStats.apply(self.quiet.id, added=5)
+        ScheduleRatingStats.apply(self.schedule.id, added=4)
+
+        data = self.client.get(reverse('json_landing'), {'sort': 'highest_rating'}).json()
+        self.assertEqual([(e['id'], e['avg_rating'], e['review_count']) for e in data],
+                         [(self.quiet.id, 5.0, 1), (self.schedule.id, 3.5, 2)])
+        data = self.client.get(reverse('json_landing'), {'sort': 'most_reviewed'}).json()
+        self.assertEqual([e['id'] for e in data], [self.schedule.id, self.quiet.id])
+
+        response = self.client.get(reverse('review_landing'), {'sort': 'lowest_rating'})
+        self.assertEqual([e.id for e in response.context['event_list']], [self.schedule.id, self.quiet.id])
+
+    def test_detail_uses_stored_aggregates(self):
+        ScheduleRatingStats.apply(self.schedule.id, added=5)
+        ScheduleRatingStats.apply(self.schedule.id, added=4)
+        response = self.client.get(reverse('review_detail', args=[self.schedule.id]))
+        self.assertEqual(response.context['total_reviews'], 2)
+        self.assertEqual(response.context['average_rating'], 4.5)
+
+        summary = self.client.get(reverse('json_detail', args=[self.schedule.id])).json()['rating_summary']
+        self.assertEqual(summary['review_count'], 2)
+        self.assertEqual(summary['histogram']['5'], 1)
+
+        # Schedule tanpa review: agregat kosong, bukan error
+        response = self.client.get(reverse('review_detail', args=[self.quiet.id]))
+        self.assertEqual(response.context['total_reviews'], 0)
+
+    def test_rebuild_command_reconciles_drift(self):
+        Review.objects.create(schedule=self.schedule, reviewer=self.user, rating=5)
+        Review.objects.create(schedule=self.schedule, reviewer=self.other, rating=2)
+        # Agregat basi, mis. review yang diubah lewat SQL langsung
+        ScheduleRatingStats.objects.create(schedule=self.quiet, review_count=3, rating_sum=12, avg_rating=4.0, stars_4=3)
+
+        out = StringIO()
+        call_command('rebuild_rating_stats', batch_size=1, stdout=out)
+        self.assertIn('2 berubah', out.getvalue())
+
+        stats = self.stats()
+        self.assertEqual((stats.review_count, stats.rating_sum, stats.avg_rating), (2, 7, 3.5))
+        self.assertEqual(stats.histogram, {1: 0, 2: 1, 3: 0, 4: 0, 5: 1})
+        self.assertEqual(self.stats(self.quiet).review_count, 0)
+
+
+class ReviewDetailJsonTestCase(TestCase):
+    def setUp(self):
+        self.schedule = Schedule.objects.create(
+            category='Futsal', team1='Fasilkom', team2='FT', location='GOR',
+            date=date(2025, 1, 10), time=time(15, 0), status='reviewable',
+        )
+        self.users = [
+            User.objects.create_user(username=f'user{i}', email=f'user{i}@example.com', password='pass123')
+            for i in range(5)
+        ]
+        User.objects.filter(pk=self.users[0].pk).update(profile_picture='fotoUser/avatar.png')
+        base = timezone.now() - timedelta(days=1)
+        for i, user in enumerate(self.users):
+            Review.objects.create(schedule=self.schedule, reviewer=user, rating=i + 1, comment=f'#{i}')
+            # Dua review terakhir punya created_at sama: urutan ditentukan id.
+            # (Review.id bukan AutoField, jadi pk tidak terisi setelah create.)
+            created = base + timedelta(minutes=min(i, 3))
+            Review.objects.filter(reviewer=user).update(created_at=created, updated_at=created)
+        self.expected = list(Review.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(Review.objects.values('created_at').distinct().count(), 4)
+        self.url = reverse('json_detail', args=[self.schedule.id])
+
+    def test_cursor_pagination_walks_all_reviews_once(self):
+        seen = []
+        params = {'limit': 2}
+        while True:
+            data = self.client.get(self.url, params).json()
+            seen += [r['id'] for r in data['reviews']]
+            if not data['next_cursor']:
+                break
+            params['cursor'] = data['next_cursor']
+        self.assertEqual(seen, self.expected)
+
+    def test_query_count_is_flat(self):
+        with self.assertNumQueries(3):
+            data = self.client.get(self.url, {'limit': 5}).json()
+        self.assertEqual(len(data['reviews']), 5)
+        self.assertIsNone(data['next_cursor'])
+
+    def test_serialization(self):
+        edited = Review.objects.get(reviewer=self.users[1])
+        Review.objects.filter(reviewer=self.users[1]).update(updated_at=edited.created_at + timedelta(minutes=5))
+        self.client.force_login(self.users[2])
+
+        reviews = {r['reviewer']: r for r in self.client.get(self.url).json()['reviews']}
+        self.assertTrue(reviews['user1']['is_edited'])
+        self.assertFalse(reviews['user0']['is_edited'])
+        self.assertTrue(reviews['user2']['is_owner'])
+        self.assertFalse(reviews['user3']['is_owner'])
+        self.assertEqual(reviews['user0']['profile_picture'], 'http://testserver/media/fotoUser/avatar.png')
+        self.assertIsNone(reviews['user1']['profile_picture'])
+
+    def test_without_limit_or_cursor_returns_every_review(self):
+        for i in range(REVIEW_PAGE_SIZE):
+            user = User.objects.create_user(username=f'extra{i}', email=f'extra{i}@example.com', password='pass123')
+            Review.objects.create(schedule=self.schedule, reviewer=user, rating=3)
+        data = self.client.get(self.url).json()
+        self.assertEqual(len(data['reviews']), len(self.users) + REVIEW_PAGE_SIZE)
+        self.assertIsNone(data['next_cursor'])
 
-# Create your tests here.
+    def test_invalid_cursor(self):
+        response = self.client.get(self.url, {'cursor': 'bukan-cursor'})
+        self.assertEqual(response.status_code, 400)
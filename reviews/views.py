@@ -1,14 +1,19 @@
 import json
+from datetime import timedelta
 from django.views.decorators.csrf import csrf_exempt
 from django.urls import reverse
 from django.http import HttpResponseForbidden, JsonResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
-from django.db.models import Avg, Count
+from django.db import transaction
+from django.db.models import BooleanField, ExpressionWrapper, F, Q, Value
+from django.db.models.functions import Coalesce
 
 from scheduling.models import Schedule
 from ticketing.models import Ticket
-from .models import Review
+from main.cursors import aware_datetime, decode_cursor, encode_cursor
+from main.responsive_images import media_variant_url
+from .models import Review, ScheduleRatingStats
 from .forms import ReviewForm
 
 # Halaman utama review (daftar event yang dapat direview)
@@ -25,9 +30,10 @@ def review_landing_page(request):
     order_by_field = valid_sort_options.get(sort_by, '-review_count')
 
     events_to_review = Schedule.objects.filter(status='reviewable').annotate(
-        avg_rating=Avg('review__rating'),
-        review_count=Count('review')
-    ).order_by(order_by_field)
+        # Dari agregat ScheduleRatingStats, bukan Avg/Count atas seluruh tabel review
+        avg_rating=Coalesce(F('rating_stats__avg_rating'), Value(0.0)),
+        review_count=Coalesce(F('rating_stats__review_count'), Value(0)),
+    ).order_by(order_by_field, 'id')
 
     for event in events_to_review:
         avg = event.avg_rating or 0
@@ -50,10 +56,10 @@ def review_detail_page(request, schedule_id):
     schedule = get_object_or_404(Schedule, id=schedule_id)
     reviews = Review.objects.filter(schedule=schedule).select_related('reviewer')
 
-    # Hitung total dan rata-rata rating
-    total_reviews = reviews.count()
-    average_rating = reviews.aggregate(Avg('rating'))['rating__avg'] or 0
-    average_rating = round(average_rating, 1)
+    # Total dan rata-rata rating dari agregat yang sudah tersimpan
+    stats = ScheduleRatingStats.for_schedule(schedule.id)
+    total_reviews = stats.review_count
+    average_rating = round(stats.avg_rating, 1)
     full_stars = int(average_rating)  # jumlah bintang penuh
     half_star = (average_rating - full_stars) >= 0.5  # True kalau ada setengah
     empty_stars = 5 - full_stars - (1 if half_star else 0)
@@ -83,6 +89,7 @@ def review_detail_page(request, schedule_id):
         # 'review_form': form,
         'total_reviews': total_reviews,
         'average_rating': average_rating,
+        'rating_histogram': stats.histogram,
         'full_stars': range(full_stars),
         'half_star': half_star,
         'empty_stars': range(empty_stars),
@@ -114,7 +121,9 @@ def add_review(request, schedule_id):
             review = form.save(commit=False)
             review.schedule = schedule     
             review.reviewer = request.user  
-            review.save()
+            with transaction.atomic():
+                review.save()
+                ScheduleRatingStats.apply(schedule.id, added=review.rating)
             if is_ajax:
                 return JsonResponse({'success': True, 'message': 'Review berhasil ditambahkan!'})
             else:
@@ -138,6 +147,10 @@ def add_review(request, schedule_id):
             template_name = "review_form_fragment.html"
         return render(request, template_name, context)
 
+def _locked_rating(review_id):
+    """Rating tersimpan saat ini, dikunci sampai transaksi selesai (panggil di dalam atomic)."""
+    return Review.objects.select_for_update().values_list('rating', flat=True).get(id=review_id)
+
 @login_required
 def edit_review(request, review_id):
     review = get_object_or_404(Review, id=review_id)
@@ -153,7 +166,12 @@ def edit_review(request, review_id):
     if request.method == 'POST':
         form = ReviewForm(request.POST, instance=review)
         if form.is_valid():
-            form.save()
+            with transaction.atomic():
+                # Rating lama dibaca ulang dengan lock: is_valid() sudah menimpa
+                # review.rating, dan edit paralel tidak boleh memakai nilai basi
+                old_rating = _locked_rating(review.id)
+                form.save()
+                ScheduleRatingStats.apply(schedule.id, added=review.rating, removed=old_rating)
             if is_ajax:
                 return JsonResponse({'success': True, 'message': 'Review berhasil diperbarui!'})
             else:
@@ -188,6 +206,7 @@ def delete_review(request, review_id):
         
     if request.method == 'POST':
         reviewer_name = review.reviewer.username
+        # Agregat dikurangi oleh sinyal post_delete (reviews/signals.py)
         review.delete()
         if is_ajax:
             return JsonResponse({
@@ -212,9 +231,10 @@ def get_review_landing_json(request):
     order_by_field = valid_sort_options.get(sort_by, '-review_count')
 
     events = Schedule.objects.filter(status='reviewable').annotate(
-        avg_rating=Avg('review__rating'),
-        review_count=Count('review')
-    ).order_by(order_by_field)
+        # Dari agregat ScheduleRatingStats, bukan Avg/Count atas seluruh tabel review
+        avg_rating=Coalesce(F('rating_stats__avg_rating'), Value(0.0)),
+        review_count=Coalesce(F('rating_stats__review_count'), Value(0)),
+    ).order_by(order_by_field, 'id')
 
     data = []
     for event in events:
@@ -232,34 +252,71 @@ def get_review_landing_json(request):
         })
     return JsonResponse(data, safe=False)
 
+REVIEW_PAGE_SIZE = 20
+REVIEW_MAX_PAGE_SIZE = 100
+AVATAR_WIDTH = 96
+# Toleransi agar review tidak dianggap diedit saat baru dibuat
+EDIT_TOLERANCE = timedelta(seconds=1)
+
+
 def get_review_detail_json(request, schedule_id):
-    schedule = get_object_or_404(Schedule, id=schedule_id)
-    reviews = Review.objects.filter(schedule=schedule).select_related('reviewer').order_by('-created_at')
-    
+    """
+    GET /review/json/<schedule_id>/ — review terbaru dulu, keyset pagination
+    pada (created_at, id). Query param: limit, cursor (dari next_cursor).
+    Tanpa limit dan cursor semua review dikembalikan, seperti sebelumnya.
+    """
+    schedule = get_object_or_404(
+        Schedule.objects.only('team1', 'team2', 'category', 'location', 'date', 'time'), id=schedule_id
+    )
+    reviews = Review.objects.filter(schedule=schedule).order_by('-created_at', '-id')
+    cursor = request.GET.get('cursor')
+    paginate = bool(cursor or request.GET.get('limit'))
+    try:
+        limit = max(1, min(int(request.GET.get('limit') or REVIEW_PAGE_SIZE), REVIEW_MAX_PAGE_SIZE))
+        if cursor:
+            created_at, review_id = decode_cursor(cursor, aware_datetime, int)
+            reviews = reviews.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=review_id))
+    except ValueError as e:
+        return JsonResponse({"status": "error", "message": str(e)}, status=400)
+
     can_review = False
     if request.user.is_authenticated:
         can_review = Ticket.objects.filter(buyer=request.user, schedule=schedule).exists()
-    
+    stats = ScheduleRatingStats.for_schedule(schedule.id)
+
+    # Satu query: hanya kolom yang dipakai, reviewer lewat JOIN, is_edited dihitung di database
+    rows = reviews.annotate(
+        is_edited=ExpressionWrapper(Q(updated_at__gt=F('created_at') + EDIT_TOLERANCE), output_field=BooleanField()),
+    ).values(
+        'id', 'rating', 'comment', 'created_at', 'is_edited',
+        'reviewer_id', 'reviewer__username', 'reviewer__profile_picture',
+    )
+    if paginate:
+        rows = list(rows[:limit + 1])
+        last = rows[limit - 1] if len(rows) > limit else None
+        next_cursor = encode_cursor(last['created_at'], last['id']) if last else None
+        rows = rows[:limit]
+    else:
+        rows, next_cursor = list(rows), None
+
+    # URL avatar dibangun sekali per foto, bukan build_absolute_uri per review
+    origin = request.build_absolute_uri('/')[:-1]
+    avatars = {}
     reviews_data = []
-    for r in reviews:
-        pfp_url = None
-        if r.reviewer.profile_picture:
-            pfp_url = request.build_absolute_uri(r.reviewer.profile_picture.url)
-        
-        is_edited = False
-        if r.updated_at and r.created_at:
-             # Beri toleransi 1 detik agar tidak dianggap edit saat baru dibuat
-            is_edited = (r.updated_at - r.created_at).total_seconds() > 1
-            
+    for r in rows:
+        picture = r['reviewer__profile_picture']
+        if picture and picture not in avatars:
+            # Avatar cukup varian kecil (WebP), bukan foto upload resolusi penuh
+            avatars[picture] = origin + media_variant_url(picture, AVATAR_WIDTH)
         reviews_data.append({
-            "id": r.id,
-            "reviewer": r.reviewer.username,
-            "rating": r.rating,
-            "comment": r.comment,
-            "created_at": r.created_at.strftime("%d %B %Y"),
-            "is_owner": request.user == r.reviewer,
-            "profile_picture": pfp_url,
-            "is_edited": is_edited,
+            "id": r['id'],
+            "reviewer": r['reviewer__username'],
+            "rating": r['rating'],
+            "comment": r['comment'],
+            "created_at": r['created_at'].strftime("%d %B %Y"),
+            "is_owner": r['reviewer_id'] == request.user.id,
+            "profile_picture": avatars[picture] if picture else None,
+            "is_edited": bool(r['is_edited']),
         })
 
     return JsonResponse({
@@ -272,7 +329,13 @@ def get_review_detail_json(request, schedule_id):
             "time": str(schedule.time),
         },
         "can_review": can_review,
-        "reviews": reviews_data
+        "rating_summary": {
+            "review_count": stats.review_count,
+            "avg_rating": stats.avg_rating,
+            "histogram": stats.histogram,
+        },
+        "reviews": reviews_data,
+        "next_cursor": next_cursor,
     })
 
 @csrf_exempt
@@ -294,12 +357,18 @@ def add_review_flutter(request, schedule_id):
             if not Ticket.objects.filter(buyer=request.user, schedule=schedule).exists():
                  return JsonResponse({"status": "error", "message": "Anda tidak memiliki tiket"}, status=403)
 
-            review = Review.objects.create(
-                schedule=schedule,
-                reviewer=request.user,
-                rating=int(data['rating']),
-                comment=data['comment']
-            )
+            rating = int(data['rating'])
+            if rating not in range(1, 6):
+                return JsonResponse({"status": "error", "message": "Rating harus 1-5"}, status=400)
+
+            with transaction.atomic():
+                review = Review.objects.create(
+                    schedule=schedule,
+                    reviewer=request.user,
+                    rating=rating,
+                    comment=data['comment']
+                )
+                ScheduleRatingStats.apply(schedule.id, added=review.rating)
             return JsonResponse({"status": "success", "message": "Review berhasil ditambahkan!"}, status=200)
         except Exception as e:
             return JsonResponse({"status": "error", "message": str(e)}, status=500)
@@ -316,9 +385,15 @@ def edit_review_flutter(request, review_id):
             if review.reviewer != request.user:
                 return JsonResponse({"status": "error", "message": "Unauthorized"}, status=403)
             
-            review.rating = int(data['rating'])
+            rating = int(data['rating'])
+            if rating not in range(1, 6):
+                return JsonResponse({"status": "error", "message": "Rating harus 1-5"}, status=400)
+            review.rating = rating
             review.comment = data['comment']
-            review.save()
+            with transaction.atomic():
+                old_rating = _locked_rating(review.id)
+                review.save()
+                ScheduleRatingStats.apply(review.schedule_id, added=review.rating, removed=old_rating)
             return JsonResponse({"status": "success", "message": "Review berhasil diubah!"}, status=200)
         except Review.DoesNotExist:
             return JsonResponse({"status": "error", "message": "Review tidak ditemukan"}, status=404)
@@ -2,8 +2,11 @@ from django.http import JsonResponse, HttpResponseForbidden
 from django.shortcuts import get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.http import require_http_methods
-from datetime import datetime
+from django.db.models import Q
+from datetime import datetime, date, time
 from .models import Schedule
+from .search import search_schedule_ids
+from main.cursors import decode_cursor, encode_cursor
 
 def _parse_date(date_str: str):
     """Parse 'YYYY-MM-DD' jadi date Python"""
@@ -59,15 +62,96 @@ def _serialize(schedule: Schedule):
         "organizer": schedule.organizer.username if schedule.organizer else "-",
     }
 
+LIST_PAGE_SIZE = 100
+LIST_MAX_PAGE_SIZE = 500
+
+# Field output -> (kolom .values(), formatter); sama dengan keluaran _serialize
+LIST_FIELDS = {
+    "id": ("id", None),
+    "category": ("category", None),
+    "team1": ("team1", None),
+    "team2": ("team2", None),
+    "location": ("location", None),
+    "date": ("date", _fmt_date),
+    "time": ("time", _fmt_time),
+    "caption": ("caption", lambda v: v or ""),
+    "image_url": ("image_url", lambda v: v or ""),
+    "status": ("status", None),
+    "organizer": ("organizer__username", lambda v: v or "-"),
+}
+
+
 @require_http_methods(["GET"])
 def api_list_schedules(request):
+    """
+    Daftar jadwal (kecuali reviewable), keyset pagination pada (date, time, id).
+    Query param: filter=mine, limit, cursor, fields=id,category,... (default semua).
+    Tanpa limit dan cursor semua jadwal dikembalikan (next_cursor null), sama
+    seperti sebelum ada pagination.
+    """
     f = request.GET.get("filter", "all")
-    qs = Schedule.objects.exclude(status='reviewable').order_by("date", "time")
+    qs = Schedule.objects.exclude(status='reviewable').order_by("date", "time", "id")
     if f == "mine" and request.user.is_authenticated:
         qs = qs.filter(organizer=request.user)
 
-    items = [_serialize(s) for s in qs]
-    return JsonResponse({"ok": True, "count": len(items), "items": items})
+    fields = [name for name in request.GET.get("fields", "").split(",") if name] or list(LIST_FIELDS)
+    unknown = [name for name in fields if name not in LIST_FIELDS]
+    if unknown:
+        return JsonResponse({"ok": False, "error": f"Field tidak dikenal: {', '.join(unknown)}"}, status=400)
+
+    cursor = request.GET.get("cursor")
+    paginate = bool(cursor or request.GET.get("limit"))
+    try:
+        limit = max(1, min(int(request.GET.get("limit") or LIST_PAGE_SIZE), LIST_MAX_PAGE_SIZE))
+        if cursor:
+            d, t, schedule_id = decode_cursor(cursor, date.fromisoformat, time.fromisoformat, int)
+            qs = qs.filter(
+                Q(date__gt=d) | Q(date=d, time__gt=t) | Q(date=d, time=t, id__gt=schedule_id)
+            )
+    except ValueError as e:
+        return JsonResponse({"ok": False, "error": str(e)}, status=400)
+
+    # .values() hanya mengambil kolom yang diminta; organizer lewat JOIN, bukan query per baris
+    columns = {"id", "date", "time"} | {LIST_FIELDS[name][0] for name in fields}
+    if paginate:
+        rows = list(qs.values(*columns)[:limit + 1])
+        last = rows[limit - 1] if len(rows) > limit else None
+        next_cursor = encode_cursor(last["date"], last["time"], last["id"]) if last else None
+        rows = rows[:limit]
+    else:
+        rows, next_cursor = list(qs.values(*columns)), None
+
+    items = []
+    for row in rows:
+        item = {}
+        for name in fields:
+            column, fmt = LIST_FIELDS[name]
+            item[name] = fmt(row[column]) if fmt else row[column]
+        items.append(item)
+    return JsonResponse({"ok": True, "count": len(items), "items": items, "next_cursor": next_cursor})
+
+
+SEARCH_PAGE_SIZE = 20
+SEARCH_MAX_PAGE_SIZE = 100
+
+
+@require_http_methods(["GET"])
+def api_search_schedules(request):
+    """
+    Cari jadwal berdasarkan tim, kategori, atau lokasi (?q=fasilkom futsal).
+    Hasil terurut relevansi, dipaginasi dengan ?page= dan ?limit=.
+    """
+    query = request.GET.get("q", "").strip()
+    try:
+        page = max(1, int(request.GET.get("page") or 1))
+        limit = max(1, min(int(request.GET.get("limit") or SEARCH_PAGE_SIZE), SEARCH_MAX_PAGE_SIZE))
+    except ValueError:
+        return JsonResponse({"ok": False, "error": "page/limit harus berupa angka."}, status=400)
+
+    ids, has_next = search_schedule_ids(query, limit, offset=(page - 1) * limit)
+    schedules = Schedule.objects.select_related("organizer").in_bulk(ids)
+    items = [_serialize(schedules[i]) for i in ids if i in schedules]
+    return JsonResponse({"ok": True, "q": query, "page": page, "has_next": has_next, "count": len(items), "items": items})
 
 
 @login_required
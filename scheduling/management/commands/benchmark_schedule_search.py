@@ -0,0 +1,79 @@
+import random
+import time
+from datetime import date, time as dtime, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from scheduling.models import Schedule
+from scheduling.search import naive_search, search_schedule_ids
+
+FACULTIES = ['FASILKOM', 'FT', 'FK', 'FKG', 'FF', 'FMIPA', 'FH', 'FEB', 'FIB', 'FPSI', 'FISIP', 'FIA', 'FKM', 'FIK', 'VOKASI']
+CATEGORIES = ['FUTSAL', 'BASKET', 'SEPAK BOLA', 'VALORANT', 'TENIS LAPANGAN', 'VOLI', 'HOCKEY', 'TENIS MEJA', 'BADMINTON', 'MLBB']
+LOCATIONS = ['SOR', 'GOR', 'Balairung', 'Stadion UI', 'Pusgiwa', 'Lapangan FT']
+# Tim tamu & venue yang jarang muncul: di sinilah scan icontains paling mahal
+GUEST_TEAMS = ['UNIVERSITAS PERTAHANAN', 'POLITEKNIK JAKARTA', 'ITB GANESHA']
+GUEST_VENUES = ['Lapangan Rektorat', 'Hall Asrama']
+GUEST_EVERY = 2000
+QUERIES = [
+    'fasilkom', 'futsal ft', 'tenis meja', 'basket gor', 'fmipa voli', 'balairung',
+    'pertahanan', 'ganesha basket', 'rektorat', 'asrama voli',
+]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark pencarian jadwal berindex (FTS5/trigram) vs icontains pada data sintetis (di-rollback)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100_000)
+        parser.add_argument('--repeat', type=int, default=5,
+                            help='Berapa kali setiap query diulang (default: 5)')
+        parser.add_argument('--limit', type=int, default=20)
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        limit = options['limit']
+        rng = random.Random(42)
+
+        with transaction.atomic():
+            start = time.perf_counter()
+            Schedule.objects.bulk_create((
+                Schedule(
+                    category=rng.choice(CATEGORIES),
+                    team1=rng.choice(FACULTIES),
+                    team2=rng.choice(GUEST_TEAMS) if i % GUEST_EVERY == 0 else rng.choice(FACULTIES),
+                    location=rng.choice(GUEST_VENUES) if i % GUEST_EVERY == 1 else rng.choice(LOCATIONS),
+                    date=date(2024, 1, 1) + timedelta(days=rng.randrange(730)),
+                    time=dtime(rng.randrange(7, 22), 0),
+                )
+                for i in range(rows)
+            ), batch_size=2000)
+            self.stdout.write(f'{rows} jadwal sintetis dibuat dalam {time.perf_counter() - start:.1f} detik ({connection.vendor}).')
+
+            indexed_total = naive_total = 0.0
+            for query in QUERIES:
+                indexed = self._time(lambda: search_schedule_ids(query, limit), options['repeat'])
+                naive = self._time(lambda: list(naive_search(query).values_list('id', flat=True)[:limit]), options['repeat'])
+                matches = naive_search(query).count()
+                indexed_total += indexed
+                naive_total += naive
+                self.stdout.write(
+                    f'  {query!r:<18} {matches:>6} cocok | index (ranked) {indexed * 1000:8.2f} ms '
+                    f'| icontains (tanpa ranking) {naive * 1000:8.2f} ms'
+                )
+
+            self.stdout.write(self.style.SUCCESS(
+                f'Rata-rata: index {indexed_total / len(QUERIES) * 1000:.2f} ms, '
+                f'icontains {naive_total / len(QUERIES) * 1000:.2f} ms per query.'
+            ))
+            # Data sintetis tidak disimpan
+            transaction.set_rollback(True)
+
+    @staticmethod
+    def _time(fn, repeat):
+        best = float('inf')
+        for _ in range(max(1, repeat)):
+            start = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - start)
+        return best
@@ -0,0 +1,16 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from scheduling.models import Schedule
+
+
+class Command(BaseCommand):
+    help = "Ubah jadwal 'upcoming' yang sudah lewat menjadi 'completed' (jalankan berkala lewat cron)"
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        updated = Schedule.complete_past()
+        self.stdout.write(self.style.SUCCESS(
+            f'{updated} jadwal ditandai completed ({(time.perf_counter() - start) * 1000:.1f} ms).'
+        ))
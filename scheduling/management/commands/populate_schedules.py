@@ -1,8 +1,12 @@
 import csv
 import os
-from django.core.management.base import BaseCommand
+import time
+from django.core.management.base import BaseCommand, CommandError
 from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
 from scheduling.models import Schedule
+from scheduling.signals import schedules_bulk_updated
 from datetime import datetime
 from django.utils.dateparse import parse_date, parse_time
 
@@ -45,77 +49,142 @@ IMAGE_MAP = {
 }
 
 class Command(BaseCommand):
-    help = 'Populate Schedule table from static/csv/schedule.csv'
+    help = (
+        'Muat Schedule dari static/csv/schedule.csv. Default: upsert berdasarkan '
+        '(kategori, tim1, tim2, tanggal, jam) per batch dalam satu transaksi; '
+        '--replace untuk perilaku lama (hapus semua lalu buat ulang).'
+    )
 
-    def handle(self, *args, **options):
-        # Hapus data lama (opsional, tapi bagus untuk testing)
-        self.stdout.write('Menghapus data Schedule lama...')
-        Schedule.objects.all().delete()
-
-        # Path ke file CSV
-        csv_file_path = os.path.join(settings.BASE_DIR, 'static', 'csv', 'schedule.csv')
+    def add_arguments(self, parser):
+        parser.add_argument('--file', dest='csv_path',
+                            help='Path CSV (default: static/csv/schedule.csv)')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Hitung perubahan tanpa menulis ke database')
+        parser.add_argument('--replace', action='store_true',
+                            help='Hapus SEMUA Schedule (beserta tiket & review) sebelum memuat')
 
+    def handle(self, *args, **options):
+        csv_file_path = options['csv_path'] or os.path.join(settings.BASE_DIR, 'static', 'csv', 'schedule.csv')
         if not os.path.exists(csv_file_path):
-            self.stderr.write(self.style.ERROR(f'File CSV tidak ditemukan di: {csv_file_path}'))
-            return
+            raise CommandError(f'File CSV tidak ditemukan di: {csv_file_path}')
+
+        batch_size = max(1, options['batch_size'])
+        dry_run = options['dry_run']
+        self.counts = {'created': 0, 'updated': 0, 'unchanged': 0, 'invalid': 0, 'duplicate': 0}
+        self.seen = set()
+        start = time.perf_counter()
 
         self.stdout.write('Mulai memuat data jadwal...')
+        with transaction.atomic():
+            if options['replace'] and not dry_run:
+                self.stdout.write('Menghapus data Schedule lama...')
+                Schedule.objects.all().delete()
 
-        try:
-            with open(csv_file_path, mode='r', encoding='utf-8') as file:
-                # Gunakan DictReader agar bisa panggil kolom by nama (cth: row['Kategori'])
+            with open(csv_file_path, mode='r', encoding='utf-8', newline='') as file:
+                # Dibaca baris demi baris; hanya satu batch yang ada di memori
                 reader = csv.DictReader(file)
-                
-                count = 0
+                batch = []
                 for row in reader:
-                    # Bersihkan nama kategori (hapus spasi, uppercase)
-                    # Ini penting, karena di CSV ada "BASKET " (dengan spasi)
-                    kategori_csv = row['Kategori'].strip().upper()
-                    # Menangani kasus seperti "TENIS MEJA"
-                    kategori_csv = ' '.join(kategori_csv.split())
-
-                    # --- [INI BAGIAN PENTING YANG DIMODIFIKASI] ---
-                    
-                    # 1. Dapatkan path file gambar dari IMAGE_MAP
-                    #    Gunakan .get() untuk fallback ke 'DEFAULT' jika kategori tidak ada di map
-                    image_file_path = IMAGE_MAP.get(kategori_csv, IMAGE_MAP['DEFAULT'])
-                    
-                    # 2. Buat URL statis lengkap (cth: /static/images/futsal.png)
-                    #    Ini yang akan disimpan di model URLField
-                    gambar_url = static(image_file_path)
-                    
-                    # ----------------------------------------------
-
-                    # Konversi tanggal dan jam
-                    # Format di CSV: DD-MM-YYYY
-                    try:
-                        tanggal = datetime.strptime(row['Tanggal'], '%d-%m-%Y').date()
-                    except ValueError:
-                        self.stderr.write(f"Format tanggal salah di baris {reader.line_num}: {row['Tanggal']}")
-                        continue
-                        
-                    # Format di CSV: HH.MM-HH.MM (kita ambil jam mulainya)
-                    try:
-                        jam_mulai_str = row['Jam'].split('-')[0].strip().replace('.', ':')
-                        jam = parse_time(jam_mulai_str)
-                    except (IndexError, ValueError):
-                        self.stderr.write(f"Format jam salah di baris {reader.line_num}: {row['Jam']}")
+                    parsed = self._parse_row(row, reader.line_num)
+                    if parsed is None:
                         continue
+                    batch.append(parsed)
+                    if len(batch) >= batch_size:
+                        self._upsert(batch, dry_run)
+                        batch = []
+                if batch:
+                    self._upsert(batch, dry_run)
+
+            if dry_run:
+                transaction.set_rollback(True)
+            elif self.counts['created'] or self.counts['updated']:
+                # bulk_create/bulk_update tidak memicu post_save
+                transaction.on_commit(lambda: schedules_bulk_updated.send(
+                    sender=Schedule, count=self.counts['created'] + self.counts['updated']
+                ))
+
+        c = self.counts
+        note = ' (dry run, tidak ada yang disimpan)' if dry_run else ''
+        self.stdout.write(self.style.SUCCESS(
+            f"Selesai{note}: {c['created']} dibuat, {c['updated']} diperbarui, "
+            f"{c['unchanged']} tidak berubah, {c['duplicate']} duplikat dan {c['invalid']} baris tidak valid dilewati "
+            f"({time.perf_counter() - start:.2f} detik)."
+        ))
+
+    @staticmethod
+    def _category(value):
+        # Bersihkan nama kategori (hapus spasi, uppercase), mis. "BASKET " / "TENIS  MEJA"
+        return ' '.join((value or '').strip().upper().split())
+
+    def _parse_row(self, row, line_num):
+        """Baris CSV -> dict field Schedule, atau None (dicatat sebagai invalid/duplikat)."""
+        kategori_csv = self._category(row.get('Kategori'))
+
+        # Format di CSV: DD-MM-YYYY
+        try:
+            tanggal = datetime.strptime((row.get('Tanggal') or '').strip(), '%d-%m-%Y').date()
+        except ValueError:
+            self.stderr.write(f"Format tanggal salah di baris {line_num}: {row.get('Tanggal')}")
+            self.counts['invalid'] += 1
+            return None
+
+        # Format di CSV: HH.MM-HH.MM (kita ambil jam mulainya)
+        try:
+            jam = parse_time((row.get('Jam') or '').split('-')[0].strip().replace('.', ':'))
+        except ValueError:
+            jam = None
+        if jam is None or not kategori_csv:
+            self.stderr.write(f"Format jam/kategori salah di baris {line_num}: {row.get('Jam')}")
+            self.counts['invalid'] += 1
+            return None
+
+        fields = {
+            'category': kategori_csv,
+            'team1': (row.get('Tim1') or '').strip(),
+            'team2': (row.get('Tim2') or '').strip(),
+            'location': (row.get('Lokasi') or '').strip(),
+            'date': tanggal,
+            'time': jam,
+            # URL statis lengkap (cth: /static/images/futsal.png), fallback ke DEFAULT
+            'image_url': static(IMAGE_MAP.get(kategori_csv, IMAGE_MAP['DEFAULT'])),
+        }
+        key = self._key(fields['category'], fields['team1'], fields['team2'], fields['date'], fields['time'])
+        if key in self.seen:
+            self.counts['duplicate'] += 1
+            return None
+        self.seen.add(key)
+        return fields
+
+    def _key(self, category, team1, team2, date, time):
+        """Natural key jadwal: (kategori ternormalisasi, tim1, tim2, tanggal, jam)."""
+        return (self._category(category), team1, team2, date, time)
+
+    def _upsert(self, batch, dry_run):
+        """Satu query lookup + bulk_create + bulk_update untuk satu batch."""
+        existing = {}
+        candidates = Schedule.objects.filter(date__in={row['date'] for row in batch}).only(
+            'id', 'category', 'team1', 'team2', 'date', 'time', 'location', 'image_url'
+        )
+        for s in candidates:
+            existing.setdefault(self._key(s.category, s.team1, s.team2, s.date, s.time), s)
+
+        now = timezone.now()
+        to_create, to_update = [], []
+        for row in batch:
+            schedule = existing.get(self._key(row['category'], row['team1'], row['team2'], row['date'], row['time']))
+            if schedule is None:
+                to_create.append(Schedule(**row))
+            elif (schedule.location, schedule.image_url) != (row['location'], row['image_url']):
+                schedule.location = row['location']
+                schedule.image_url = row['image_url']
+                schedule.updated_at = now
+                to_update.append(schedule)
+            else:
+                self.counts['unchanged'] += 1
 
-                    # Buat atau update objek Schedule
-                    Schedule.objects.create(
-                        category=kategori_csv, # Simpan nama kategori yang sudah bersih
-                        team1=row['Tim1'].strip(),
-                        team2=row['Tim2'].strip(),
-                        location=row['Lokasi'].strip(),
-                        date=tanggal,
-                        time=jam,
-                        image_url=gambar_url,  # <-- [TAMBAHKAN INI] Simpan URL gambar
-                        # 'organizer' bisa null/kosong jika script ini tidak punya user
-                    )
-                    count += 1
-
-            self.stdout.write(self.style.SUCCESS(f'Berhasil! {count} jadwal pertandingan telah dimuat.'))
-
-        except Exception as e:
-            self.stderr.write(self.style.ERROR(f'Terjadi error: {e}'))
\ No newline at end of file
+        if not dry_run:
+            Schedule.objects.bulk_create(to_create, batch_size=500)
+            Schedule.objects.bulk_update(to_update, ['location', 'image_url', 'updated_at'], batch_size=500)
+        self.counts['created'] += len(to_create)
+        self.counts['updated'] += len(to_update)
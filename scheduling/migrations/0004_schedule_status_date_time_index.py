@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:39
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduling', '0003_schedule_updated_at_date_time_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='schedule',
+            index=models.Index(fields=['status', 'date', 'time'], name='scheduling__status_14de87_idx'),
+        ),
+    ]
@@ -0,0 +1,81 @@
+from django.db import migrations
+
+FTS_TABLE = 'scheduling_schedule_fts'
+TRGM_INDEX = 'scheduling_schedule_search_trgm'
+PG_DOCUMENT = "(team1 || ' ' || team2 || ' ' || category || ' ' || location)"
+
+
+class VendorRunSQL(migrations.RunSQL):
+    """RunSQL yang hanya dijalankan (maju maupun mundur) di database `vendor`."""
+
+    def __init__(self, vendor, *args, **kwargs):
+        self.vendor = vendor
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, args, kwargs = super().deconstruct()
+        return name, [self.vendor, *args], kwargs
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == self.vendor:
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == self.vendor:
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+# Index pencarian untuk scheduling/search.py. Catatan SQLite: migrasi yang
+# me-remake tabel scheduling_schedule (mis. AlterField) ikut membuang trigger
+# di bawah, jadi migrasi seperti itu harus menjalankan ulang SQLITE_FORWARDS.
+SQLITE_FORWARDS = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        team1, team2, category, location,
+        content='scheduling_schedule', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON scheduling_schedule BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, team1, team2, category, location)
+        VALUES (new.id, new.team1, new.team2, new.category, new.location);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON scheduling_schedule BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, team1, team2, category, location)
+        VALUES ('delete', old.id, old.team1, old.team2, old.category, old.location);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au
+        AFTER UPDATE OF team1, team2, category, location ON scheduling_schedule BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, team1, team2, category, location)
+        VALUES ('delete', old.id, old.team1, old.team2, old.category, old.location);
+        INSERT INTO {FTS_TABLE}(rowid, team1, team2, category, location)
+        VALUES (new.id, new.team1, new.team2, new.category, new.location);
+    END""",
+    # Isi index dari jadwal yang sudah ada
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+SQLITE_BACKWARDS = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_au",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ai",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+PG_FORWARDS = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    f"CREATE INDEX IF NOT EXISTS {TRGM_INDEX} ON scheduling_schedule USING gin ({PG_DOCUMENT} gin_trgm_ops)",
+]
+# Extension pg_trgm sengaja tidak di-drop: bisa dipakai objek lain di database
+PG_BACKWARDS = [
+    f"DROP INDEX IF EXISTS {TRGM_INDEX}",
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduling', '0004_schedule_status_date_time_index'),
+    ]
+
+    operations = [
+        VendorRunSQL('sqlite', SQLITE_FORWARDS, SQLITE_BACKWARDS),
+        VendorRunSQL('postgresql', PG_FORWARDS, PG_BACKWARDS),
+    ]
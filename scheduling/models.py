@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
 from datetime import datetime
 from django.contrib.auth.models import User  #  pakai user bawaan Django
@@ -30,16 +30,44 @@ class Schedule(models.Model):
     image_url = models.URLField(blank=True, null=True)  
     caption = models.TextField(null=True, blank=True)
 
+    # Diperbarui otomatis setiap save(); dipakai untuk Last-Modified/ETag feed.
+    # Update massal lewat queryset.update() harus mengisi field ini sendiri.
+    updated_at = models.DateTimeField(auto_now=True)
+
     class Meta:
         ordering = ['date', 'time']
+        indexes = [
+            # Range query kalender (schedule_feed ?start=&end=)
+            models.Index(fields=['date', 'time']),
+            # Transisi massal upcoming -> completed (complete_past)
+            models.Index(fields=['status', 'date', 'time']),
+        ]
 
     def __str__(self):
         return f"{self.category}: {self.team1} vs {self.team2} ({self.date})"
 
     # === Helper Methods ===
     def get_datetime(self):
-        """Gabungkan tanggal dan waktu menjadi datetime Python."""
-        return datetime.combine(self.date, self.time)
+        """Gabungkan tanggal dan waktu (zona waktu lokal) menjadi datetime aware."""
+        return timezone.make_aware(datetime.combine(self.date, self.time))
+
+    @classmethod
+    def complete_past(cls, now=None):
+        """
+        Ubah semua jadwal 'upcoming' yang waktunya sudah lewat menjadi
+        'completed' dengan satu UPDATE (index status, date, time). Tanggal/jam
+        disimpan sebagai waktu lokal (TIME_ZONE), jadi pembandingnya juga
+        waktu lokal. Return jumlah jadwal yang berubah.
+        """
+        from .signals import schedules_bulk_updated
+
+        now = timezone.localtime(now)
+        updated = cls.objects.filter(status='upcoming').filter(
+            models.Q(date__lt=now.date()) | models.Q(date=now.date(), time__lt=now.time())
+        ).update(status='completed', updated_at=timezone.now())
+        if updated:
+            transaction.on_commit(lambda: schedules_bulk_updated.send(sender=cls, count=updated))
+        return updated
 
     def mark_completed(self):
         """Tandai event sebagai 'completed' jika sudah lewat waktunya."""
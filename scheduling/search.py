@@ -0,0 +1,77 @@
+"""
+Pencarian jadwal (team1, team2, category, location).
+
+- SQLite  : tabel virtual FTS5 `scheduling_schedule_fts` (external content)
+            yang disinkronkan trigger INSERT/UPDATE/DELETE, diurutkan bm25.
+- Postgres: index GIN trigram (pg_trgm) pada gabungan keempat kolom,
+            ILIKE per kata, diurutkan similarity().
+- Lainnya : fallback icontains (tanpa index).
+
+Tabel FTS, trigger dan index trigram dibuat oleh migrasi
+0005_schedule_search_index. Sinkronisasi lewat trigger juga mencakup
+bulk_create/queryset.update().
+"""
+import re
+
+from django.db import connection
+from django.db.models import Q
+
+from .models import Schedule
+
+FTS_TABLE = 'scheduling_schedule_fts'
+SEARCH_COLUMNS = ('team1', 'team2', 'category', 'location')
+# Bobot bm25 per kolom (urutan SEARCH_COLUMNS): nama tim paling penting
+BM25_WEIGHTS = (3.0, 3.0, 1.0, 1.0)
+
+_PG_DOCUMENT = "(team1 || ' ' || team2 || ' ' || category || ' ' || location)"
+
+
+def _terms(query):
+    return re.findall(r'\w+', query or '')[:8]
+
+
+def search_schedule_ids(query, limit, offset=0):
+    """
+    Id jadwal yang cocok dengan semua kata di `query` (prefix match),
+    terurut dari yang paling relevan. Return (ids, has_more).
+    """
+    terms = _terms(query)
+    if not terms:
+        return [], False
+
+    if connection.vendor == 'sqlite':
+        match = ' '.join(f'"{term}"*' for term in terms)
+        weights = ', '.join(str(w) for w in BM25_WEIGHTS)
+        sql = (
+            f"SELECT s.id FROM {FTS_TABLE} f JOIN scheduling_schedule s ON s.id = f.rowid "
+            f"WHERE {FTS_TABLE} MATCH %s "
+            f"ORDER BY bm25({FTS_TABLE}, {weights}), s.date, s.time, s.id LIMIT %s OFFSET %s"
+        )
+        params = [match, limit + 1, offset]
+    elif connection.vendor == 'postgresql':
+        # kata hanya berisi \w, jadi satu-satunya wildcard LIKE yang mungkin muncul adalah '_'
+        patterns = ['%' + term.replace('_', r'\_') + '%' for term in terms]
+        sql = (
+            f"SELECT id FROM scheduling_schedule WHERE {_PG_DOCUMENT} ILIKE ALL(%s) "
+            f"ORDER BY similarity({_PG_DOCUMENT}, %s) DESC, date, time, id LIMIT %s OFFSET %s"
+        )
+        params = [patterns, ' '.join(terms), limit + 1, offset]
+    else:
+        ids = list(naive_search(query).values_list('id', flat=True)[offset:offset + limit + 1])
+        return ids[:limit], len(ids) > limit
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        ids = [row[0] for row in cursor.fetchall()]
+    return ids[:limit], len(ids) > limit
+
+
+def naive_search(query):
+    """Pembanding tanpa index: setiap kata harus muncul (icontains) di salah satu kolom."""
+    schedules = Schedule.objects.all()
+    for term in _terms(query):
+        condition = Q()
+        for column in SEARCH_COLUMNS:
+            condition |= Q(**{f'{column}__icontains': term})
+        schedules = schedules.filter(condition)
+    return schedules.order_by('date', 'time', 'id')
@@ -0,0 +1,6 @@
+from django.dispatch import Signal
+
+# Dikirim setelah perubahan massal lewat queryset.update() (yang tidak memicu
+# post_save), supaya cache daftar jadwal di app lain ikut di-invalidasi.
+# kwargs: count (jumlah baris yang berubah)
+schedules_bulk_updated = Signal()
@@ -1,14 +1,23 @@
 import json
 import pytest
 from datetime import datetime, date, time
+from io import StringIO
 
 from django.urls import reverse
 from django.utils import timezone
 from django.contrib.auth import get_user_model
 from django.test import RequestFactory
+from django.core.management import call_command
+from django.db import connection
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
 
 from scheduling.models import Schedule
 from scheduling import views as v
+from scheduling.search import search_schedule_ids
+from main.views import SCHEDULES_JSON_KEY
+from ticketing.cache import SCHEDULES_VERSION_KEY, schedules_version
+from ticketing.models import Ticket
 
 
 @pytest.fixture
@@ -286,3 +295,299 @@ def test_schedule_detail_view_returns_200(monkeypatch, rf, user):
     res = v.schedule_detail(req, s.id)
     data = res.json()
     assert data["id"] == s.id
+
+
+@pytest.mark.django_db
+def test_schedule_feed_range_and_filters(client, user):
+    mk_sched(category="Futsal", location="SOR", date=date(2025, 1, 10), team1="In")
+    mk_sched(category="Futsal", location="GOR", date=date(2025, 1, 20), team1="OtherLoc")
+    mk_sched(category="Basket", location="SOR", date=date(2025, 1, 15), team1="OtherCat")
+    mk_sched(category="Futsal", location="SOR", date=date(2025, 2, 3), team1="After")
+    url = reverse("scheduling:schedule_feed")
+
+    res = client.get(url, {"start": "2025-01-01T00:00:00+07:00", "end": "2025-02-01T00:00:00+07:00"})
+    titles = sorted(item["title"] for item in res.json())
+    assert titles == ["Basket: OtherCat vs B", "Futsal: In vs B", "Futsal: OtherLoc vs B"]
+
+    res = client.get(url, {"start": "2025-01-01", "end": "2025-02-05", "category": "futsal", "location": "SOR"})
+    assert [item["title"] for item in res.json()] == ["Futsal: In vs B", "Futsal: After vs B"]
+
+    assert client.get(url, {"start": "kemarin"}).status_code == 400
+
+
+@pytest.mark.django_db
+def test_schedule_feed_conditional_get(client, user, django_assert_num_queries):
+    s = mk_sched(date=date(2025, 3, 1))
+    mk_sched(date=date(2025, 3, 2))
+    url = reverse("scheduling:schedule_feed")
+    params = {"start": "2025-03-01", "end": "2025-04-01"}
+
+    first = client.get(url, params)
+    etag = first["ETag"]
+    assert first["Last-Modified"]
+
+    with django_assert_num_queries(1):
+        cached = client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+    assert cached.status_code == 304
+    assert client.get(url, params, HTTP_IF_MODIFIED_SINCE=first["Last-Modified"]).status_code == 304
+
+    s.caption = "berubah"
+    s.save()
+    changed = client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+    assert changed.status_code == 200 and changed["ETag"] != etag
+
+    s.delete()
+    after_delete = client.get(url, params, HTTP_IF_NONE_MATCH=changed["ETag"])
+    assert after_delete.status_code == 200 and len(after_delete.json()) == 1
+
+
+@pytest.mark.django_db
+def test_api_list_schedules_query_count_is_constant(client, user, other_user, django_assert_num_queries):
+    url = reverse("scheduling:api_list_schedules")
+    mk_sched(organizer=user)
+    with django_assert_num_queries(1):
+        small = client.get(url).json()
+    for i in range(30):
+        mk_sched(organizer=user if i % 2 else other_user, team1=f"T{i}")
+    with django_assert_num_queries(1):
+        large = client.get(url).json()
+    assert small["count"] == 1 and large["count"] == 31
+    assert {item["organizer"] for item in large["items"]} == {"u1", "u2"}
+
+
+@pytest.mark.django_db
+def test_api_list_schedules_cursor_pagination(client, user):
+    day = date(2025, 5, 1)
+    created = [mk_sched(organizer=user, date=day, time=time(8 + i % 3, 0), team1=f"T{i}") for i in range(7)]
+    expected = [s.id for s in sorted(created, key=lambda s: (s.date, s.time, s.id))]
+    url = reverse("scheduling:api_list_schedules")
+
+    ids, cursor, pages = [], None, 0
+    while True:
+        params = {"limit": 3, **({"cursor": cursor} if cursor else {})}
+        data = client.get(url, params).json()
+        ids += [item["id"] for item in data["items"]]
+        cursor = data["next_cursor"]
+        pages += 1
+        if not cursor:
+            break
+    assert ids == expected and pages == 3
+    assert client.get(url, {"cursor": "rusak"}).status_code == 400
+
+
+@pytest.mark.django_db
+def test_api_list_schedules_without_limit_returns_everything(client, user, monkeypatch):
+    from scheduling import api_views
+    monkeypatch.setattr(api_views, "LIST_PAGE_SIZE", 2)
+    for i in range(5):
+        mk_sched(organizer=user, team1=f"T{i}")
+    url = reverse("scheduling:api_list_schedules")
+    data = client.get(url).json()
+    assert data["count"] == 5 and data["next_cursor"] is None
+    assert client.get(url, {"cursor": ""}).json()["count"] == 5
+
+
+@pytest.mark.django_db
+def test_api_list_schedules_fields_projection(client, user, django_assert_num_queries):
+    mk_sched(organizer=user, caption=None)
+    url = reverse("scheduling:api_list_schedules")
+    with django_assert_num_queries(1) as ctx:
+        data = client.get(url, {"fields": "id,category,caption"}).json()
+    assert data["items"][0].keys() == {"id", "category", "caption"}
+    assert data["items"][0]["caption"] == ""
+    assert "users_user" not in ctx.captured_queries[0]["sql"]
+    assert client.get(url, {"fields": "id,password"}).status_code == 400
+
+
+@pytest.mark.django_db
+def test_complete_past_flips_only_past_upcoming_in_local_time(django_assert_num_queries):
+    # 08:30 WIB = 01:30 UTC; tanggal/jam jadwal disimpan dalam waktu lokal
+    now = timezone.make_aware(datetime(2025, 6, 10, 8, 30))
+    earlier_today = mk_sched(date=date(2025, 6, 10), time=time(8, 0))
+    later_today = mk_sched(date=date(2025, 6, 10), time=time(9, 0))
+    yesterday = mk_sched(date=date(2025, 6, 9), time=time(23, 0))
+    tomorrow = mk_sched(date=date(2025, 6, 11), time=time(0, 30))
+    reviewable = mk_sched(date=date(2025, 6, 1), status="reviewable")
+
+    with django_assert_num_queries(1):
+        assert Schedule.complete_past(now=now) == 2
+
+    statuses = dict(Schedule.objects.values_list("id", "status"))
+    assert statuses[earlier_today.id] == "completed"
+    assert statuses[yesterday.id] == "completed"
+    assert statuses[later_today.id] == "upcoming"
+    assert statuses[tomorrow.id] == "upcoming"
+    assert statuses[reviewable.id] == "reviewable"
+    assert Schedule.objects.get(id=yesterday.id).updated_at > yesterday.updated_at
+
+
+@pytest.mark.django_db
+def test_complete_past_command_invalidates_schedule_caches(django_capture_on_commit_callbacks):
+    mk_sched(date=date(2020, 1, 1))
+    before = schedules_version()
+    out = StringIO()
+    with django_capture_on_commit_callbacks(execute=True):
+        call_command("complete_past_schedules", stdout=out)
+    assert "1 jadwal ditandai completed" in out.getvalue()
+    assert schedules_version() != before
+
+
+@pytest.fixture
+def worker_cache():
+    """Instance cache terpisah, seperti yang dilihat worker web lain saat cron berjalan."""
+    cache.clear()
+    other = caches.create_connection("default")
+    assert other is not cache
+    assert not isinstance(other, LocMemCache)  # cache per proses tidak melihat bump dari cron
+    yield other
+    cache.clear()
+
+
+@pytest.mark.django_db
+def test_complete_past_command_invalidates_listing_for_other_workers(client, worker_cache, django_capture_on_commit_callbacks):
+    past = mk_sched(team1="LAMA", date=date(2020, 1, 1))
+    mk_sched(team1="BARU", date=date(2999, 1, 1))
+    assert [s["team1"] for s in client.get(reverse("get_schedules_json")).json()] == ["LAMA", "BARU"]
+    cached_version, _ = worker_cache.get(SCHEDULES_JSON_KEY)
+    assert worker_cache.get(SCHEDULES_VERSION_KEY) == cached_version
+
+    with django_capture_on_commit_callbacks(execute=True):
+        call_command("complete_past_schedules", stdout=StringIO())
+
+    assert worker_cache.get(SCHEDULES_VERSION_KEY) != cached_version
+    assert [s["team1"] for s in client.get(reverse("get_schedules_json")).json()] == ["BARU"]
+    assert worker_cache.get(SCHEDULES_JSON_KEY)[0] == worker_cache.get(SCHEDULES_VERSION_KEY)
+    assert Schedule.objects.get(id=past.id).status == "completed"
+
+
+@pytest.mark.django_db
+def test_populate_schedules_invalidates_listing_for_other_workers(tmp_path, client, worker_cache,
+                                                                  django_capture_on_commit_callbacks):
+    assert client.get(reverse("get_schedules_json")).json() == []
+    cached_version, _ = worker_cache.get(SCHEDULES_JSON_KEY)
+
+    path = _write_schedule_csv(tmp_path, [("FUTSAL", "FPSI", "FIA", "SOR", "01-11-2999", "19.00-20.00")])
+    with django_capture_on_commit_callbacks(execute=True):
+        call_command("populate_schedules", file=path, stdout=StringIO(), stderr=StringIO())
+
+    assert worker_cache.get(SCHEDULES_VERSION_KEY) != cached_version
+    assert [s["team1"] for s in client.get(reverse("get_schedules_json")).json()] == ["FPSI"]
+
+
+def test_mark_completed_compares_aware_datetimes(db):
+    s = mk_sched(date=date(2020, 1, 1))
+    assert timezone.is_aware(s.get_datetime()) and s.is_past
+    s.mark_completed()
+    s.refresh_from_db()
+    assert s.status == "completed"
+
+
+def _write_schedule_csv(tmp_path, rows):
+    path = tmp_path / "schedule.csv"
+    lines = ["No,Kategori,Tim1,Tim2,Lokasi,Tanggal,Jam,"]
+    lines += [",".join(str(v) for v in (i, *row)) + "," for i, row in enumerate(rows, start=1)]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return str(path)
+
+
+@pytest.mark.django_db
+def test_populate_schedules_upserts_without_deleting(tmp_path, user):
+    rows = [
+        ("FUTSAL", "FPSI", "FIA", "SOR", "01-11-2024", "19.00-20.00"),
+        ("BASKET ", "FK", "FF", "GOR", "01-11-2024", "20.00-21.00"),
+        ("VOLI", "FT", "FH", "GOR", "02-11-2024", "08.00-09.00"),
+        ("VOLI", "FT", "FH", "GOR", "02-11-2024", "08.00-09.00"),
+        ("VOLI", "FT", "FH", "GOR", "31-13-2024", "08.00-09.00"),
+    ]
+    path = _write_schedule_csv(tmp_path, rows)
+    out = StringIO()
+    call_command("populate_schedules", file=path, stdout=out, stderr=StringIO())
+    assert "3 dibuat, 0 diperbarui, 0 tidak berubah, 1 duplikat dan 1 baris tidak valid" in out.getvalue()
+
+    futsal = Schedule.objects.get(team1="FPSI")
+    ticket = Ticket.objects.create(schedule=futsal, buyer=user, price=1000)
+    assert Schedule.objects.get(team1="FK").category == "BASKET"
+
+    rows[0] = ("FUTSAL", "FPSI", "FIA", "Balairung", "01-11-2024", "19.00-20.00")
+    path = _write_schedule_csv(tmp_path, rows)
+    out = StringIO()
+    call_command("populate_schedules", file=path, batch_size=2, stdout=out, stderr=StringIO())
+    assert "0 dibuat, 1 diperbarui, 2 tidak berubah" in out.getvalue()
+    assert Schedule.objects.count() == 3
+    assert Schedule.objects.get(id=futsal.id).location == "Balairung"
+    assert Ticket.objects.filter(id=ticket.id).exists()
+
+
+@pytest.mark.django_db
+def test_populate_schedules_dry_run_and_query_count(tmp_path, django_assert_max_num_queries):
+    rows = [("FUTSAL", f"T{i}", "FH", "SOR", f"{1 + i % 28:02d}-11-2024", "19.00-20.00") for i in range(300)]
+    path = _write_schedule_csv(tmp_path, rows)
+
+    out = StringIO()
+    call_command("populate_schedules", file=path, dry_run=True, stdout=out)
+    assert "(dry run" in out.getvalue() and "300 dibuat" in out.getvalue()
+    assert Schedule.objects.count() == 0
+
+    # per batch: 1 lookup + 1 insert (+ savepoint transaksi)
+    with django_assert_max_num_queries(8):
+        call_command("populate_schedules", file=path, batch_size=1000, stdout=StringIO())
+    assert Schedule.objects.count() == 300
+
+
+def _search_objects():
+    if connection.vendor != "sqlite":
+        pytest.skip("FTS5 hanya di SQLite")
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE name LIKE 'scheduling_schedule_fts%%' "
+                       "AND type IN ('table', 'trigger')")
+        return {row[0] for row in cursor.fetchall()}
+
+
+@pytest.mark.django_db(transaction=True)
+def test_search_index_migration_is_reversible():
+    expected = {"scheduling_schedule_fts", "scheduling_schedule_fts_ai",
+                "scheduling_schedule_fts_ad", "scheduling_schedule_fts_au"}
+    assert expected <= _search_objects()
+    try:
+        call_command("migrate", "scheduling", "0004", verbosity=0)
+        assert not _search_objects() & expected
+        mk_sched(team1="FASILKOM")
+    finally:
+        call_command("migrate", "scheduling", verbosity=0)
+    assert expected <= _search_objects()
+    # 'rebuild' di migrasi mengindeks jadwal yang dibuat tanpa trigger
+    assert search_schedule_ids("fasil", 10)[0] == list(Schedule.objects.values_list("id", flat=True))
+
+
+@pytest.mark.django_db
+def test_api_search_schedules_ranked_and_in_sync(client, user):
+    url = reverse("scheduling:api_search_schedules")
+    team_match = mk_sched(organizer=user, category="FUTSAL", team1="FASILKOM", team2="FT", location="SOR")
+    venue_match = mk_sched(category="BASKET", team1="FK", team2="FF", location="Gedung Fasilkom")
+    mk_sched(category="VOLI", team1="FH", team2="FEB", location="GOR")
+
+    data = client.get(url, {"q": "fasil"}).json()
+    assert [item["id"] for item in data["items"]] == [team_match.id, venue_match.id]
+    assert data["items"][0]["organizer"] == user.username
+
+    assert [i["id"] for i in client.get(url, {"q": "futsal ft"}).json()["items"]] == [team_match.id]
+
+    team_match.team1 = "FMIPA"
+    team_match.save()
+    venue_match.delete()
+    assert client.get(url, {"q": "fasilkom"}).json()["items"] == []
+    assert [i["id"] for i in client.get(url, {"q": "fmipa"}).json()["items"]] == [team_match.id]
+
+    Schedule.objects.bulk_create([
+        Schedule(category="MLBB", team1=f"FIB {i}", team2="FISIP", location="Online", date=date(2025, 1, 1), time=time(10, 0))
+        for i in range(5)
+    ])
+    Schedule.objects.filter(team1="FIB 0").update(location="Pusgiwa")
+    page1 = client.get(url, {"q": "mlbb", "limit": 3}).json()
+    page2 = client.get(url, {"q": "mlbb", "limit": 3, "page": 2}).json()
+    assert page1["has_next"] is True and page2["has_next"] is False
+    assert len(page1["items"]) + len(page2["items"]) == 5
+    assert client.get(url, {"q": "pusgiwa"}).json()["count"] == 1
+
+    assert client.get(url, {"q": "  "}).json()["items"] == []
+    assert client.get(url, {"q": "x", "page": "dua"}).status_code == 400
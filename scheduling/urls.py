@@ -1,5 +1,6 @@
 from django.urls import path
 from . import views, api_views
+from main import image_proxy
 
 app_name = 'scheduling'
 
@@ -11,11 +12,12 @@ urlpatterns = [
 
     # API endpoints (AJAX)
     path('api/list/', api_views.api_list_schedules, name='api_list_schedules'),
+    path('api/search/', api_views.api_search_schedules, name='api_search_schedules'),
     path('api/create/', api_views.api_create_schedule, name='api_create_schedule'),
     path('api/<int:id>/update/', api_views.api_update_schedule, name='api_update_schedule'),
     path('api/<int:id>/delete/', api_views.api_delete_schedule, name='api_delete_schedule'),
     path('api/<int:id>/complete/', api_views.api_mark_completed, name='api_mark_completed'),
     path('api/<int:id>/make-reviewable/', api_views.api_make_reviewable, name='api_make_reviewable'),
 
-    path('proxy-image/', views.proxy_image, name='proxy_image'),
+    path('proxy-image/', image_proxy.proxy_image, name='proxy_image'),
 ]
@@ -1,7 +1,11 @@
 from django.shortcuts import render, get_object_or_404
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.http import http_date
+from datetime import timedelta
 from .models import Schedule
-import requests
 
 def schedule_list(request):
     # Semua user (termasuk non-login) bisa lihat jadwal
@@ -26,35 +30,69 @@ def schedule_detail(request, id):
     schedule = get_object_or_404(Schedule, pk=id)
     return render(request, 'scheduling/schedule_detail.html', {'schedule': schedule})
 
+def _parse_feed_bound(value, is_end=False):
+    """
+    Batas FullCalendar ('2025-01-01' atau ISO datetime) -> date.
+    `end` eksklusif: datetime yang tidak tepat tengah malam ikut menyertakan harinya.
+    """
+    if not value:
+        return None
+    moment = parse_datetime(value.replace(' ', '+'))  # '+' offset sering ter-decode jadi spasi
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(value)
+        return day
+    day = moment.date()
+    if is_end and (moment.hour, moment.minute, moment.second, moment.microsecond) != (0, 0, 0, 0):
+        day += timedelta(days=1)
+    return day
+
+
 def schedule_feed(request):
     """
     JSON sederhana (mis. untuk FullCalendar). Ini bukan endpoint CRUD AJAX.
+    Mendukung ?start=&end= (range kalender), ?category= dan ?location=,
+    serta ETag/Last-Modified supaya jendela kalender yang tidak berubah dapat 304.
     """
-    schedules = Schedule.objects.all()
-    data = [
-        {
-            "title": f"{s.category}: {s.team1} vs {s.team2}",
-            "start": f"{s.date}T{s.time}",  # format ISO
-            "url": f"/scheduling/{s.id}/"
-        }
-        for s in schedules
-    ]
-    return JsonResponse(data, safe=False)
-
-def proxy_image(request):
-    image_url = request.GET.get('url')
-    if not image_url:
-        return HttpResponse('No URL provided', status=400)
-    
     try:
-        # Fetch image from external source
-        response = requests.get(image_url, timeout=10)
-        response.raise_for_status()
-        
-        # Return the image with proper content type
-        return HttpResponse(
-            response.content,
-            content_type=response.headers.get('Content-Type', 'image/jpeg')
-        )
-    except requests.RequestException as e:
-        return HttpResponse(f'Error fetching image: {str(e)}', status=500)
\ No newline at end of file
+        start = _parse_feed_bound(request.GET.get('start'))
+        end = _parse_feed_bound(request.GET.get('end'), is_end=True)
+    except ValueError:
+        return JsonResponse({'error': 'start/end harus berformat tanggal ISO'}, status=400)
+
+    schedules = Schedule.objects.all()
+    if start:
+        schedules = schedules.filter(date__gte=start)
+    if end:
+        schedules = schedules.filter(date__lt=end)
+    if request.GET.get('category'):
+        schedules = schedules.filter(category__iexact=request.GET['category'])
+    if request.GET.get('location'):
+        schedules = schedules.filter(location__iexact=request.GET['location'])
+
+    # Jumlah ikut di ETag supaya penghapusan (yang tidak mengubah max updated_at) tetap terdeteksi
+    summary = schedules.aggregate(count=Count('id'), last_modified=Max('updated_at'))
+    last_modified = summary['last_modified']
+    stamp = int(last_modified.timestamp() * 1_000_000) if last_modified else 0
+    etag = f'"feed-{summary["count"]}-{stamp}"'
+    last_modified_ts = int(last_modified.timestamp()) if last_modified else None
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified_ts)
+    if response is None:
+        rows = schedules.values_list('id', 'category', 'team1', 'team2', 'date', 'time')
+        data = [
+            {
+                "title": f"{category}: {team1} vs {team2}",
+                "start": f"{day}T{at}",  # format ISO
+                "url": f"/scheduling/{schedule_id}/"
+            }
+            for schedule_id, category, team1, team2, day, at in rows
+        ]
+        response = JsonResponse(data, safe=False)
+
+    response['ETag'] = etag
+    if last_modified_ts is not None:
+        response['Last-Modified'] = http_date(last_modified_ts)
+    patch_cache_control(response, no_cache=True)
+    return response
@@ -0,0 +1,86 @@
+"""
+Versi data untuk cache payload jadwal (Schedule + EventPrice).
+
+Payload yang di-cache memakai versi ini di dalam key-nya; setiap penulisan
+Schedule/EventPrice menaikkan versi (lihat ticketing/signals.py), sehingga
+entri lama otomatis tidak terpakai lagi tanpa perlu dihapus satu per satu.
+
+Untuk halaman yang sangat ramai ada `get_or_build`: entri disimpan di key tetap
+bersama versinya, jadi setelah versi naik nilai lama masih bisa dilayani
+(stale-while-revalidate) selagi satu request membangun ulang.
+
+Semua ini hanya benar kalau backend cache dipakai bersama oleh semua worker
+dan command cron (lihat CACHES di settings); dengan cache per proses, bump di
+satu proses tidak terlihat di proses lain.
+"""
+import time
+
+from django.core.cache import cache
+
+SCHEDULES_VERSION_KEY = 'ticketing:schedules:version'
+
+
+def _fresh_version():
+    # Berbasis waktu supaya versi tidak mundur ke angka lama jika key ter-evict
+    return int(time.time() * 1000)
+
+
+def schedules_version():
+    version = cache.get(SCHEDULES_VERSION_KEY)
+    if version is None:
+        version = _fresh_version()
+        cache.add(SCHEDULES_VERSION_KEY, version, timeout=None)
+        version = cache.get(SCHEDULES_VERSION_KEY, version)
+    return version
+
+
+def bump_schedules_version():
+    # Bukan cache.incr: di FileBasedCache incr = get lalu set, jadi dua bump
+    # bersamaan bisa menghasilkan angka yang sama dan satu perubahan hilang.
+    # Versi berbasis waktu tetap berbeda kecuali jatuh di milidetik yang sama.
+    current = cache.get(SCHEDULES_VERSION_KEY) or 0
+    cache.set(SCHEDULES_VERSION_KEY, max(_fresh_version(), current + 1), timeout=None)
+
+
+SWR_TIMEOUT = 24 * 3600
+SWR_LOCK_TIMEOUT = 30
+# Saat cache benar-benar kosong, request yang kalah lock menunggu sebentar
+COLD_WAIT_SECONDS = 2.0
+COLD_POLL_SECONDS = 0.05
+
+
+def get_or_build(key, build, timeout=SWR_TIMEOUT):
+    """
+    Nilai ter-cache untuk `key` pada versi jadwal terkini.
+
+    Kalau entri sudah basi (versi lama), hanya request pemegang lock yang
+    memanggil `build()`; request lain langsung mendapat nilai lama. Kalau belum
+    ada entri sama sekali, request lain menunggu hasil pemegang lock paling
+    lama COLD_WAIT_SECONDS sebelum membangun sendiri.
+    """
+    version = schedules_version()
+    entry = cache.get(key)
+    if entry is not None and entry[0] == version:
+        return entry[1]
+
+    lock_key = f'{key}:lock'
+    locked = cache.add(lock_key, 1, SWR_LOCK_TIMEOUT)
+    if not locked:
+        if entry is not None:
+            return entry[1]
+        deadline = time.monotonic() + COLD_WAIT_SECONDS
+        while time.monotonic() < deadline:
+            time.sleep(COLD_POLL_SECONDS)
+            entry = cache.get(key)
+            if entry is not None:
+                return entry[1]
+
+    try:
+        # Versi dibaca sebelum build: kalau naik lagi selama build, entri ini
+        # langsung dianggap basi oleh request berikutnya.
+        value = build()
+        cache.set(key, (version, value), timeout)
+    finally:
+        if locked:
+            cache.delete(lock_key)
+    return value
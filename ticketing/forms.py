@@ -13,7 +13,7 @@ class EventPriceForm(forms.ModelForm):
     """
     class Meta:
         model = EventPrice
-        fields = ['schedule', 'price']
+        fields = ['schedule', 'price', 'capacity']
         widgets = {
             'schedule': forms.Select(attrs={
                 'class': 'form-select w-full px-4 py-3 rounded-lg border border-gray-300 focus:outline-none focus:ring-2 focus:ring-blue-500'
@@ -22,6 +22,10 @@ class EventPriceForm(forms.ModelForm):
                 'class': 'w-full px-4 py-3 rounded-lg border border-gray-300 focus:outline-none focus:ring-2 focus:ring-blue-500',
                 'placeholder': 'Masukkan harga, misal: 50000'
             }),
+            'capacity': forms.NumberInput(attrs={
+                'class': 'w-full px-4 py-3 rounded-lg border border-gray-300 focus:outline-none focus:ring-2 focus:ring-blue-500',
+                'placeholder': 'Kosongkan jika tidak dibatasi'
+            }),
         }
 
     def __init__(self, *args, **kwargs):
@@ -0,0 +1,131 @@
+"""
+Idempotency-Key untuk endpoint tulis ticketing (buy/pay Flutter).
+
+Klien mengirim header `Idempotency-Key` (mis. UUID) yang sama di setiap retry.
+Request pertama menyimpan respons-nya ke IdempotencyKey; retry dengan key dan
+body yang sama langsung mendapat respons tersimpan tanpa menyentuh tabel tiket.
+
+- retry saat request pertama masih diproses -> 409 code=request_in_flight; kalau request pertama tidak
+  selesai dalam TICKET_IDEMPOTENCY_LEASE_SECONDS (default 60, mis. worker mati),
+  retry dengan body yang sama mengambil alih key itu lewat UPDATE bersyarat
+- key yang sama dipakai dengan body berbeda  -> 422 code=idempotency_key_reused
+- respons 5xx / exception tidak disimpan, jadi retry dijalankan ulang; view yang
+  memakai dekorator ini tidak boleh membungkus error sementara jadi respons 2xx/4xx
+- key kedaluwarsa setelah TICKET_IDEMPOTENCY_TTL_HOURS (default 24) dan dibersihkan
+  oleh `manage.py purge_idempotency_keys` (jadwalkan terpisah di cron)
+"""
+import functools
+import hashlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse, JsonResponse
+from django.utils import timezone
+
+from .models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = IdempotencyKey._meta.get_field('key').max_length
+
+
+def key_ttl():
+    return timedelta(hours=getattr(settings, 'TICKET_IDEMPOTENCY_TTL_HOURS', 24))
+
+
+def lease_duration():
+    return timedelta(seconds=getattr(settings, 'TICKET_IDEMPOTENCY_LEASE_SECONDS', 60))
+
+
+def purge_expired(now=None):
+    """Hapus key yang sudah kedaluwarsa, return jumlah baris terhapus."""
+    cutoff = (now or timezone.now()) - key_ttl()
+    deleted, _ = IdempotencyKey.objects.filter(created_at__lt=cutoff).delete()
+    return deleted
+
+
+def _reclaim(record, fingerprint, now):
+    """
+    Ambil alih key yang masih 'diproses' tapi lease-nya habis. UPDATE bersyarat
+    pada created_at lama memastikan hanya satu retry yang menang.
+    """
+    if record.status_code is not None or record.fingerprint != fingerprint:
+        return False
+    if record.created_at >= now - lease_duration():
+        return False
+    reclaimed = IdempotencyKey.objects.filter(
+        pk=record.pk, status_code__isnull=True, created_at=record.created_at,
+    ).update(created_at=now)
+    if reclaimed:
+        record.created_at = now
+    return bool(reclaimed)
+
+
+def _claim(key, path, fingerprint):
+    """Return (record, created). Key kedaluwarsa diperlakukan seperti belum ada."""
+    for _ in range(2):
+        try:
+            with transaction.atomic():
+                return IdempotencyKey.objects.create(key=key, path=path, fingerprint=fingerprint), True
+        except IntegrityError:
+            pass
+        now = timezone.now()
+        record = IdempotencyKey.objects.filter(key=key, path=path).first()
+        if record is not None and record.created_at >= now - key_ttl():
+            if _reclaim(record, fingerprint, now):
+                return record, True
+            # Kalah rebutan reclaim: baca ulang supaya status terbaru yang dilaporkan
+            return IdempotencyKey.objects.filter(pk=record.pk).first() or record, False
+        if record is not None:
+            IdempotencyKey.objects.filter(pk=record.pk, created_at=record.created_at).delete()
+    return IdempotencyKey.objects.get(key=key, path=path), False
+
+
+def _replay(record):
+    response = HttpResponse(bytes(record.body), status=record.status_code, content_type=record.content_type)
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def idempotent(view):
+    """Dekorator view POST: hormati header Idempotency-Key jika dikirim klien."""
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if request.method != 'POST' or not key:
+            return view(request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return JsonResponse({'status': 'error', 'message': 'Idempotency-Key terlalu panjang'}, status=400)
+
+        fingerprint = hashlib.sha256(request.body).hexdigest()
+        record, created = _claim(key, request.path, fingerprint)
+        if not created:
+            if record.fingerprint != fingerprint:
+                return JsonResponse({
+                    'status': 'error',
+                    'code': 'idempotency_key_reused',
+                    'message': 'Idempotency-Key sudah dipakai untuk request lain',
+                }, status=422)
+            if record.status_code is None:
+                return JsonResponse({
+                    'status': 'error',
+                    'code': 'request_in_flight',
+                    'message': 'Request dengan Idempotency-Key ini masih diproses',
+                }, status=409)
+            return _replay(record)
+
+        try:
+            response = view(request, *args, **kwargs)
+        except Exception:
+            IdempotencyKey.objects.filter(pk=record.pk).delete()
+            raise
+        if response.status_code >= 500 or response.streaming:
+            IdempotencyKey.objects.filter(pk=record.pk).delete()
+        else:
+            IdempotencyKey.objects.filter(pk=record.pk).update(
+                status_code=response.status_code,
+                content_type=response.get('Content-Type', ''),
+                body=response.content,
+            )
+        return response
+    return wrapper
@@ -0,0 +1,68 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from ticketing import signing
+
+
+def _verify_loop(key, payloads, schedule_id, iterations, now):
+    """Jalankan verifikasi berulang di satu proses, return (jumlah, detik)."""
+    n = len(payloads)
+    start = time.perf_counter()
+    for i in range(iterations):
+        signing.verify_ticket(payloads[i % n], schedule_id=schedule_id, now=now, key=key)
+    return iterations, time.perf_counter() - start
+
+
+class Command(BaseCommand):
+    help = 'Benchmark throughput verifikasi payload QR bertanda tangan (per core)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200_000,
+                            help='Jumlah verifikasi per proses (default: 200000)')
+        parser.add_argument('--processes', type=int, default=1,
+                            help='Jumlah proses paralel (default: 1)')
+        parser.add_argument('--tickets', type=int, default=1000,
+                            help='Jumlah payload berbeda yang diputar (default: 1000)')
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        processes = max(1, options['processes'])
+
+        key = signing.signing_key()
+        schedule_id = 1
+        now = time.time()
+        expires = int(now) + 3600
+        payloads = [
+            signing.sign_ticket(ticket_id, schedule_id, expires, key=key)
+            for ticket_id in range(1, options['tickets'] + 1)
+        ]
+
+        self.stdout.write(
+            f'Verifikasi {iterations} payload x {processes} proses '
+            f'(cpu tersedia: {os.cpu_count()})...'
+        )
+
+        if processes == 1:
+            results = [_verify_loop(key, payloads, schedule_id, iterations, now)]
+        else:
+            with ProcessPoolExecutor(max_workers=processes) as pool:
+                futures = [
+                    pool.submit(_verify_loop, key, payloads, schedule_id, iterations, now)
+                    for _ in range(processes)
+                ]
+                results = [f.result() for f in futures]
+
+        for i, (count, elapsed) in enumerate(results, start=1):
+            self.stdout.write(
+                f'  proses {i}: {count / elapsed:,.0f} verifikasi/detik '
+                f'({elapsed * 1_000_000 / count:.2f} us/verifikasi)'
+            )
+
+        total = sum(count / elapsed for count, elapsed in results)
+        self.stdout.write(self.style.SUCCESS(
+            f'Total: {total:,.0f} verifikasi/detik, '
+            f'rata-rata per core: {total / len(results):,.0f} verifikasi/detik'
+        ))
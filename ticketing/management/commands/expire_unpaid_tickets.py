@@ -0,0 +1,53 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from ticketing.models import Ticket
+
+
+class Command(BaseCommand):
+    help = 'Hapus tiket unpaid yang melewati TTL per batch dan kembalikan kursinya ke stok'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ttl-minutes', type=int,
+                            default=getattr(settings, 'TICKET_UNPAID_TTL_MINUTES', 30),
+                            help='Umur maksimal tiket unpaid (default: TICKET_UNPAID_TTL_MINUTES atau 30)')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--max-batches', type=int, default=0,
+                            help='Berhenti setelah N batch (default: 0, sampai habis)')
+        parser.add_argument('--pause', type=float, default=0.0,
+                            help='Jeda (detik) antar batch agar penulis lain tidak menunggu lama')
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options['batch_size'])
+        max_batches = options['max_batches']
+        # Cutoff dihitung sekali supaya tiket yang baru kedaluwarsa di tengah
+        # sweep tidak membuat loop berjalan terus.
+        cutoff = timezone.now() - timedelta(minutes=options['ttl_minutes'])
+
+        start = time.perf_counter()
+        batches = swept = 0
+        while not max_batches or batches < max_batches:
+            batch_start = time.perf_counter()
+            per_schedule = Ticket.expire_unpaid(cutoff, batch_size)
+            count = sum(per_schedule.values())
+            if not count:
+                break
+            batches += 1
+            swept += count
+            self.stdout.write(
+                f'  batch {batches}: {count} tiket dari {len(per_schedule)} schedule '
+                f'({(time.perf_counter() - batch_start) * 1000:.1f} ms)'
+            )
+            if count < batch_size:
+                break
+            if options['pause']:
+                time.sleep(options['pause'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{swept} tiket unpaid kedaluwarsa dihapus dalam {batches} batch '
+            f'({time.perf_counter() - start:.2f} detik).'
+        ))
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from scheduling.models import Schedule
+from ticketing import manifest
+
+
+class Command(BaseCommand):
+    help = 'Ekspor manifest gate (id tiket paid, JSON gzip) untuk satu schedule'
+
+    def add_arguments(self, parser):
+        parser.add_argument('schedule_id', type=int)
+        parser.add_argument('--output', '-o',
+                            help='Path file keluaran (default: manifest-<schedule_id>-v<versi>.json.gz)')
+        parser.add_argument('--since', type=int,
+                            help='Hanya ekspor perubahan setelah versi ini')
+
+    def handle(self, *args, **options):
+        schedule_id = options['schedule_id']
+        if not Schedule.objects.filter(id=schedule_id).exists():
+            raise CommandError(f'Schedule {schedule_id} tidak ditemukan.')
+
+        version = manifest.manifest_version(schedule_id)
+        since = options['since']
+        if since is None:
+            chunks = manifest.iter_manifest(schedule_id, version)
+            default_name = f'manifest-{schedule_id}-v{version}.json.gz'
+        else:
+            chunks = manifest.iter_manifest_diff(schedule_id, since, version)
+            default_name = f'manifest-{schedule_id}-v{since}-v{version}.json.gz'
+
+        output = options['output'] or default_name
+        size = 0
+        with open(output, 'wb') as f:
+            for chunk in chunks:
+                f.write(chunk)
+                size += len(chunk)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Manifest schedule {schedule_id} versi {version} ditulis ke {output} ({size} bytes).'
+        ))
@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ticketing.price_import import import_prices
+
+
+class Command(BaseCommand):
+    help = 'Import harga EventPrice massal dari CSV (schedule_id atau category/team1/team2/date + price, capacity)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_path')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Hanya validasi dan laporkan, tidak menulis apa pun')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        try:
+            with open(options['csv_path'], newline='', encoding='utf-8-sig') as f:
+                result = import_prices(f, dry_run=options['dry_run'])
+        except FileNotFoundError:
+            raise CommandError(f"File CSV tidak ditemukan: {options['csv_path']}")
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        for line, error in result.rejected:
+            self.stderr.write(f'  baris {line}: {error}')
+
+        note = ' (dry run, tidak ada yang disimpan)' if options['dry_run'] else ''
+        self.stdout.write(self.style.SUCCESS(
+            f'{result.created} harga baru, {result.updated} harga diperbarui, '
+            f'{len(result.rejected)} baris ditolak{note} ({time.perf_counter() - start:.2f} detik).'
+        ))
@@ -0,0 +1,216 @@
+import json
+import logging
+import random
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, OperationalError
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from scheduling.models import Schedule
+from ticketing.models import EventPrice, ScheduleSalesStats, Ticket
+from ticketing.views import SCAN_MESSAGES
+from users.models import User
+
+
+def _percentile(sorted_values, pct):
+    """Nearest-rank percentile dari list yang sudah terurut."""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+class Command(BaseCommand):
+    help = (
+        'Load test flash sale: seed satu schedule, jalankan buy -> pay -> scan lewat view asli '
+        'dengan banyak thread, laporkan throughput, latensi, error, dan anomali (oversell/double scan)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--buyers', type=int, default=200,
+                            help='Jumlah pembeli (default: 200)')
+        parser.add_argument('--capacity', type=int, default=100,
+                            help='Kapasitas kursi; lebih kecil dari --buyers untuk menguji sold out (default: 100)')
+        parser.add_argument('--workers', type=int, default=8,
+                            help='Jumlah thread bersamaan (default: 8)')
+        parser.add_argument('--scans-per-ticket', type=int, default=2,
+                            help='Berapa kali tiap tiket di-scan bersamaan; >1 menguji double scan (default: 2)')
+        parser.add_argument('--keep', action='store_true',
+                            help='Jangan hapus data hasil seed setelah selesai')
+
+    def handle(self, *args, **options):
+        self.latencies = defaultdict(list)
+        self.outcomes = defaultdict(Counter)
+        self.error_messages = Counter()
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        workers = max(1, options['workers'])
+
+        schedule, users = self._seed(options['buyers'], options['capacity'])
+        self.stdout.write(
+            f'Seed: schedule {schedule.id}, {len(users)} pembeli, kapasitas {options["capacity"]}, '
+            f'{workers} worker ({connection.vendor}).'
+        )
+        # 409 sold out itu wajar di sini; jangan banjiri output dengan warning django.request
+        request_logger = logging.getLogger('django.request')
+        previous_level = request_logger.level
+        request_logger.setLevel(logging.ERROR)
+        try:
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                ticket_ids = [t for t in pool.map(lambda u: self._buy_and_pay(schedule.id, u), users) if t]
+            purchase_elapsed = time.perf_counter() - start
+
+            scans = ticket_ids * max(1, options['scans_per_ticket'])
+            random.shuffle(scans)
+            scan_start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                scan_results = list(pool.map(self._scan, scans))
+            scan_elapsed = time.perf_counter() - scan_start
+            total_elapsed = time.perf_counter() - start
+
+            self._report(purchase_elapsed, scan_elapsed, total_elapsed, len(users), len(ticket_ids))
+            self._check_anomalies(schedule, scans, scan_results, options['capacity'])
+        finally:
+            request_logger.setLevel(previous_level)
+            if not options['keep']:
+                Schedule.objects.filter(pk=schedule.pk).delete()
+                User.objects.filter(pk__in=[u.pk for u in users]).delete()
+
+    def _seed(self, buyers, capacity):
+        run = uuid.uuid4().hex[:8]
+        schedule = Schedule.objects.create(
+            category='LOADTEST', team1=f'Flash {run}', team2='Sale', location='localhost',
+            date=timezone.localdate() + timedelta(days=1), time=timezone.localtime().time().replace(microsecond=0),
+        )
+        EventPrice.objects.create(schedule=schedule, price=10000, capacity=capacity)
+        User.objects.bulk_create([
+            User(username=f'loadtest-{run}-{i}', email=f'loadtest-{run}-{i}@example.com', role='user')
+            for i in range(buyers)
+        ], batch_size=500)
+        users = list(User.objects.filter(username__startswith=f'loadtest-{run}-').order_by('id'))
+        return schedule, users
+
+    def _client(self):
+        client = getattr(self.local, 'client', None)
+        if client is None:
+            client = self.local.client = Client(HTTP_HOST='localhost')
+        return client
+
+    def _call(self, endpoint, method, url, **kwargs):
+        """Panggil view lewat test client, catat latensi dan hasilnya."""
+        start = time.perf_counter()
+        try:
+            response = getattr(self._client(), method)(url, **kwargs)
+            status = response.status_code
+            data = response.json() if response.get('Content-Type', '').startswith('application/json') else {}
+        except OperationalError:
+            # mis. "database is locked" di SQLite saat contention tinggi
+            status, data = 'db_error', {}
+        finally:
+            connection.close()
+        elapsed = time.perf_counter() - start
+
+        # Error aplikasi view Flutter berupa 200 {'status': 'error'};
+        # scan ulang tiket yang sudah dipakai adalah penolakan yang diharapkan.
+        if status == 200 and data.get('message') == SCAN_MESSAGES['used']:
+            outcome = 'rejected_used'
+        elif status == 200 and data.get('status') == 'error':
+            outcome = 'app_error'
+            with self.lock:
+                self.error_messages[data.get('message', '')] += 1
+        else:
+            outcome = status
+        with self.lock:
+            self.latencies[endpoint].append(elapsed)
+            self.outcomes[endpoint][outcome] += 1
+        return status, data
+
+    def _buy_and_pay(self, schedule_id, user):
+        status, data = self._call(
+            'buy', 'post', reverse('buy_flutter'),
+            data=json.dumps({'schedule_id': schedule_id, 'username': user.username}),
+            content_type='application/json',
+        )
+        if status != 200 or data.get('status') != 'success':
+            return None
+        ticket_id = data['ticket_id']
+        status, data = self._call('pay', 'post', reverse('pay_flutter', args=[ticket_id]))
+        if status != 200 or data.get('status') != 'success':
+            return None
+        return ticket_id
+
+    def _scan(self, ticket_id):
+        status, data = self._call('scan', 'get', reverse('scan_flutter', args=[ticket_id]))
+        return status == 200 and data.get('status') == 'success'
+
+    def _report(self, purchase_elapsed, scan_elapsed, total_elapsed, buyers, paid):
+        self.stdout.write(
+            f'Buy+pay: {buyers} pembeli dalam {purchase_elapsed:.2f} detik '
+            f'({buyers / purchase_elapsed:,.1f} alur/detik), {paid} tiket terbayar.'
+        )
+        scans = len(self.latencies['scan'])
+        if scans:
+            self.stdout.write(f'Scan: {scans} scan dalam {scan_elapsed:.2f} detik ({scans / scan_elapsed:,.1f} scan/detik).')
+        requests = sum(len(values) for values in self.latencies.values())
+        self.stdout.write(f'Total: {requests} request dalam {total_elapsed:.2f} detik ({requests / total_elapsed:,.1f} req/detik).')
+
+        for endpoint in ('buy', 'pay', 'scan'):
+            values = sorted(self.latencies[endpoint])
+            if not values:
+                continue
+            outcomes = ', '.join(f'{status}={count}' for status, count in sorted(self.outcomes[endpoint].items(), key=str))
+            self.stdout.write(
+                f'  {endpoint:<4} n={len(values):<6} '
+                f'p50={_percentile(values, 50) * 1000:.1f}ms '
+                f'p95={_percentile(values, 95) * 1000:.1f}ms '
+                f'p99={_percentile(values, 99) * 1000:.1f}ms  [{outcomes}]'
+            )
+
+        errors = sum(
+            count for counter in self.outcomes.values()
+            for status, count in counter.items()
+            if status in ('db_error', 'app_error') or (isinstance(status, int) and status >= 500)
+        )
+        self.stdout.write(f'Error (5xx / database locked / app_error): {errors}')
+        for message, count in self.error_messages.most_common(5):
+            self.stdout.write(f'  {count}x {message}')
+
+    def _check_anomalies(self, schedule, scans, scan_results, capacity):
+        anomalies = []
+        tickets = Ticket.objects.filter(schedule=schedule)
+        sold = tickets.count()
+        event_price = EventPrice.objects.get(schedule=schedule)
+        if sold > capacity:
+            anomalies.append(f'oversell: {sold} tiket untuk kapasitas {capacity}')
+        if event_price.sold != sold:
+            anomalies.append(f'counter sold EventPrice {event_price.sold} != {sold} tiket')
+
+        admitted = Counter(ticket_id for ticket_id, ok in zip(scans, scan_results) if ok)
+        double = [ticket_id for ticket_id, count in admitted.items() if count > 1]
+        if double:
+            anomalies.append(f'double scan: {len(double)} tiket masuk lebih dari sekali')
+        used = tickets.filter(is_used=True).count()
+        if used != len(admitted):
+            anomalies.append(
+                f'{used} tiket ditandai terpakai tetapi hanya {len(admitted)} scan yang menerima respons sukses'
+            )
+
+        stats = ScheduleSalesStats.objects.filter(schedule=schedule).first()
+        paid = tickets.filter(payment_status='paid').count()
+        if stats is None or (stats.tickets_sold, stats.tickets_paid, stats.tickets_used) != (sold, paid, used):
+            anomalies.append('ScheduleSalesStats tidak cocok dengan tabel Ticket')
+
+        if anomalies:
+            for anomaly in anomalies:
+                self.stdout.write(self.style.ERROR(f'Anomali: {anomaly}'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Anomali: tidak ada (tanpa oversell maupun double scan).'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from ticketing import idempotency
+
+
+class Command(BaseCommand):
+    help = 'Hapus Idempotency-Key yang melewati TICKET_IDEMPOTENCY_TTL_HOURS (default 24 jam)'
+
+    def handle(self, *args, **options):
+        purged = idempotency.purge_expired()
+        self.stdout.write(self.style.SUCCESS(f'{purged} Idempotency-Key kedaluwarsa dibersihkan.'))
@@ -0,0 +1,66 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from main.stats import schedule_id_batches, upsert_rows
+from scheduling.models import Schedule
+from ticketing.models import ScheduleSalesStats, Ticket
+
+STATS_FIELDS = ['tickets_sold', 'tickets_paid', 'tickets_used', 'revenue', 'updated_at']
+
+
+class Command(BaseCommand):
+    help = 'Hitung ulang ScheduleSalesStats dari tabel Ticket (per batch schedule)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Jumlah schedule per batch (default: 500)')
+        parser.add_argument('--schedule', type=int, action='append', dest='schedule_ids',
+                            help='Hanya hitung ulang schedule ini (boleh diulang)')
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options['batch_size'])
+        schedules = Schedule.objects.values_list('id', flat=True)
+        if options['schedule_ids']:
+            schedules = schedules.filter(id__in=options['schedule_ids'])
+
+        start = time.perf_counter()
+        total = 0
+        # Satu query agregat + satu upsert per batch
+        for schedule_ids in schedule_id_batches(schedules, batch_size):
+            self._rebuild(schedule_ids)
+            total += len(schedule_ids)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Statistik {total} schedule dihitung ulang dalam {time.perf_counter() - start:.2f} detik.'
+        ))
+
+    @staticmethod
+    def _rebuild(schedule_ids):
+        totals = {
+            row['schedule_id']: row
+            for row in Ticket.objects.filter(schedule_id__in=schedule_ids)
+            .values('schedule_id')
+            .annotate(
+                tickets_sold=Count('id'),
+                tickets_paid=Count('id', filter=Q(payment_status='paid')),
+                tickets_used=Count('id', filter=Q(is_used=True)),
+                revenue=Sum('price', filter=Q(payment_status='paid')),
+            )
+            .order_by()
+        }
+        now = timezone.now()
+        rows = []
+        for schedule_id in schedule_ids:
+            row = totals.get(schedule_id, {})
+            rows.append(ScheduleSalesStats(
+                schedule_id=schedule_id,
+                tickets_sold=row.get('tickets_sold', 0),
+                tickets_paid=row.get('tickets_paid', 0),
+                tickets_used=row.get('tickets_used', 0),
+                revenue=row.get('revenue') or 0,
+                updated_at=now,
+            ))
+        upsert_rows(ScheduleSalesStats, rows, STATS_FIELDS)
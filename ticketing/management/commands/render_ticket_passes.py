@@ -0,0 +1,48 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from scheduling.models import Schedule
+from ticketing import passes
+
+
+class Command(BaseCommand):
+    help = 'Render pass QR untuk semua tiket satu schedule ke file zip (paralel per core)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('schedule_id', type=int)
+        parser.add_argument('--output', '-o',
+                            help='Path file zip (default: passes-<schedule_id>.zip)')
+        parser.add_argument('--processes', type=int, default=os.cpu_count() or 1,
+                            help='Jumlah proses render (default: jumlah core)')
+        parser.add_argument('--include-unpaid', action='store_true',
+                            help='Ikut render tiket yang belum dibayar (mis. alokasi VIP/sponsor)')
+
+    def handle(self, *args, **options):
+        schedule = Schedule.objects.filter(id=options['schedule_id']).first()
+        if schedule is None:
+            raise CommandError(f"Schedule {options['schedule_id']} tidak ditemukan.")
+
+        output = options['output'] or f'passes-{schedule.id}.zip'
+        processes = max(1, options['processes'])
+        pages = 0
+
+        def count_page():
+            nonlocal pages
+            pages += 1
+
+        start = time.perf_counter()
+        jobs = passes.iter_pass_jobs(schedule, paid_only=not options['include_unpaid'])
+        size = 0
+        with open(output, 'wb') as f:
+            for chunk in passes.iter_zip(passes.render_passes(jobs, processes), on_page=count_page):
+                f.write(chunk)
+                size += len(chunk)
+        elapsed = time.perf_counter() - start
+
+        rate = pages / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'{pages} pass ditulis ke {output} ({size} bytes) dengan {processes} proses '
+            f'dalam {elapsed:.2f} detik ({rate:,.1f} halaman/detik).'
+        ))
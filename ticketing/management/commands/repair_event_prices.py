@@ -0,0 +1,69 @@
+from decimal import Decimal, InvalidOperation
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from ticketing.models import EventPrice
+
+
+class Command(BaseCommand):
+    help = 'Hapus EventPrice yang korup (harga kosong/tidak valid) atau yatim (schedule sudah dihapus)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Hanya laporkan, tidak menghapus apa pun')
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options['batch_size'])
+        dry_run = options['dry_run']
+        table = EventPrice._meta.db_table
+        schedule_table = EventPrice._meta.get_field('schedule').related_model._meta.db_table
+
+        # Raw SQL supaya nilai desimal yang korup tidak memicu error konversi ORM.
+        # Keyset pagination (id > last_id) agar tiap batch tetap pakai index PK.
+        sql = (
+            f"SELECT ep.id, ep.price, s.id FROM {table} ep "
+            f"LEFT JOIN {schedule_table} s ON s.id = ep.schedule_id "
+            f"WHERE ep.id > %s ORDER BY ep.id LIMIT %s"
+        )
+
+        last_id = 0
+        scanned = corrupt = orphaned = 0
+        while True:
+            with connection.cursor() as cursor:
+                cursor.execute(sql, [last_id, batch_size])
+                rows = cursor.fetchall()
+            if not rows:
+                break
+
+            bad_ids = []
+            for ep_id, raw_price, schedule_id in rows:
+                if schedule_id is None:
+                    orphaned += 1
+                    bad_ids.append(ep_id)
+                elif not self._is_valid_price(raw_price):
+                    corrupt += 1
+                    bad_ids.append(ep_id)
+
+            if bad_ids and not dry_run:
+                placeholders = ', '.join(['%s'] * len(bad_ids))
+                with transaction.atomic(), connection.cursor() as cursor:
+                    cursor.execute(f"DELETE FROM {table} WHERE id IN ({placeholders})", bad_ids)
+
+            scanned += len(rows)
+            last_id = rows[-1][0]
+
+        action = 'ditemukan' if dry_run else 'dihapus'
+        self.stdout.write(self.style.SUCCESS(
+            f'{scanned} harga diperiksa: {corrupt} korup dan {orphaned} yatim {action}.'
+        ))
+
+    @staticmethod
+    def _is_valid_price(raw_price):
+        if raw_price is None or str(raw_price).strip() == '':
+            return False
+        try:
+            return Decimal(str(raw_price)).is_finite()
+        except (InvalidOperation, ValueError, TypeError):
+            return False
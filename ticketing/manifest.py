@@ -0,0 +1,106 @@
+"""
+Manifest gate: daftar id tiket 'paid' per schedule untuk scanning offline.
+
+Manifest penuh (JSON, di-gzip):
+
+    {"schedule_id": 1, "version": 57, "encoding": "delta",
+     "ticket_ids": [1001, 1, 5], "count": 3}
+
+`ticket_ids` sudah diurutkan lalu di-delta-encode (id ke-n = jumlah n elemen
+pertama) supaya hasil gzip kecil. `version` adalah id GateManifestChange
+terakhir (ditulis berurutan per schedule, lihat GateManifestChange.record);
+perangkat gate menyimpannya lalu meminta diff sejak versi itu:
+
+    {"schedule_id": 1, "since": 57, "version": 60, "added": [1203, 1207]}
+
+Keduanya dibangun dengan `.iterator()` dan dikompres per potongan, jadi event
+dengan puluhan ribu tiket tidak pernah dimuat utuh ke memori. Dengan
+compress=False potongannya dikirim sebagai JSON biasa (client tanpa gzip).
+"""
+import zlib
+
+from .models import GateManifestChange, Ticket
+
+ITERATOR_CHUNK_SIZE = 2000
+IDS_PER_WRITE = 1000
+
+
+def manifest_version(schedule_id):
+    return (
+        GateManifestChange.objects.filter(schedule_id=schedule_id)
+        .order_by('-id').values_list('id', flat=True).first()
+    ) or 0
+
+
+def _gzip(pieces):
+    """Kompres potongan teks menjadi aliran bytes gzip."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    for piece in pieces:
+        data = compressor.compress(piece.encode())
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def _encode(pieces, compress):
+    return _gzip(pieces) if compress else (piece.encode() for piece in pieces)
+
+
+def _json_int_array(values):
+    """Tulis iterable int sebagai isi array JSON, dikirim per IDS_PER_WRITE."""
+    batch = []
+    first = True
+    for value in values:
+        batch.append(str(value))
+        if len(batch) >= IDS_PER_WRITE:
+            yield ('' if first else ',') + ','.join(batch)
+            first = False
+            batch = []
+    if batch:
+        yield ('' if first else ',') + ','.join(batch)
+
+
+def _delta(ids):
+    previous = 0
+    for ticket_id in ids:
+        yield ticket_id - previous
+        previous = ticket_id
+
+
+def iter_manifest(schedule_id, version, compress=True):
+    """Manifest penuh (gzip) untuk schedule pada `version`."""
+    ids = (
+        Ticket.objects.filter(schedule_id=schedule_id, payment_status='paid')
+        .order_by('id').values_list('id', flat=True)
+        .iterator(chunk_size=ITERATOR_CHUNK_SIZE)
+    )
+    count = 0
+
+    def counted(values):
+        nonlocal count
+        for value in values:
+            count += 1
+            yield value
+
+    def pieces():
+        yield f'{{"schedule_id":{int(schedule_id)},"version":{int(version)},"encoding":"delta","ticket_ids":['
+        yield from _json_int_array(_delta(counted(ids)))
+        yield f'],"count":{count}}}'
+
+    return _encode(pieces(), compress)
+
+
+def iter_manifest_diff(schedule_id, since, version, compress=True):
+    """Tiket yang menjadi 'paid' setelah versi `since` sampai `version` (gzip)."""
+    ids = (
+        GateManifestChange.objects.filter(schedule_id=schedule_id, id__gt=since, id__lte=version)
+        .order_by('id').values_list('ticket_id', flat=True)
+        .iterator(chunk_size=ITERATOR_CHUNK_SIZE)
+    )
+
+    def pieces():
+        yield f'{{"schedule_id":{int(schedule_id)},"since":{int(since)},"version":{int(version)},"added":['
+        yield from _json_int_array(ids)
+        yield ']}'
+
+    return _encode(pieces(), compress)
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:12
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def backfill_sold(apps, schema_editor):
+    EventPrice = apps.get_model('ticketing', 'EventPrice')
+    Ticket = apps.get_model('ticketing', 'Ticket')
+    sold = models.Subquery(
+        Ticket.objects.filter(schedule_id=models.OuterRef('schedule_id'))
+        .values('schedule_id')
+        .annotate(n=models.Count('id'))
+        .values('n')
+    )
+    EventPrice.objects.update(sold=Coalesce(sold, 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ticketing', '0004_alter_eventprice_price_alter_ticket_price'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='eventprice',
+            name='capacity',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='eventprice',
+            name='sold',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_sold, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+from django.db import migrations
+
+
+def clear_qr_codes(apps, schema_editor):
+    # QR lama berisi payload TIKET-<id>-<username> tanpa tanda tangan;
+    # kosongkan supaya generate_qr membuat ulang dengan payload bertanda tangan.
+    Ticket = apps.get_model('ticketing', 'Ticket')
+    Ticket.objects.exclude(qr_code__isnull=True).update(qr_code=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ticketing', '0005_eventprice_capacity_sold'),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_qr_codes, migrations.RunPython.noop),
+    ]
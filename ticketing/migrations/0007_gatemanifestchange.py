@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:18
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduling', '0002_initial'),
+        ('ticketing', '0006_clear_unsigned_qr_codes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GateManifestChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ticket_id', models.BigIntegerField()),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('schedule', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='manifest_changes', to='scheduling.schedule')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['schedule', 'id'], name='ticketing_g_schedul_d14141_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:22
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduling', '0002_initial'),
+        ('ticketing', '0007_gatemanifestchange'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['buyer', 'purchase_date', 'id'], name='ticketing_t_buyer_i_06196e_idx'),
+        ),
+    ]
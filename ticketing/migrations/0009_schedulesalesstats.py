@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:23
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def backfill_stats(apps, schema_editor):
+    Ticket = apps.get_model('ticketing', 'Ticket')
+    ScheduleSalesStats = apps.get_model('ticketing', 'ScheduleSalesStats')
+    totals = (
+        Ticket.objects.values('schedule_id')
+        .annotate(
+            tickets_sold=models.Count('id'),
+            tickets_paid=models.Count('id', filter=models.Q(payment_status='paid')),
+            tickets_used=models.Count('id', filter=models.Q(is_used=True)),
+            revenue=models.Sum('price', filter=models.Q(payment_status='paid')),
+        )
+        .order_by()
+    )
+    ScheduleSalesStats.objects.bulk_create(
+        [
+            ScheduleSalesStats(
+                schedule_id=row['schedule_id'],
+                tickets_sold=row['tickets_sold'],
+                tickets_paid=row['tickets_paid'],
+                tickets_used=row['tickets_used'],
+                revenue=row['revenue'] or 0,
+            )
+            for row in totals.iterator()
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduling', '0002_initial'),
+        ('ticketing', '0008_ticket_buyer_purchase_date_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScheduleSalesStats',
+            fields=[
+                ('schedule', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='sales_stats', serialize=False, to='scheduling.schedule')),
+                ('tickets_sold', models.PositiveIntegerField(default=0)),
+                ('tickets_paid', models.PositiveIntegerField(default=0)),
+                ('tickets_used', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.RunPython(backfill_stats, migrations.RunPython.noop),
+    ]
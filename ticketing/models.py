@@ -1,10 +1,12 @@
-from django.db import models
+from django.db import models, connection, transaction
+from django.db.models.functions import Greatest
 from scheduling.models import Schedule
 # Ganti ini ke custom user model jika sudah siap, 
 # untuk sekarang kita pakai user bawaan
 from users.models import User
 #from django.contrib.auth.models import User 
 from django.utils import timezone
+from main.stats import bump_counters
 
 # ==================================
 # === 1. TAMBAHKAN MODEL BARU INI ===
@@ -21,9 +23,42 @@ class EventPrice(models.Model):
     )
     price = models.DecimalField(max_digits=15, decimal_places=2)
 
+    # Kuota kursi. Kosong (None) = tidak dibatasi.
+    capacity = models.PositiveIntegerField(null=True, blank=True)
+    # Counter kursi yang sudah terjual, hanya diubah lewat reserve_seat/release_seats
+    sold = models.PositiveIntegerField(default=0)
+
     def __str__(self):
         return f"Harga untuk {self.schedule}: Rp {self.price}"
 
+    @property
+    def remaining(self):
+        """Sisa kursi, atau None jika kapasitas tidak dibatasi."""
+        if self.capacity is None:
+            return None
+        return max(self.capacity - self.sold, 0)
+
+    @classmethod
+    def reserve_seat(cls, event_price_id):
+        """
+        Ambil satu kursi dengan satu conditional UPDATE
+        (sold < capacity), tanpa SELECT ... FOR UPDATE.
+        Return True jika kursi berhasil diambil, False jika sudah habis.
+        """
+        updated = cls.objects.filter(pk=event_price_id).filter(
+            models.Q(capacity__isnull=True) | models.Q(sold__lt=models.F('capacity'))
+        ).update(sold=models.F('sold') + 1)
+        return updated == 1
+
+    @classmethod
+    def release_seats(cls, schedule_id, count=1):
+        """Kembalikan kursi ke stok (mis. tiket unpaid yang dibatalkan)."""
+        if count <= 0:
+            return 0
+        return cls.objects.filter(schedule_id=schedule_id).update(
+            sold=Greatest(models.F('sold') - count, 0)
+        )
+
 # ==================================
 # === 2. MODEL TICKET KAMU (TETAP SAMA) ===
 # ==================================
@@ -66,5 +101,236 @@ class Ticket(models.Model):
         default='unpaid' 
     )
 
+    class Meta:
+        indexes = [
+            # Riwayat tiket per pembeli, terbaru dulu (keyset pagination)
+            models.Index(fields=['buyer', 'purchase_date', 'id']),
+            # Sweeper tiket unpaid kedaluwarsa (expire_unpaid_tickets)
+            models.Index(fields=['payment_status', 'purchase_date']),
+        ]
+
+    def __str__(self):
+        return f"Ticket #{self.id} - {self.buyer.username} ({'Used' if self.is_used else 'Unused'})"
+
+    def mark_paid(self):
+        """
+        Ubah status jadi 'paid' (sekali saja) dan catat ke log manifest gate.
+        Return True jika status benar-benar berubah; raise Ticket.DoesNotExist
+        jika tiket sudah dihapus sweeper karena kedaluwarsa.
+        """
+        with transaction.atomic():
+            updated = Ticket.objects.filter(pk=self.pk).exclude(payment_status='paid').update(payment_status='paid')
+            if updated:
+                GateManifestChange.record(self.schedule_id, self.pk)
+                ScheduleSalesStats.bump(self.schedule_id, tickets_paid=1, revenue=self.price)
+            elif not Ticket.objects.filter(pk=self.pk).exists():
+                raise Ticket.DoesNotExist('Tiket sudah kedaluwarsa.')
+        self.payment_status = 'paid'
+        return bool(updated)
+
+    # Hasil scan: 'ok' (berhasil masuk), 'unpaid', 'used', 'not_found',
+    # 'wrong_schedule' (tiket ada tapi untuk jadwal lain)
+    @classmethod
+    def scan_many(cls, ticket_ids, now=None, schedule_id=None):
+        """
+        Tandai tiket terpakai dengan compare-and-set
+        (payment_status='paid' AND is_used=false) supaya dua gate tidak bisa
+        meloloskan tiket yang sama. Kalau `schedule_id` diisi, hanya tiket
+        jadwal itu yang bisa diklaim. Return dict {ticket_id: hasil}.
+        """
+        ticket_ids = list(dict.fromkeys(int(i) for i in ticket_ids))
+        if not ticket_ids:
+            return {}
+        now = now or timezone.now()
+
+        with transaction.atomic():
+            admitted = cls._claim_unused(ticket_ids, now, schedule_id)
+            per_schedule = {}
+            for claimed_schedule in admitted.values():
+                per_schedule[claimed_schedule] = per_schedule.get(claimed_schedule, 0) + 1
+            for claimed_schedule, count in per_schedule.items():
+                ScheduleSalesStats.bump(claimed_schedule, tickets_used=count)
+        results = {ticket_id: 'ok' for ticket_id in admitted}
+
+        rest = [i for i in ticket_ids if i not in results]
+        if rest:
+            found = {
+                ticket_id: (status, sched)
+                for ticket_id, status, sched in cls.objects.filter(pk__in=rest)
+                .values_list('id', 'payment_status', 'schedule_id')
+            }
+            for ticket_id in rest:
+                if ticket_id not in found:
+                    results[ticket_id] = 'not_found'
+                elif schedule_id is not None and found[ticket_id][1] != schedule_id:
+                    results[ticket_id] = 'wrong_schedule'
+                elif found[ticket_id][0] != 'paid':
+                    results[ticket_id] = 'unpaid'
+                else:
+                    results[ticket_id] = 'used'
+        return results
+
+    @classmethod
+    def _claim_unused(cls, ticket_ids, now, schedule_id=None):
+        """
+        Satu UPDATE ... RETURNING untuk semua tiket; fallback per tiket.
+        Return dict {ticket_id: schedule_id} untuk tiket yang berhasil diklaim.
+        """
+        if connection.vendor in ('sqlite', 'postgresql') and connection.features.can_return_columns_from_insert:
+            placeholders = ', '.join(['%s'] * len(ticket_ids))
+            sql = (
+                f"UPDATE {cls._meta.db_table} SET is_used = %s, used_at = %s "
+                f"WHERE id IN ({placeholders}) AND payment_status = %s AND is_used = %s"
+            )
+            params = [True, connection.ops.adapt_datetimefield_value(now), *ticket_ids, 'paid', False]
+            if schedule_id is not None:
+                sql += " AND schedule_id = %s"
+                params.append(schedule_id)
+            with connection.cursor() as cursor:
+                cursor.execute(sql + " RETURNING id, schedule_id", params)
+                return dict(cursor.fetchall())
+
+        scope = {} if schedule_id is None else {'schedule_id': schedule_id}
+        admitted = []
+        for ticket_id in ticket_ids:
+            if cls.objects.filter(pk=ticket_id, payment_status='paid', is_used=False, **scope).update(is_used=True, used_at=now):
+                admitted.append(ticket_id)
+        return dict(cls.objects.filter(pk__in=admitted).values_list('id', 'schedule_id'))
+
+    @classmethod
+    def expire_unpaid(cls, cutoff, limit):
+        """
+        Hapus maksimal `limit` tiket unpaid yang dibeli sebelum `cutoff` dan
+        kembalikan kursinya ke stok. Return {schedule_id: jumlah tiket dihapus}.
+        """
+        with transaction.atomic():
+            claimed = cls._claim_expired(cutoff, limit)
+            if not claimed:
+                return {}
+            cls.objects.filter(pk__in=claimed).delete()
+
+            per_schedule = {}
+            for schedule_id in claimed.values():
+                per_schedule[schedule_id] = per_schedule.get(schedule_id, 0) + 1
+            for schedule_id, count in per_schedule.items():
+                EventPrice.release_seats(schedule_id, count)
+                ScheduleSalesStats.bump(schedule_id, tickets_sold=-count)
+        return per_schedule
+
+    @classmethod
+    def _claim_expired(cls, cutoff, limit):
+        """
+        Kunci batch tiket unpaid kedaluwarsa, return {ticket_id: schedule_id}.
+        UPDATE tanpa perubahan nilai dipakai sebagai lock: pembayaran yang
+        berjalan bersamaan menunggu transaksi ini selesai lalu tidak menemukan
+        tiketnya lagi, sehingga tiket yang sempat dibayar tidak ikut terhapus.
+        """
+        if connection.vendor in ('sqlite', 'postgresql') and connection.features.can_return_columns_from_insert:
+            table = cls._meta.db_table
+            sql = (
+                f"UPDATE {table} SET payment_status = %s "
+                f"WHERE id IN ("
+                f"SELECT id FROM {table} WHERE payment_status = %s AND purchase_date < %s "
+                f"ORDER BY purchase_date LIMIT %s"
+                f") AND payment_status = %s "
+                f"RETURNING id, schedule_id"
+            )
+            params = ['unpaid', 'unpaid', connection.ops.adapt_datetimefield_value(cutoff), limit, 'unpaid']
+            with connection.cursor() as cursor:
+                cursor.execute(sql, params)
+                return dict(cursor.fetchall())
+
+        return dict(
+            cls.objects.select_for_update()
+            .filter(payment_status='unpaid', purchase_date__lt=cutoff)
+            .order_by('purchase_date')
+            .values_list('id', 'schedule_id')[:limit]
+        )
+
+
+class GateManifestChange(models.Model):
+    """
+    Log tiket yang menjadi 'paid' per schedule. id-nya dipakai sebagai versi
+    manifest gate, sehingga perangkat cukup minta perubahan sejak versi N.
+    Karena itu baris baru wajib lewat `record()`, bukan create() langsung.
+    """
+    schedule = models.ForeignKey(Schedule, on_delete=models.CASCADE, related_name='manifest_changes')
+    ticket_id = models.BigIntegerField()
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [models.Index(fields=['schedule', 'id'])]
+
+    def __str__(self):
+        return f"Manifest #{self.id}: tiket {self.ticket_id} ({self.schedule_id})"
+
+    @classmethod
+    def record(cls, schedule_id, ticket_id):
+        """
+        Catat perubahan dengan baris Schedule terkunci (SELECT ... FOR UPDATE)
+        sampai transaksi pemanggil commit. Di Postgres dua pembayaran paralel
+        bisa mendapat id sequence lalu commit dengan urutan terbalik; perangkat
+        yang sync di antaranya akan melewatkan id yang lebih kecil selamanya.
+        Dengan lock per schedule, urutan id sama dengan urutan commit.
+        SQLite sudah menserialisasi penulisan, jadi lock-nya no-op di sana.
+        """
+        if not transaction.get_connection().in_atomic_block:
+            raise transaction.TransactionManagementError('GateManifestChange.record() harus di dalam atomic()')
+        list(Schedule.objects.select_for_update().filter(pk=schedule_id).values_list('pk', flat=True))
+        return cls.objects.create(schedule_id=schedule_id, ticket_id=ticket_id)
+
+
+class ScheduleSalesStats(models.Model):
+    """
+    Ringkasan penjualan per schedule untuk dashboard organizer.
+    Diperbarui secara inkremental saat beli, bayar, dan scan tiket;
+    `manage.py rebuild_sales_stats` menghitung ulang dari tabel Ticket.
+    """
+    schedule = models.OneToOneField(
+        Schedule,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='sales_stats'
+    )
+    tickets_sold = models.PositiveIntegerField(default=0)
+    tickets_paid = models.PositiveIntegerField(default=0)
+    tickets_used = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Statistik {self.schedule_id}: {self.tickets_paid}/{self.tickets_sold} paid"
+
+    @classmethod
+    def bump(cls, schedule_id, **deltas):
+        """
+        Tambah counter dengan F() + delta; buat barisnya jika belum ada.
+        Delta negatif tidak membuat baris baru (tidak ada yang dikurangi).
+        """
+        changes = {field: models.F(field) + delta for field, delta in deltas.items()}
+        changes['updated_at'] = timezone.now()
+        create = None if any(delta < 0 for delta in deltas.values()) else deltas
+        bump_counters(cls, schedule_id, changes, create)
+
+
+class IdempotencyKey(models.Model):
+    """
+    Respons tersimpan untuk header Idempotency-Key di endpoint tulis ticketing.
+    status_code NULL berarti request pertama masih diproses (sampai lease-nya
+    habis, lihat ticketing/idempotency.py).
+    """
+    key = models.CharField(max_length=64)
+    path = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    content_type = models.CharField(max_length=100, blank=True)
+    body = models.BinaryField(default=b'')
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['key', 'path'], name='ticketing_idempotency_key_path_uniq'),
+        ]
+
     def __str__(self):
-        return f"Ticket #{self.id} - {self.buyer.username} ({'Used' if self.is_used else 'Unused'})"
\ No newline at end of file
+        return f"{self.path} [{self.key}] -> {self.status_code}"
@@ -0,0 +1,131 @@
+"""
+Render pass tiket (QR + keterangan event) massal untuk satu schedule.
+
+Encode QR dan PNG dengan PIL itu CPU-bound, jadi command render_ticket_passes
+menjalankannya di process pool: proses induk mengambil tiket dari database dan
+menandatangani payload, worker hanya menerima (ticket_id, payload, baris teks)
+lalu mengembalikan PNG. Endpoint web selalu memakai processes=1 (render inline)
+supaya worker web tidak membuat process pool per request.
+Hasilnya dialirkan ke arsip zip begitu tiap potongan selesai, tanpa menunggu
+seluruh event selesai dirender.
+"""
+import os
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from io import BytesIO
+from itertools import islice
+
+import qrcode
+from PIL import Image, ImageDraw, ImageFont
+
+from . import qr
+from .models import Ticket
+
+PASS_WIDTH = 600
+PASS_HEIGHT = 820
+QR_SIZE = 520
+JOBS_PER_TASK = 16
+ITERATOR_CHUNK_SIZE = 2000
+
+
+def _render_one(ticket_id, payload, lines):
+    page = Image.new('RGB', (PASS_WIDTH, PASS_HEIGHT), 'white')
+    code = qrcode.make(payload, border=2).get_image().convert('RGB').resize((QR_SIZE, QR_SIZE), Image.NEAREST)
+    page.paste(code, ((PASS_WIDTH - QR_SIZE) // 2, 30))
+
+    draw = ImageDraw.Draw(page)
+    font = ImageFont.load_default()
+    y = QR_SIZE + 60
+    for line in lines:
+        width = draw.textlength(line, font=font)
+        draw.text(((PASS_WIDTH - width) / 2, y), line, fill='black', font=font)
+        y += 28
+
+    buffer = BytesIO()
+    page.save(buffer, format='PNG', optimize=False)
+    return ticket_id, buffer.getvalue()
+
+
+def render_batch(jobs):
+    """Dijalankan di worker: list of (ticket_id, payload, lines) -> list of (ticket_id, png)."""
+    return [_render_one(*job) for job in jobs]
+
+
+def iter_pass_jobs(schedule, paid_only=True):
+    """Job render untuk setiap tiket schedule, payload QR sudah ditandatangani."""
+    tickets = Ticket.objects.filter(schedule=schedule)
+    if paid_only:
+        tickets = tickets.filter(payment_status='paid')
+    rows = tickets.order_by('id').values_list('id', 'buyer__username').iterator(chunk_size=ITERATOR_CHUNK_SIZE)
+    when = f"{schedule.date:%d-%m-%Y} {schedule.time:%H:%M}"
+    for ticket_id, buyer in rows:
+        payload = qr.qr_payload(ticket_id, schedule.id, schedule.date, schedule.time)
+        lines = [
+            f"{schedule.category} - {schedule.team1} vs {schedule.team2}",
+            f"{when} - {schedule.location}",
+            f"Tiket #{ticket_id} - {buyer or '-'}",
+        ]
+        yield ticket_id, payload, lines
+
+
+def render_passes(jobs, processes=None):
+    """
+    Yield (ticket_id, png) begitu selesai (urutan tidak dijamin).
+    Hanya `processes * 2` batch yang antre sekaligus, jadi memori tetap kecil
+    walau event punya puluhan ribu tiket.
+    """
+    processes = processes or os.cpu_count() or 1
+    jobs = iter(jobs)
+    if processes == 1:
+        for batch in iter(lambda: list(islice(jobs, JOBS_PER_TASK)), []):
+            yield from render_batch(batch)
+        return
+
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        pending = set()
+        exhausted = False
+        while pending or not exhausted:
+            while not exhausted and len(pending) < processes * 2:
+                batch = list(islice(jobs, JOBS_PER_TASK))
+                if not batch:
+                    exhausted = True
+                    break
+                pending.add(pool.submit(render_batch, batch))
+            if not pending:
+                break
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield from future.result()
+
+
+class _ZipBuffer:
+    """File-like tanpa seek: zipfile menulis ke sini, generator mengambil isinya."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def iter_zip(rendered, on_page=None):
+    """Bungkus (ticket_id, png) menjadi aliran bytes zip (PNG disimpan tanpa kompresi ulang)."""
+    buffer = _ZipBuffer()
+    with zipfile.ZipFile(buffer, mode='w', compression=zipfile.ZIP_STORED) as archive:
+        for ticket_id, png in rendered:
+            archive.writestr(f'pass-{ticket_id}.png', png)
+            if on_page:
+                on_page()
+            data = buffer.drain()
+            if data:
+                yield data
+    yield buffer.drain()
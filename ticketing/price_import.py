@@ -0,0 +1,217 @@
+"""
+Import harga EventPrice massal dari CSV.
+
+Kolom yang dikenali (header wajib):
+
+    schedule_id,price,capacity
+    atau
+    category,team1,team2,date,time,price,capacity
+
+`date` berformat YYYY-MM-DD, `time` (HH:MM) boleh kosong jika pasangan tim
+hanya bertanding sekali hari itu, `capacity` kosong = tidak dibatasi. Tanpa
+kolom `capacity` sama sekali, kapasitas harga yang sudah ada tidak diubah.
+Baris yang tidak valid ditolak dengan alasannya; baris valid diterapkan
+dengan bulk_create/bulk_update dalam satu transaksi, jadi ribuan baris
+hanya butuh beberapa query. CSV yang rusak (mis. field melebihi batas modul
+csv) dan bentrok dengan import lain yang berjalan bersamaan dilaporkan sebagai
+ValueError, sama seperti header yang salah.
+"""
+import csv
+from collections import namedtuple
+from decimal import Decimal, InvalidOperation
+
+from django.db import IntegrityError, transaction
+from django.utils.dateparse import parse_date, parse_time
+
+from scheduling.models import Schedule
+
+from .cache import bump_schedules_version
+from .models import EventPrice
+
+# Batas parameter per query (SQLite lama hanya mengizinkan 999)
+LOOKUP_CHUNK_SIZE = 900
+BULK_BATCH_SIZE = 500
+
+_price_field = EventPrice._meta.get_field('price')
+MAX_PRICE = Decimal(10) ** (_price_field.max_digits - _price_field.decimal_places)
+
+ImportResult = namedtuple('ImportResult', ['created', 'updated', 'rejected'])
+
+
+def _chunks(values, size=LOOKUP_CHUNK_SIZE):
+    values = list(values)
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+
+def _parse_price(value):
+    try:
+        price = Decimal((value or '').strip())
+    except InvalidOperation:
+        raise ValueError('harga tidak valid')
+    if not price.is_finite() or price < 0 or price >= MAX_PRICE:
+        raise ValueError('harga tidak valid')
+    return price.quantize(Decimal('0.01'))
+
+
+def _parse_capacity(value):
+    value = (value or '').strip()
+    if not value:
+        return None
+    try:
+        capacity = int(value)
+    except ValueError:
+        raise ValueError('kapasitas tidak valid')
+    if capacity < 0:
+        raise ValueError('kapasitas tidak valid')
+    return capacity
+
+
+def _natural_key(row):
+    date = parse_date((row.get('date') or '').strip())
+    if date is None:
+        raise ValueError('tanggal tidak valid')
+    time_value = (row.get('time') or '').strip()
+    time = parse_time(time_value) if time_value else None
+    if time_value and time is None:
+        raise ValueError('jam tidak valid')
+    return (
+        (row.get('category') or '').strip().upper(),
+        (row.get('team1') or '').strip(),
+        (row.get('team2') or '').strip(),
+        date,
+        time,
+    )
+
+
+def _resolve_by_id(parsed, schedules):
+    ids = set()
+    for item in parsed:
+        try:
+            item['schedule_id'] = int(item['row'].get('schedule_id') or '')
+        except ValueError:
+            item['error'] = 'schedule_id tidak valid'
+            continue
+        ids.add(item['schedule_id'])
+    found = set()
+    for chunk in _chunks(ids):
+        found.update(schedules.filter(id__in=chunk).values_list('id', flat=True))
+    for item in parsed:
+        if 'error' not in item and item['schedule_id'] not in found:
+            item['error'] = 'schedule tidak ditemukan'
+
+
+def _resolve_by_natural_key(parsed, schedules):
+    dates = set()
+    for item in parsed:
+        try:
+            item['key'] = _natural_key(item['row'])
+        except ValueError as e:
+            item['error'] = str(e)
+            continue
+        dates.add(item['key'][3])
+
+    # Satu query per potongan tanggal, lalu cocokkan di memori
+    by_day = {}
+    for chunk in _chunks(dates):
+        rows = schedules.filter(date__in=chunk).values_list('id', 'category', 'team1', 'team2', 'date', 'time')
+        for schedule_id, category, team1, team2, date, time in rows:
+            day_key = ((category or '').upper(), team1, team2, date)
+            by_day.setdefault(day_key, []).append((time, schedule_id))
+
+    for item in parsed:
+        if 'error' in item:
+            continue
+        category, team1, team2, date, time = item['key']
+        candidates = by_day.get((category, team1, team2, date), [])
+        if time is not None:
+            candidates = [c for c in candidates if c[0] == time]
+        if not candidates:
+            item['error'] = 'schedule tidak ditemukan'
+        elif len(candidates) > 1:
+            item['error'] = 'schedule ambigu, isi kolom time'
+        else:
+            item['schedule_id'] = candidates[0][1]
+
+
+def import_prices(lines, organizer=None, dry_run=False):
+    """
+    Validasi dan terapkan CSV harga. `lines` adalah iterable baris teks (file
+    yang dibuka mode teks). Jika `organizer` diisi, hanya schedule miliknya
+    yang boleh diubah; schedule tanpa organizer hanya lewat command (organizer=None).
+    Return ImportResult(created, updated, rejected=[(nomor_baris, alasan)]).
+    """
+    reader = csv.DictReader(lines)
+    try:
+        columns = set(reader.fieldnames or [])
+    except csv.Error as e:
+        raise ValueError(f'CSV tidak valid: {e}')
+    if 'price' not in columns:
+        raise ValueError('Kolom price wajib ada.')
+    if 'schedule_id' in columns:
+        resolve = _resolve_by_id
+    elif {'category', 'team1', 'team2', 'date'} <= columns:
+        resolve = _resolve_by_natural_key
+    else:
+        raise ValueError('Butuh kolom schedule_id atau category,team1,team2,date.')
+    has_capacity = 'capacity' in columns
+
+    parsed = []
+    try:
+        for row in reader:
+            item = {'line': reader.line_num, 'row': row}
+            try:
+                item['price'] = _parse_price(row.get('price'))
+                if has_capacity:
+                    item['capacity'] = _parse_capacity(row.get('capacity'))
+            except ValueError as e:
+                item['error'] = str(e)
+            parsed.append(item)
+    except csv.Error as e:
+        raise ValueError(f'CSV tidak valid di baris {reader.line_num}: {e}')
+
+    schedules = Schedule.objects.all()
+    if organizer is not None:
+        schedules = schedules.filter(organizer=organizer)
+    resolve(parsed, schedules)
+
+    accepted = {}
+    for item in parsed:
+        if 'error' in item:
+            continue
+        if item['schedule_id'] in accepted:
+            item['error'] = f"schedule sudah ada di baris {accepted[item['schedule_id']]['line']}"
+            continue
+        accepted[item['schedule_id']] = item
+    rejected = [(item['line'], item['error']) for item in parsed if 'error' in item]
+
+    existing = {}
+    for chunk in _chunks(accepted):
+        for event_price in EventPrice.objects.filter(schedule_id__in=chunk):
+            existing[event_price.schedule_id] = event_price
+
+    to_create, to_update = [], []
+    for schedule_id, item in accepted.items():
+        event_price = existing.get(schedule_id)
+        if event_price is None:
+            to_create.append(EventPrice(schedule_id=schedule_id, price=item['price'], capacity=item.get('capacity')))
+        else:
+            event_price.price = item['price']
+            if has_capacity:
+                event_price.capacity = item['capacity']
+            to_update.append(event_price)
+    update_fields = ['price', 'capacity'] if has_capacity else ['price']
+
+    if not dry_run and (to_create or to_update):
+        try:
+            with transaction.atomic():
+                EventPrice.objects.bulk_create(to_create, batch_size=BULK_BATCH_SIZE)
+                EventPrice.objects.bulk_update(to_update, update_fields, batch_size=BULK_BATCH_SIZE)
+        except IntegrityError:
+            # Import lain membuat harga untuk schedule yang sama setelah kita membaca
+            # `existing`; seluruh batch di-rollback, import aman diulang.
+            raise ValueError('Harga diubah import lain secara bersamaan, silakan ulangi import.')
+        # bulk_* tidak mengirim post_save, jadi cache jadwal di-invalidasi manual
+        transaction.on_commit(bump_schedules_version)
+
+    return ImportResult(len(to_create), len(to_update), rejected)
@@ -0,0 +1,75 @@
+"""
+Penyimpanan gambar QR tiket.
+
+Gambar QR dibuat sekali per tiket, disimpan di disk dengan nama file = sha256
+dari payload (content-addressed), lalu digest-nya dicatat di Ticket.qr_code.
+Request berikutnya cukup membaca file (atau LRU di memori) tanpa encode ulang.
+"""
+import base64
+import hashlib
+import os
+import tempfile
+from functools import lru_cache
+from io import BytesIO
+from pathlib import Path
+
+import qrcode
+from django.conf import settings
+
+from . import signing
+
+QR_CACHE_SIZE = 1024
+
+
+def qr_root():
+    return Path(getattr(settings, 'TICKET_QR_ROOT', Path(settings.MEDIA_ROOT) / 'qr'))
+
+
+def qr_path(digest):
+    """Path file QR untuk sebuah digest (dibagi ke subfolder 2 huruf pertama)."""
+    return qr_root() / digest[:2] / f"{digest}.png"
+
+
+def qr_payload(ticket_id, schedule_id, event_date, event_time):
+    """Payload QR bertanda tangan HMAC (lihat ticketing/signing.py)."""
+    expires = signing.ticket_expiry(event_date, event_time)
+    return signing.sign_ticket(ticket_id, schedule_id, expires)
+
+
+def payload_digest(data):
+    """Nama file / ETag untuk payload `data`; berubah kalau waktu event berubah."""
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+def render_qr_png(data):
+    qr = qrcode.make(data)
+    buffer = BytesIO()
+    qr.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def store_qr(data):
+    """
+    Render dan simpan QR untuk payload `data` jika belum ada.
+    Return digest yang dipakai sebagai nama file sekaligus ETag.
+    """
+    digest = payload_digest(data)
+    path = qr_path(digest)
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Tulis ke file sementara lalu rename supaya pembaca tidak melihat file setengah jadi
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as tmp:
+            tmp.write(render_qr_png(data))
+        os.replace(tmp_name, path)
+    return digest
+
+
+@lru_cache(maxsize=QR_CACHE_SIZE)
+def load_qr(digest):
+    """
+    Return (png_bytes, base64_str) untuk digest.
+    Raise FileNotFoundError jika file belum ada (miss tidak ikut di-cache).
+    """
+    png = qr_path(digest).read_bytes()
+    return png, base64.b64encode(png).decode()
@@ -0,0 +1,15 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from scheduling.models import Schedule
+from scheduling.signals import schedules_bulk_updated
+
+from .cache import bump_schedules_version
+from .models import EventPrice
+
+
+@receiver([post_save, post_delete], sender=Schedule)
+@receiver([post_save, post_delete], sender=EventPrice)
+@receiver(schedules_bulk_updated)
+def invalidate_schedules_cache(sender, **kwargs):
+    bump_schedules_version()
@@ -0,0 +1,85 @@
+"""
+Payload QR tiket yang ditandatangani HMAC.
+
+Format (ASCII, dipisah titik):
+
+    T1.<ticket_id>.<schedule_id>.<expires>.<signature>
+
+- expires   : unix timestamp (detik) kapan QR berhenti berlaku
+- signature : base64url tanpa padding dari 16 byte pertama
+              HMAC-SHA256(key, "T1.<ticket_id>.<schedule_id>.<expires>")
+
+Verifikasi hanya butuh key dan jam, tanpa query database, sehingga perangkat
+gate bisa menolak QR palsu / QR event lain secara lokal dan hanya menghubungi
+server untuk menandai tiket terpakai.
+"""
+import base64
+import hashlib
+import hmac
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.signing import BadSignature, SignatureExpired
+from django.utils import timezone
+
+PAYLOAD_VERSION = 'T1'
+SIGNATURE_BYTES = 16
+DEFAULT_GRACE = timedelta(days=1)
+
+SignedTicket = namedtuple('SignedTicket', ['ticket_id', 'schedule_id', 'expires'])
+
+
+def signing_key():
+    key = getattr(settings, 'TICKET_QR_SIGNING_KEY', None)
+    if key:
+        return key.encode() if isinstance(key, str) else key
+    return hashlib.sha256(b'ticketing.qr:' + settings.SECRET_KEY.encode()).digest()
+
+
+def _signature(key, message):
+    digest = hmac.new(key, message, hashlib.sha256).digest()[:SIGNATURE_BYTES]
+    return base64.urlsafe_b64encode(digest).rstrip(b'=')
+
+
+def ticket_expiry(event_date, event_time, grace=DEFAULT_GRACE):
+    """Unix timestamp berakhirnya masa berlaku QR: waktu event + grace."""
+    event_at = timezone.make_aware(datetime.combine(event_date, event_time))
+    return int((event_at + grace).timestamp())
+
+
+def sign_ticket(ticket_id, schedule_id, expires, key=None):
+    body = f"{PAYLOAD_VERSION}.{int(ticket_id)}.{int(schedule_id)}.{int(expires)}".encode()
+    return (body + b'.' + _signature(key or signing_key(), body)).decode()
+
+
+def verify_ticket(payload, schedule_id=None, now=None, key=None):
+    """
+    Verifikasi payload QR tanpa menyentuh database.
+
+    Raise BadSignature jika payload rusak/dipalsukan atau bukan untuk
+    `schedule_id`, SignatureExpired jika sudah kedaluwarsa.
+    """
+    if isinstance(payload, str):
+        payload = payload.encode()
+    body, sep, signature = payload.rpartition(b'.')
+    if not sep:
+        raise BadSignature('Format QR tidak valid.')
+    if not hmac.compare_digest(signature, _signature(key or signing_key(), body)):
+        raise BadSignature('Tanda tangan QR tidak valid.')
+
+    try:
+        version, ticket_id, signed_schedule_id, expires = body.split(b'.')
+        ticket_id, signed_schedule_id, expires = int(ticket_id), int(signed_schedule_id), int(expires)
+    except ValueError:
+        raise BadSignature('Format QR tidak valid.')
+    if version != PAYLOAD_VERSION.encode():
+        raise BadSignature('Versi QR tidak dikenal.')
+
+    if schedule_id is not None and signed_schedule_id != int(schedule_id):
+        raise BadSignature('Tiket bukan untuk event ini.')
+    if expires < (time.time() if now is None else now):
+        raise SignatureExpired('QR tiket sudah kedaluwarsa.')
+
+    return SignedTicket(ticket_id, signed_schedule_id, expires)
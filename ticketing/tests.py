@@ -1,11 +1,32 @@
 # ticketing/tests.py
-from django.test import TestCase, Client
+from django.test import TestCase, TransactionTestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.signing import BadSignature, SignatureExpired
+from django.db import connection, IntegrityError, OperationalError
 from django.urls import reverse
 from django.utils import timezone
-from .models import Ticket, EventPrice
+from .models import Ticket, EventPrice, ScheduleSalesStats, IdempotencyKey, GateManifestChange
+from . import qr, signing
+from .price_import import import_prices
+from .views import SCAN_BATCH_LIMIT, TICKETS_PAGE_SIZE, _create_ticket
 from users.models import User
 from scheduling.models import Schedule
+from datetime import date, time, timedelta
+from io import BytesIO, StringIO
+import gzip
+import hashlib
+import itertools
 import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time as pytime
+import zipfile
 
 class TicketingTestCase(TestCase):
 
@@ -118,3 +139,1165 @@ class TicketingTestCase(TestCase):
         self.event_price.refresh_from_db()
         self.assertEqual(float(self.event_price.price), 90000.0)
         self.assertIn('<tr>', data['html'])
+
+
+class TicketInventoryTestCase(TransactionTestCase):
+    """Kuota kursi harus tetap benar walau banyak pembeli membeli bersamaan."""
+
+    CAPACITY = 5
+    BUYERS = 20
+    MAX_ATTEMPTS = 200
+
+    def setUp(self):
+        self.schedule = Schedule.objects.create(
+            category='FUTSAL', team1='FT', team2='FH', location='SOR',
+            date=timezone.localdate(), time=time(19, 0), status='upcoming',
+        )
+        self.event_price = EventPrice.objects.create(
+            schedule=self.schedule, price=50000, capacity=self.CAPACITY
+        )
+        self.users = [
+            User.objects.create(username=f'buyer{i}', email=f'buyer{i}@example.com', role='user')
+            for i in range(self.BUYERS)
+        ]
+
+    def _buy(self, username):
+        # raise_request_exception=False: error view jadi respons 500. Exception yang
+        # dilempar ulang test client tidak aman dipakai antar thread (sinyalnya global).
+        return Client(raise_request_exception=False).post(
+            reverse('buy_flutter'),
+            data=json.dumps({'schedule_id': self.schedule.id, 'username': username}),
+            content_type='application/json',
+        )
+
+    def test_buy_flutter_rejects_when_sold_out(self):
+        for user in self.users[:self.CAPACITY]:
+            self.assertEqual(self._buy(user.username).json()['status'], 'success')
+
+        response = self._buy(self.users[-1].username)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['status'], 'error')
+        self.assertEqual(response.json()['code'], 'sold_out')
+
+        self.event_price.refresh_from_db()
+        self.assertEqual(self.event_price.sold, self.CAPACITY)
+        self.assertEqual(self.event_price.remaining, 0)
+        self.assertEqual(Ticket.objects.filter(schedule=self.schedule).count(), self.CAPACITY)
+
+    def test_unlimited_capacity_keeps_counting(self):
+        self.event_price.capacity = None
+        self.event_price.save()
+        for user in self.users[:3]:
+            self.assertEqual(self._buy(user.username).json()['status'], 'success')
+        self.event_price.refresh_from_db()
+        self.assertEqual(self.event_price.sold, 3)
+        self.assertIsNone(self.event_price.remaining)
+
+    def test_price_only_edit_keeps_capacity(self):
+        response = Client().post(
+            reverse('set_price_flutter'),
+            data=json.dumps({'schedule_id': self.schedule.id, 'price': 60000}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.json()['status'], 'success')
+        self.event_price.refresh_from_db()
+        self.assertEqual((self.event_price.price, self.event_price.capacity), (60000, self.CAPACITY))
+
+        organizer = User.objects.create_user(username='org', email='org@example.com', password='pass123', role='organizer')
+        client = Client()
+        client.force_login(organizer)
+        client.post(reverse('set_event_price_ajax'), {'schedule_id': self.schedule.id, 'price': 70000})
+        self.event_price.refresh_from_db()
+        self.assertEqual((self.event_price.price, self.event_price.capacity), (70000, self.CAPACITY))
+
+        # Field kapasitas dikirim kosong: batas kursi memang dihapus
+        client.post(reverse('set_event_price_ajax'), {'schedule_id': self.schedule.id, 'price': 70000, 'capacity': ''})
+        self.event_price.refresh_from_db()
+        self.assertIsNone(self.event_price.capacity)
+
+    def test_concurrent_buyers_never_oversell(self):
+        barrier = threading.Barrier(self.BUYERS)
+        results = []
+        lock = threading.Lock()
+
+        def worker(username):
+            try:
+                barrier.wait()
+                # SQLite (shared-cache) bisa menolak dengan "table is locked" -> 500;
+                # client mengulang seperti aplikasi Flutter sampai dapat jawaban final
+                for _ in range(self.MAX_ATTEMPTS):
+                    response = self._buy(username)
+                    if response.status_code < 500:
+                        break
+                    connection.close()
+                    pytime.sleep(0.01)
+                if response.status_code >= 500:
+                    outcome = 'exception'
+                else:
+                    data = response.json()
+                    outcome = data.get('code', data['status'])
+                with lock:
+                    results.append(outcome)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(u.username,)) for u in self.users]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.event_price.refresh_from_db()
+        ticket_count = Ticket.objects.filter(schedule=self.schedule).count()
+        self.assertEqual(len(results), self.BUYERS)
+        # Tepat CAPACITY pembeli berhasil, sisanya ditolak sebagai sold out (bukan error)
+        self.assertEqual(results.count('success'), self.CAPACITY)
+        self.assertEqual(results.count('sold_out'), self.BUYERS - self.CAPACITY)
+        self.assertEqual(self.event_price.sold, self.CAPACITY)
+        self.assertEqual(ticket_count, self.CAPACITY)
+
+
+class TicketQRStoreTestCase(TestCase):
+
+    def setUp(self):
+        self.qr_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.qr_dir, ignore_errors=True)
+        override = override_settings(TICKET_QR_ROOT=self.qr_dir)
+        override.enable()
+        self.addCleanup(override.disable)
+        qr.load_qr.cache_clear()
+
+        self.user = User.objects.create(username='qruser', email='qruser@example.com', role='user')
+        self.schedule = Schedule.objects.create(
+            category='BASKET', team1='FT', team2='FK', location='GOR',
+            date=timezone.localdate(), time=time(16, 0),
+        )
+        self.ticket = Ticket.objects.create(
+            schedule=self.schedule, buyer=self.user, price=25000, payment_status='paid'
+        )
+        self.url = reverse('generate_qr', args=[self.ticket.id])
+        self.client.force_login(self.user)
+
+    def test_first_hit_persists_qr_and_sets_etag(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['qr_code'])
+        self.assertIn('max-age', response['Cache-Control'])
+
+        self.ticket.refresh_from_db()
+        self.assertTrue(self.ticket.qr_code)
+        self.assertEqual(response['ETag'], f'"{self.ticket.qr_code}"')
+        self.assertTrue(qr.qr_path(self.ticket.qr_code).exists())
+
+    def test_cached_hit_is_single_query_and_supports_304(self):
+        first = self.client.get(self.url)
+        # sesi + user + satu query tiket
+        with self.assertNumQueries(3):
+            second = self.client.get(self.url)
+        self.assertEqual(first.json(), second.json())
+
+        not_modified = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_png_format(self):
+        response = self.client.get(self.url, {'format': 'png'})
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertTrue(response.content.startswith(b'\x89PNG'))
+
+    def test_missing_file_is_regenerated(self):
+        self.client.get(self.url)
+        self.ticket.refresh_from_db()
+        qr.qr_path(self.ticket.qr_code).unlink()
+        qr.load_qr.cache_clear()
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(qr.qr_path(self.ticket.qr_code).exists())
+
+    def test_only_buyer_or_organizer_can_view(self):
+        organizer = User.objects.create(username='qrorg', email='qrorg@example.com', role='organizer')
+        Schedule.objects.filter(pk=self.schedule.pk).update(organizer=organizer)
+        stranger = User.objects.create(username='qrasing', email='qrasing@example.com', role='user')
+
+        self.client.force_login(stranger)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        self.client.force_login(organizer)
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.client.logout()
+        self.assertEqual(self.client.get(self.url).status_code, 302)
+
+    def test_reschedule_replaces_qr(self):
+        first = self.client.get(self.url)
+        self.schedule.time = time(19, 0)
+        self.schedule.save()
+
+        second = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 200)
+        self.assertNotEqual(second['ETag'], first['ETag'])
+        self.ticket.refresh_from_db()
+        payload = qr.qr_payload(self.ticket.id, self.schedule.id, self.schedule.date, self.schedule.time)
+        self.assertEqual(signing.verify_ticket(payload).expires,
+                         signing.ticket_expiry(self.schedule.date, time(19, 0)))
+        self.assertEqual(self.ticket.qr_code, hashlib.sha256(payload.encode()).hexdigest())
+
+
+class SignedQRTestCase(TestCase):
+
+    def setUp(self):
+        self.expires = int(pytime.time()) + 3600
+        self.payload = signing.sign_ticket(42, 7, self.expires)
+
+    def test_roundtrip(self):
+        signed = signing.verify_ticket(self.payload, schedule_id=7)
+        self.assertEqual(signed, (42, 7, self.expires))
+
+    def test_tampered_payload_rejected(self):
+        forged = self.payload.replace('T1.42.', 'T1.43.', 1)
+        with self.assertRaises(BadSignature):
+            signing.verify_ticket(forged)
+
+    def test_wrong_event_rejected(self):
+        with self.assertRaises(BadSignature):
+            signing.verify_ticket(self.payload, schedule_id=8)
+
+    def test_expired_rejected(self):
+        with self.assertRaises(SignatureExpired):
+            signing.verify_ticket(self.payload, now=self.expires + 1)
+
+    def test_verify_endpoint_does_not_query_db(self):
+        url = reverse('verify_qr_flutter')
+        with self.assertNumQueries(0):
+            ok = self.client.get(url, {'payload': self.payload, 'schedule_id': 7}).json()
+            bad = self.client.get(url, {'payload': self.payload + 'x'}).json()
+        self.assertEqual(ok['status'], 'success')
+        self.assertEqual(ok['ticket_id'], 42)
+        self.assertEqual(bad['reason'], 'invalid')
+
+    def test_generated_qr_uses_signed_payload(self):
+        schedule = Schedule.objects.create(
+            category='VOLI', team1='FIB', team2='FEB', location='GOR',
+            date=timezone.localdate(), time=time(10, 0),
+        )
+        buyer = User.objects.create(username='qrsigned', email='qrsigned@example.com', role='user')
+        ticket = Ticket.objects.create(schedule=schedule, buyer=buyer, price=10000, payment_status='paid')
+        self.client.force_login(buyer)
+        qr_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, qr_dir, ignore_errors=True)
+        with override_settings(TICKET_QR_ROOT=qr_dir):
+            self.client.get(reverse('generate_qr', args=[ticket.id]))
+        ticket.refresh_from_db()
+        payload = qr.qr_payload(ticket.id, schedule.id, schedule.date, schedule.time)
+        self.assertEqual(ticket.qr_code, hashlib.sha256(payload.encode()).hexdigest())
+        self.assertEqual(signing.verify_ticket(payload, schedule_id=schedule.id).ticket_id, ticket.id)
+
+
+class TicketScanTestCase(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(username='gateuser', email='gateuser@example.com', role='user')
+        self.organizer = User.objects.create(username='gateadmin', email='gateadmin@example.com', role='organizer')
+        self.schedule = Schedule.objects.create(
+            category='FUTSAL', team1='FMIPA', team2='FASILKOM', location='SOR',
+            date=timezone.localdate(), time=time(19, 0), organizer=self.organizer,
+        )
+        self.paid = [
+            Ticket.objects.create(schedule=self.schedule, buyer=self.user, price=10000, payment_status='paid')
+            for _ in range(3)
+        ]
+        self.unpaid = Ticket.objects.create(schedule=self.schedule, buyer=self.user, price=10000)
+        ScheduleSalesStats.objects.create(schedule=self.schedule, tickets_sold=4, tickets_paid=3)
+
+    def test_scan_flutter_admits_once(self):
+        url = reverse('scan_flutter', args=[self.paid[0].id])
+        # klaim + update counter statistik (plus SAVEPOINT/RELEASE dari atomic di dalam TestCase)
+        with self.assertNumQueries(4):
+            first = self.client.get(url).json()
+        second = self.client.get(url).json()
+        self.assertEqual(first['status'], 'success')
+        self.assertEqual(second['status'], 'error')
+        self.assertEqual(second['message'], 'Tiket sudah pernah digunakan!')
+        self.paid[0].refresh_from_db()
+        self.assertTrue(self.paid[0].is_used)
+        self.assertIsNotNone(self.paid[0].used_at)
+
+    def test_scan_flutter_unpaid_and_missing(self):
+        unpaid = self.client.get(reverse('scan_flutter', args=[self.unpaid.id])).json()
+        self.assertEqual(unpaid['message'], 'Tiket belum dibayar, tidak bisa digunakan!')
+        missing = self.client.get(reverse('scan_flutter', args=[999999]))
+        self.assertEqual(missing.status_code, 404)
+
+    def test_batch_scan_reports_each_ticket(self):
+        expires = int(pytime.time()) + 3600
+        payload = signing.sign_ticket(self.paid[2].id, self.schedule.id, expires)
+        body = {
+            'schedule_id': self.schedule.id,
+            'ticket_ids': [self.paid[0].id, self.paid[1].id, self.paid[0].id, self.unpaid.id, 999999, 'abc'],
+            'payloads': [payload, payload + 'x'],
+        }
+        self.client.force_login(self.organizer)
+        # sesi + user + cek kepemilikan schedule, lalu 5 query scan
+        with self.assertNumQueries(8):
+            response = self.client.post(
+                reverse('scan_batch_flutter'), data=json.dumps(body), content_type='application/json'
+            )
+        data = response.json()
+        reasons = [r['reason'] for r in data['results']]
+        self.assertEqual(reasons, ['ok', 'ok', 'used', 'unpaid', 'not_found', 'invalid', 'ok', 'invalid'])
+        self.assertEqual(data['admitted'], 3)
+        self.assertEqual(Ticket.objects.filter(is_used=True).count(), 3)
+        self.assertEqual(ScheduleSalesStats.objects.get(schedule=self.schedule).tickets_used, 3)
+
+    def test_batch_scan_requires_owning_organizer(self):
+        body = json.dumps({'schedule_id': self.schedule.id, 'ticket_ids': [self.paid[0].id]})
+        url = reverse('scan_batch_flutter')
+        self.assertEqual(self.client.post(url, data=body, content_type='application/json').status_code, 403)
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.post(url, data=body, content_type='application/json').status_code, 403)
+        rival = User.objects.create(username='gaterival', email='gaterival@example.com', role='organizer')
+        self.client.force_login(rival)
+        self.assertEqual(self.client.post(url, data=body, content_type='application/json').status_code, 404)
+        self.client.force_login(self.organizer)
+        missing = json.dumps({'ticket_ids': [self.paid[0].id]})
+        self.assertEqual(self.client.post(url, data=missing, content_type='application/json').status_code, 400)
+        self.paid[0].refresh_from_db()
+        self.assertFalse(self.paid[0].is_used)
+
+    def test_batch_scan_limit(self):
+        self.client.force_login(self.organizer)
+        response = self.client.post(
+            reverse('scan_batch_flutter'),
+            data=json.dumps({'schedule_id': self.schedule.id, 'ticket_ids': list(range(SCAN_BATCH_LIMIT + 1))}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_batch_scan_checks_schedule_for_plain_ids(self):
+        other = Schedule.objects.create(
+            category='BASKET', team1='FT', team2='FK', location='GOR',
+            date=timezone.localdate(), time=time(20, 0),
+        )
+        elsewhere = Ticket.objects.create(schedule=other, price=10000, payment_status='paid')
+        body = {
+            'schedule_id': self.schedule.id,
+            'ticket_ids': [elsewhere.id, self.unpaid.id, self.unpaid.id, elsewhere.id],
+        }
+        self.client.force_login(self.organizer)
+        data = self.client.post(
+            reverse('scan_batch_flutter'), data=json.dumps(body), content_type='application/json'
+        ).json()
+        self.assertEqual([r['reason'] for r in data['results']],
+                         ['wrong_schedule', 'unpaid', 'unpaid', 'wrong_schedule'])
+        self.assertEqual(data['admitted'], 0)
+        elsewhere.refresh_from_db()
+        self.assertFalse(elsewhere.is_used)
+
+
+class ConcurrentScanTestCase(TransactionTestCase):
+
+    def test_two_gates_cannot_admit_same_ticket(self):
+        schedule = Schedule.objects.create(
+            category='FUTSAL', team1='FT', team2='FK', location='SOR',
+            date=timezone.localdate(), time=time(19, 0),
+        )
+        ticket = Ticket.objects.create(schedule=schedule, price=10000, payment_status='paid')
+        gates = 8
+        barrier = threading.Barrier(gates)
+        results = []
+        lock = threading.Lock()
+
+        def gate():
+            try:
+                barrier.wait()
+                try:
+                    status = Client().get(reverse('scan_flutter', args=[ticket.id])).json()['status']
+                except OperationalError:
+                    status = 'error'
+                with lock:
+                    results.append(status)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=gate) for _ in range(gates)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(len(results), gates)
+        self.assertLessEqual(results.count('success'), 1)
+
+
+class GateManifestTestCase(TestCase):
+
+    def setUp(self):
+        self.organizer = User.objects.create(username='gateorg', email='gateorg@example.com', role='organizer')
+        self.schedule = Schedule.objects.create(
+            category='SEPAK BOLA', team1='FT', team2='FMIPA', location='STADION',
+            date=timezone.localdate(), time=time(19, 0), organizer=self.organizer,
+        )
+        self.tickets = [
+            Ticket.objects.create(schedule=self.schedule, price=10000) for _ in range(5)
+        ]
+        self.url = reverse('gate_manifest_flutter', args=[self.schedule.id])
+
+    def _get(self, **params):
+        response = self.client.get(self.url, params, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        body = gzip.decompress(b''.join(response.streaming_content))
+        return response, json.loads(body)
+
+    def test_requires_organizer(self):
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    def test_full_manifest_and_incremental_diff(self):
+        self.client.force_login(self.organizer)
+        for ticket in self.tickets[:3]:
+            ticket.mark_paid()
+
+        response, data = self._get()
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(data['count'], 3)
+        ids = list(itertools.accumulate(data['ticket_ids']))
+        self.assertEqual(ids, [t.id for t in self.tickets[:3]])
+        version = data['version']
+
+        self.tickets[4].mark_paid()
+        self.tickets[4].mark_paid()  # bayar ulang tidak menambah perubahan
+        _, diff = self._get(since=version)
+        self.assertEqual(diff['added'], [self.tickets[4].id])
+        self.assertGreater(diff['version'], version)
+
+        not_modified = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'], HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(not_modified.status_code, 200)  # versi sudah berubah
+        latest, _ = self._get()
+        again = self.client.get(self.url, HTTP_IF_NONE_MATCH=latest['ETag'], HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(again.status_code, 304)
+
+    def test_plain_json_without_accept_encoding(self):
+        self.client.force_login(self.organizer)
+        self.tickets[1].mark_paid()
+        response = self.client.get(self.url)
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertIn('Accept-Encoding', response['Vary'])
+        data = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(data['ticket_ids'], [self.tickets[1].id])
+
+    def test_other_organizers_schedule_is_hidden(self):
+        other = User.objects.create(username='gateorg2', email='gateorg2@example.com', role='organizer')
+        Schedule.objects.filter(pk=self.schedule.pk).update(organizer=other)
+        self.client.force_login(self.organizer)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+        # Jadwal tanpa organizer: tidak ada organizer yang boleh mengunduh
+        Schedule.objects.filter(pk=self.schedule.pk).update(organizer=None)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    def test_changes_are_recorded_under_schedule_lock(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.tickets[0].mark_paid()
+        sql = [q['sql'] for q in ctx.captured_queries]
+        lock_at = next(i for i, q in enumerate(sql) if 'FROM "scheduling_schedule"' in q)
+        insert_at = next(i for i, q in enumerate(sql) if q.startswith('INSERT INTO "ticketing_gatemanifestchange"'))
+        self.assertLess(lock_at, insert_at)
+
+    def test_export_command_writes_gzip(self):
+        self.tickets[0].mark_paid()
+        out_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, out_dir, ignore_errors=True)
+        output = os.path.join(out_dir, 'manifest.json.gz')
+        call_command('export_gate_manifest', self.schedule.id, output=output, stdout=StringIO())
+        with gzip.open(output) as f:
+            data = json.load(f)
+        self.assertEqual(data['ticket_ids'], [self.tickets[0].id])
+
+
+class EventPriceListingTestCase(TestCase):
+
+    def setUp(self):
+        self.organizer = User.objects.create(username='priceorg', email='priceorg@example.com', role='organizer')
+        self.other = User.objects.create(username='otherorg', email='otherorg@example.com', role='organizer')
+        self.client.force_login(self.organizer)
+
+    def _make_prices(self, n, organizer):
+        for i in range(n):
+            schedule = Schedule.objects.create(
+                organizer=organizer, category='BASKET', team1=f'T{i}', team2='FH', location='GOR',
+                date=timezone.localdate(), time=time(8, 0),
+            )
+            EventPrice.objects.create(schedule=schedule, price=1000 + i)
+
+    def _count_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('set_event_price'))
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response
+
+    def test_listing_query_count_is_constant(self):
+        self._make_prices(1, self.organizer)
+        small, _ = self._count_queries()
+        self._make_prices(20, self.organizer)
+        large, response = self._count_queries()
+        self.assertEqual(small, large)
+        self.assertEqual(len(response.context['prices']), 21)
+
+    def test_listing_only_shows_own_upcoming_events(self):
+        self._make_prices(2, self.organizer)
+        self._make_prices(3, self.other)
+        Schedule.objects.filter(team1='T1', organizer=self.organizer).update(status='completed')
+        _, response = self._count_queries()
+        self.assertEqual([p.schedule.team1 for p in response.context['prices']], ['T0'])
+
+    def test_repair_command_removes_corrupt_prices(self):
+        self._make_prices(3, self.organizer)
+        bad_ids = list(EventPrice.objects.order_by('id').values_list('id', flat=True)[:2])
+        table = EventPrice._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(f"UPDATE {table} SET price = 'abc' WHERE id = %s", [bad_ids[0]])
+            cursor.execute(f"UPDATE {table} SET price = '' WHERE id = %s", [bad_ids[1]])
+
+        out = StringIO()
+        call_command('repair_event_prices', '--dry-run', '--batch-size', '2', stdout=out)
+        self.assertIn('2 korup', out.getvalue())
+        self.assertEqual(EventPrice.objects.count(), 3)
+
+        call_command('repair_event_prices', '--batch-size', '2', stdout=StringIO())
+        self.assertEqual(EventPrice.objects.count(), 1)
+
+
+class SchedulesJsonFlutterTestCase(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('schedules_json_flutter')
+
+    def _make_schedules(self, n, start_day=1, status='upcoming', priced=True):
+        for i in range(n):
+            schedule = Schedule.objects.create(
+                category='FUTSAL', team1=f'T{start_day + i}', team2='FK', location='SOR',
+                date=date(2025, 11, start_day + i), time=time(19, 0), status=status,
+            )
+            if priced:
+                EventPrice.objects.create(schedule=schedule, price=5000 + i)
+
+    def test_query_count_is_constant_and_warm_hits_skip_db(self):
+        self._make_schedules(2)
+        with self.assertNumQueries(1):
+            self.client.get(self.url)
+        self._make_schedules(20, start_day=3, priced=False)
+        with self.assertNumQueries(1):
+            data = self.client.get(self.url).json()
+        self.assertEqual(len(data['schedules']), 22)
+        self.assertEqual(data['schedules'][0]['price'], 5000.0)
+        self.assertIsNone(data['schedules'][-1]['price'])
+        with self.assertNumQueries(0):
+            self.client.get(self.url)
+
+    def test_price_write_invalidates_cache(self):
+        self._make_schedules(1)
+        self.assertEqual(self.client.get(self.url).json()['schedules'][0]['price'], 5000.0)
+        EventPrice.objects.update_or_create(schedule=Schedule.objects.get(), defaults={'price': 7500})
+        self.assertEqual(self.client.get(self.url).json()['schedules'][0]['price'], 7500.0)
+
+    def test_filters_and_pagination(self):
+        self._make_schedules(5)
+        self._make_schedules(2, start_day=10, status='completed')
+
+        data = self.client.get(self.url, {'status': 'upcoming', 'date_from': '2025-11-02', 'limit': 2}).json()
+        self.assertEqual([s['team1'] for s in data['schedules']], ['T2', 'T3'])
+        self.assertEqual(data['next_offset'], 2)
+
+        data = self.client.get(self.url, {
+            'status': 'upcoming', 'date_from': '2025-11-02', 'limit': 2, 'offset': data['next_offset'],
+        }).json()
+        self.assertEqual([s['team1'] for s in data['schedules']], ['T4', 'T5'])
+        self.assertIsNone(data['next_offset'])
+
+        data = self.client.get(self.url, {'date_to': '2025-11-01'}).json()
+        self.assertEqual(len(data['schedules']), 1)
+        self.assertEqual(self.client.get(self.url, {'date_from': 'kemarin'}).status_code, 400)
+
+
+class TicketHistoryPaginationTestCase(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(username='fan', email='fan@example.com', role='user')
+        self.other = User.objects.create(username='fan2', email='fan2@example.com', role='user')
+        self.schedule = Schedule.objects.create(
+            category='BADMINTON', team1='FEB', team2='FH', location='GOR',
+            date=timezone.localdate(), time=time(9, 0),
+        )
+        base = timezone.now()
+        self.tickets = []
+        for i in range(7):
+            ticket = Ticket.objects.create(
+                schedule=self.schedule, buyer=self.user, price=1000,
+                payment_status='paid' if i % 2 else 'unpaid',
+                # dua tiket terakhir punya purchase_date sama untuk menguji tie-break id
+                purchase_date=base - timedelta(minutes=min(i, 5)),
+            )
+            self.tickets.append(ticket)
+        Ticket.objects.create(schedule=self.schedule, buyer=self.other, price=1000)
+
+    def _walk(self, url, params, queries=1):
+        ids, cursor, pages = [], None, 0
+        while True:
+            query = dict(params, **({'cursor': cursor} if cursor else {}))
+            with self.assertNumQueries(queries):
+                data = self.client.get(url, query).json()
+            ids += [int(t['id']) for t in data['tickets']]
+            cursor = data['next_cursor']
+            pages += 1
+            if not cursor:
+                return ids, pages
+
+    def test_tickets_flutter_pages_cover_history_once(self):
+        expected = [t.id for t in sorted(self.tickets, key=lambda t: (t.purchase_date, t.id), reverse=True)]
+        ids, pages = self._walk(reverse('tickets_flutter'), {'username': 'fan', 'limit': 3})
+        self.assertEqual(ids, expected)
+        self.assertEqual(pages, 3)
+
+    def test_tickets_flutter_filters_and_unknown_user(self):
+        ids, _ = self._walk(reverse('tickets_flutter'), {'username': 'fan', 'limit': 2, 'payment_status': 'paid'})
+        self.assertEqual(sorted(ids), sorted(t.id for t in self.tickets if t.payment_status == 'paid'))
+        data = self.client.get(reverse('tickets_flutter'), {'username': 'nobody'}).json()
+        self.assertEqual(data['message'], 'User not found')
+        bad = self.client.get(reverse('tickets_flutter'), {'username': 'fan', 'cursor': '!!'})
+        self.assertEqual(bad.status_code, 400)
+
+    def test_ticket_list_json_paginates_with_schedule_join(self):
+        self.client.force_login(self.user)
+        url = reverse('ticket_list_json')
+        first = self.client.get(url, {'limit': 4}).json()
+        self.assertEqual(len(first['tickets']), 4)
+        self.assertEqual(first['tickets'][0]['team1'], 'FEB')
+        second = self.client.get(url, {'limit': 4, 'cursor': first['next_cursor']}).json()
+        self.assertEqual(len(second['tickets']), 3)
+        self.assertIsNone(second['next_cursor'])
+
+    def test_ticket_list_page_requests_bounded_pages(self):
+        Ticket.objects.bulk_create([
+            Ticket(schedule=self.schedule, buyer=self.user, price=1000)
+            for _ in range(TICKETS_PAGE_SIZE)
+        ])
+        self.client.force_login(self.user)
+        page = self.client.get(reverse('ticket_list')).content.decode()
+        page_size = int(re.search(r'data-page-size="(\d+)"', page).group(1))
+        self.assertEqual(page_size, TICKETS_PAGE_SIZE)
+        self.assertIn('&limit=${pageSize}${cursorParam}', page)
+
+        # Query yang sama dengan yang dikirim tombol "Muat Lebih Banyak"
+        params = {'payment_status': 'all', 'usage_status': 'all', 'limit': page_size}
+        ids, pages = self._walk(reverse('ticket_list_json'), params, queries=3)  # + session & user
+        self.assertEqual(len(ids), len(set(ids)))
+        self.assertEqual(len(ids), len(self.tickets) + TICKETS_PAGE_SIZE)
+        self.assertEqual(pages, 2)
+
+    def test_without_limit_or_cursor_returns_full_history(self):
+        extra = [
+            Ticket(schedule=self.schedule, buyer=self.user, price=1000)
+            for _ in range(TICKETS_PAGE_SIZE)
+        ]
+        Ticket.objects.bulk_create(extra)
+        data = self.client.get(reverse('tickets_flutter'), {'username': 'fan'}).json()
+        self.assertEqual(len(data['tickets']), len(self.tickets) + TICKETS_PAGE_SIZE)
+        self.assertIsNone(data['next_cursor'])
+
+
+class SalesStatsTestCase(TestCase):
+
+    def setUp(self):
+        self.organizer = User.objects.create(username='panitia', email='panitia@example.com', role='organizer')
+        self.buyer = User.objects.create(username='pembeli', email='pembeli@example.com', role='user')
+        self.schedule = Schedule.objects.create(
+            category='BASKET', team1='FT', team2='FK', location='GOR',
+            date=timezone.localdate(), time=time(16, 0), organizer=self.organizer,
+        )
+        self.other = Schedule.objects.create(
+            category='BASKET', team1='FIB', team2='FPsi', location='GOR',
+            date=timezone.localdate(), time=time(18, 0),
+        )
+        EventPrice.objects.create(schedule=self.schedule, price=25000, capacity=10)
+
+    def _stats(self):
+        return ScheduleSalesStats.objects.get(schedule=self.schedule)
+
+    def test_counters_follow_buy_pay_scan(self):
+        self.client.force_login(self.buyer)
+        for _ in range(3):
+            response = self.client.post(
+                reverse('buy_flutter'),
+                data=json.dumps({'schedule_id': self.schedule.id, 'username': 'pembeli'}),
+                content_type='application/json',
+            )
+            self.assertEqual(response.json()['status'], 'success')
+        tickets = list(Ticket.objects.filter(schedule=self.schedule))
+        stats = self._stats()
+        self.assertEqual((stats.tickets_sold, stats.tickets_paid, stats.tickets_used), (3, 0, 0))
+
+        self.assertTrue(tickets[0].mark_paid())
+        self.assertTrue(tickets[1].mark_paid())
+        self.assertFalse(tickets[1].mark_paid())
+        Ticket.scan_many([tickets[0].id, tickets[0].id, tickets[2].id])
+        stats = self._stats()
+        self.assertEqual((stats.tickets_sold, stats.tickets_paid, stats.tickets_used), (3, 2, 1))
+        self.assertEqual(stats.revenue, 50000)
+
+    def test_dashboard_is_single_query_and_organizer_only(self):
+        ticket = Ticket.objects.create(schedule=self.schedule, buyer=self.buyer, price=25000)
+        ticket.mark_paid()
+        Ticket.objects.create(schedule=self.schedule, buyer=self.buyer, price=25000)
+        call_command('rebuild_sales_stats', stdout=StringIO())
+
+        self.client.force_login(self.buyer)
+        self.assertEqual(self.client.get(reverse('sales_dashboard_flutter')).status_code, 403)
+
+        self.client.force_login(self.organizer)
+        # sesi + user, lalu satu query untuk seluruh dashboard
+        with self.assertNumQueries(3):
+            data = self.client.get(reverse('sales_dashboard_flutter')).json()
+        rows = {row['schedule_id']: row for row in data['schedules']}
+        self.assertEqual(rows[self.schedule.id]['tickets_sold'], 2)
+        self.assertEqual(rows[self.schedule.id]['tickets_unpaid'], 1)
+        self.assertEqual(rows[self.schedule.id]['revenue'], 25000.0)
+        self.assertEqual(rows[self.schedule.id]['capacity'], 10)
+        # Jadwal tanpa organizer (hasil import) tidak ikut dashboard siapa pun
+        self.assertNotIn(self.other.id, rows)
+        self.assertEqual(data['totals']['tickets_paid'], 1)
+
+    def test_dashboard_hides_other_organizers_schedules(self):
+        rival = User.objects.create(username='panitia2', email='panitia2@example.com', role='organizer')
+        theirs = Schedule.objects.create(
+            category='BASKET', team1='FEB', team2='FH', location='GOR',
+            date=timezone.localdate(), time=time(20, 0), organizer=rival,
+        )
+        Ticket.objects.create(schedule=theirs, buyer=self.buyer, price=40000).mark_paid()
+
+        self.client.force_login(self.organizer)
+        data = self.client.get(reverse('sales_dashboard_flutter')).json()
+        self.assertEqual({row['schedule_id'] for row in data['schedules']}, {self.schedule.id})
+        self.assertEqual(data['totals']['revenue'], 0.0)
+
+        self.client.force_login(rival)
+        data = self.client.get(reverse('sales_dashboard_flutter')).json()
+        self.assertEqual({row['schedule_id'] for row in data['schedules']}, {theirs.id})
+
+    def test_rebuild_repairs_drifted_counters(self):
+        for status in ('paid', 'paid', 'unpaid'):
+            Ticket.objects.create(schedule=self.schedule, buyer=self.buyer, price=25000, payment_status=status)
+        Ticket.objects.filter(payment_status='paid').update(is_used=True)
+        ScheduleSalesStats.objects.create(schedule=self.schedule, tickets_sold=99, tickets_paid=99)
+
+        out = StringIO()
+        call_command('rebuild_sales_stats', batch_size=1, stdout=out)
+        stats = self._stats()
+        self.assertEqual((stats.tickets_sold, stats.tickets_paid, stats.tickets_used), (3, 2, 2))
+        self.assertEqual(stats.revenue, 50000)
+        self.assertEqual(ScheduleSalesStats.objects.get(schedule=self.other).tickets_sold, 0)
+        self.assertIn('2 schedule', out.getvalue())
+
+
+class UnpaidTicketSweeperTestCase(TestCase):
+
+    def setUp(self):
+        self.buyer = User.objects.create(username='telat', email='telat@example.com', role='user')
+        self.schedule = Schedule.objects.create(
+            category='VOLI', team1='FISIP', team2='FKM', location='GOR',
+            date=timezone.localdate(), time=time(15, 0),
+        )
+        self.price = EventPrice.objects.create(schedule=self.schedule, price=5000, capacity=5)
+        old = timezone.now() - timedelta(hours=2)
+        self.stale = []
+        for _ in range(3):
+            ticket, error = _create_ticket(self.buyer.id, self.schedule.id, 'ewallet')
+            self.assertIsNone(error)
+            self.stale.append(ticket)
+        self.fresh, _ = _create_ticket(self.buyer.id, self.schedule.id, 'ewallet')
+        self.paid, _ = _create_ticket(self.buyer.id, self.schedule.id, 'ewallet')
+        self.paid.mark_paid()
+        Ticket.objects.exclude(pk=self.fresh.pk).update(purchase_date=old)
+
+    def test_sweeps_in_batches_and_releases_seats(self):
+        out = StringIO()
+        call_command('expire_unpaid_tickets', ttl_minutes=30, batch_size=2, stdout=out)
+
+        remaining = set(Ticket.objects.values_list('id', flat=True))
+        self.assertEqual(remaining, {self.fresh.id, self.paid.id})
+        self.price.refresh_from_db()
+        self.assertEqual(self.price.sold, 2)
+        stats = ScheduleSalesStats.objects.get(schedule=self.schedule)
+        self.assertEqual((stats.tickets_sold, stats.tickets_paid), (2, 1))
+        self.assertIn('batch 1: 2 tiket', out.getvalue())
+        self.assertIn('batch 2: 1 tiket', out.getvalue())
+        self.assertIn('3 tiket unpaid kedaluwarsa dihapus dalam 2 batch', out.getvalue())
+
+    def test_max_batches_and_paying_expired_ticket(self):
+        call_command('expire_unpaid_tickets', batch_size=1, max_batches=1, stdout=StringIO())
+        self.assertEqual(Ticket.objects.filter(payment_status='unpaid').count(), 3)
+
+        call_command('expire_unpaid_tickets', stdout=StringIO())
+        response = self.client.post(reverse('pay_flutter', args=[self.stale[0].id]))
+        self.assertEqual(response.status_code, 404)
+        with self.assertRaises(Ticket.DoesNotExist):
+            self.stale[1].mark_paid()
+
+
+class IdempotencyKeyTestCase(TestCase):
+
+    def setUp(self):
+        self.buyer = User.objects.create(username='retry', email='retry@example.com', role='user')
+        self.schedule = Schedule.objects.create(
+            category='FUTSAL', team1='FIA', team2='FF', location='SOR',
+            date=timezone.localdate(), time=time(20, 0),
+        )
+        EventPrice.objects.create(schedule=self.schedule, price=15000, capacity=10)
+        self.body = json.dumps({'schedule_id': self.schedule.id, 'username': 'retry'})
+
+    def _buy(self, key=None, body=None):
+        headers = {'HTTP_IDEMPOTENCY_KEY': key} if key else {}
+        return self.client.post(
+            reverse('buy_flutter'), data=body or self.body, content_type='application/json', **headers
+        )
+
+    def test_retry_replays_without_touching_tickets(self):
+        first = self._buy('abc-1')
+        with CaptureQueriesContext(connection) as ctx:
+            retry = self._buy('abc-1')
+        self.assertFalse(any('ticketing_ticket' in q['sql'] for q in ctx.captured_queries))
+        self.assertEqual(retry.content, first.content)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(Ticket.objects.count(), 1)
+
+        self._buy()
+        self._buy()
+        self.assertEqual(Ticket.objects.count(), 3)
+
+    def test_key_reused_with_other_body_or_in_flight(self):
+        self._buy('abc-2')
+        other = json.dumps({'schedule_id': self.schedule.id, 'username': 'retry', 'payment_method': 'credit'})
+        self.assertEqual(self._buy('abc-2', body=other).status_code, 422)
+
+        IdempotencyKey.objects.create(key='abc-3', path=reverse('buy_flutter'),
+                                      fingerprint=hashlib.sha256(self.body.encode()).hexdigest())
+        in_flight = self._buy('abc-3')
+        self.assertEqual(in_flight.status_code, 409)
+        self.assertEqual(in_flight.json()['code'], 'request_in_flight')
+        self.assertEqual(Ticket.objects.count(), 1)
+
+    def test_transient_error_is_not_replayed(self):
+        def locked(execute, sql, params, many, context):
+            if sql.startswith('INSERT INTO "ticketing_ticket"'):
+                raise OperationalError('database is locked')
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(locked):
+            with self.assertRaises(OperationalError):
+                self._buy('abc-7')
+        self.assertFalse(IdempotencyKey.objects.filter(key='abc-7').exists())
+
+        retry = self._buy('abc-7')
+        self.assertEqual(retry.json()['status'], 'success')
+        self.assertFalse(retry.has_header('Idempotent-Replayed'))
+        self.assertEqual(Ticket.objects.count(), 1)
+
+    def test_stale_in_flight_key_is_reclaimed(self):
+        fingerprint = hashlib.sha256(self.body.encode()).hexdigest()
+        IdempotencyKey.objects.create(key='abc-5', path=reverse('buy_flutter'), fingerprint=fingerprint,
+                                      created_at=timezone.now() - timedelta(minutes=5))
+        response = self._buy('abc-5')
+        self.assertEqual(response.json()['status'], 'success')
+        self.assertEqual(Ticket.objects.count(), 1)
+        record = IdempotencyKey.objects.get(key='abc-5')
+        self.assertEqual(record.status_code, 200)
+        self.assertEqual(self._buy('abc-5')['Idempotent-Replayed'], 'true')
+
+        # Body lain tetap ditolak walau lease sudah habis
+        IdempotencyKey.objects.create(key='abc-6', path=reverse('buy_flutter'), fingerprint='x' * 64,
+                                      created_at=timezone.now() - timedelta(minutes=5))
+        self.assertEqual(self._buy('abc-6').status_code, 422)
+
+    def test_pay_retry_and_expired_key(self):
+        ticket_id = self._buy().json()['ticket_id']
+        url = reverse('pay_flutter', args=[ticket_id])
+        first = self.client.post(url, HTTP_IDEMPOTENCY_KEY='pay-1')
+        retry = self.client.post(url, HTTP_IDEMPOTENCY_KEY='pay-1')
+        self.assertEqual(first.content, retry.content)
+        self.assertEqual(GateManifestChange.objects.filter(ticket_id=ticket_id).count(), 1)
+
+        IdempotencyKey.objects.update(created_at=timezone.now() - timedelta(days=2))
+        self._buy('abc-4')
+        self.assertEqual(IdempotencyKey.objects.filter(key='abc-4').count(), 1)
+        call_command('expire_unpaid_tickets', stdout=StringIO())
+        self.assertEqual(IdempotencyKey.objects.count(), 2)  # sweeper tiket tidak menyentuh key
+        out = StringIO()
+        call_command('purge_idempotency_keys', stdout=out)
+        self.assertIn('1 Idempotency-Key', out.getvalue())
+        self.assertEqual(list(IdempotencyKey.objects.values_list('key', flat=True)), ['abc-4'])
+
+
+class ConcurrentIdempotencyTestCase(TransactionTestCase):
+
+    THREADS = 10
+
+    def test_same_key_hammered_concurrently_creates_one_ticket(self):
+        User.objects.create(username='spam', email='spam@example.com', role='user')
+        schedule = Schedule.objects.create(
+            category='FUTSAL', team1='FIB', team2='FT', location='SOR',
+            date=timezone.localdate(), time=time(21, 0),
+        )
+        EventPrice.objects.create(schedule=schedule, price=15000)
+        body = json.dumps({'schedule_id': schedule.id, 'username': 'spam'})
+        barrier = threading.Barrier(self.THREADS)
+        results = []
+        lock = threading.Lock()
+
+        def worker():
+            try:
+                barrier.wait()
+                response = Client(raise_request_exception=False).post(
+                    reverse('buy_flutter'), data=body,
+                    content_type='application/json', HTTP_IDEMPOTENCY_KEY='same-key')
+                if response.status_code >= 500:
+                    # "database table is locked" SQLite shared-cache; tidak disimpan sebagai respons
+                    result = ('locked', None)
+                else:
+                    result = (response.status_code, response.json().get('ticket_id'))
+                with lock:
+                    results.append(result)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(self.THREADS)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(len(results), self.THREADS)
+        self.assertLessEqual(Ticket.objects.count(), 1)
+        ticket_ids = {ticket_id for status, ticket_id in results if status == 200}
+        self.assertLessEqual(len(ticket_ids), 1)
+        self.assertTrue(all(status in (200, 409, 'locked') for status, _ in results))
+
+        final = Client().post(reverse('buy_flutter'), data=body,
+                              content_type='application/json', HTTP_IDEMPOTENCY_KEY='same-key')
+        self.assertEqual(final.status_code, 200)
+        self.assertEqual(Ticket.objects.count(), 1)
+        if ticket_ids:
+            self.assertEqual(final.json()['ticket_id'], ticket_ids.pop())
+
+
+class TicketExportTestCase(TestCase):
+
+    def setUp(self):
+        self.organizer = User.objects.create(username='eksportir', email='eksportir@example.com', role='organizer')
+        self.rival = User.objects.create(username='lain', email='lain@example.com', role='organizer')
+        self.buyer = User.objects.create(username='penonton', email='penonton@example.com',
+                                         role='user', fakultas='Fasilkom')
+        self.schedule = Schedule.objects.create(
+            category='FUTSAL', team1='FT', team2='FK', location='SOR',
+            date=timezone.localdate(), time=time(19, 0), organizer=self.organizer,
+        )
+        self.tickets = [
+            Ticket.objects.create(schedule=self.schedule, buyer=self.buyer, price=20000, payment_status=status)
+            for status in ('paid', 'unpaid', 'paid')
+        ]
+        Ticket.scan_many([self.tickets[0].id])
+        self.client.force_login(self.organizer)
+
+    def _export(self, **params):
+        return self.client.get(reverse('export_tickets', args=[self.schedule.id]), params)
+
+    def test_csv_streams_all_tickets(self):
+        response = self._export()
+        self.assertTrue(response.streaming)
+        self.assertIn('tickets-', response['Content-Disposition'])
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'ticket_id,buyer,fakultas,price,payment_status,is_used,used_at,purchase_date')
+        self.assertEqual(len(lines), 4)
+        first = lines[1].split(',')
+        self.assertEqual(first[:6], [str(self.tickets[0].id), 'penonton', 'Fasilkom', '20000.00', 'paid', 'yes'])
+        self.assertNotEqual(first[6], '')
+
+    def test_ndjson_and_access_control(self):
+        response = self._export(format='ndjson')
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual([r['ticket_id'] for r in rows], [t.id for t in self.tickets])
+        self.assertEqual(rows[1]['payment_status'], 'unpaid')
+        self.assertIsNone(rows[1]['used_at'])
+
+        self.assertEqual(self._export(format='xml').status_code, 400)
+        self.client.force_login(self.rival)
+        self.assertEqual(self._export().status_code, 404)
+        self.client.force_login(self.buyer)
+        self.assertEqual(self._export().status_code, 403)
+
+
+class PriceImportTestCase(TestCase):
+
+    def setUp(self):
+        self.organizer = User.objects.create(username='turnamen', email='turnamen@example.com', role='organizer')
+        self.rival = User.objects.create(username='saingan', email='saingan@example.com', role='organizer')
+        self.schedules = [
+            Schedule.objects.create(
+                category='FUTSAL', team1=f'T{i}', team2='FH', location='SOR',
+                date=date(2030, 1, 1) + timedelta(days=i % 3), time=time(8 + i % 5, 0),
+                organizer=self.organizer,
+            )
+            for i in range(6)
+        ]
+        self.foreign = Schedule.objects.create(
+            category='FUTSAL', team1='X', team2='Y', location='SOR',
+            date=date(2030, 1, 1), time=time(9, 0), organizer=self.rival,
+        )
+        EventPrice.objects.create(schedule=self.schedules[0], price=1000, capacity=5)
+
+    def _write_csv(self, text):
+        fd, path = tempfile.mkstemp(suffix='.csv')
+        with os.fdopen(fd, 'w') as f:
+            f.write(text)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_command_creates_updates_and_rejects(self):
+        s = self.schedules
+        path = self._write_csv(
+            'schedule_id,price,capacity\n'
+            f'{s[0].id},25000,100\n'
+            f'{s[1].id},15000,\n'
+            f'{s[2].id},abc,10\n'
+            '999999,5000,\n'
+            f'{s[1].id},20000,\n'
+            f'{s[3].id},5000,-1\n'
+        )
+        out, err = StringIO(), StringIO()
+        call_command('import_event_prices', path, stdout=out, stderr=err)
+
+        self.assertIn('1 harga baru, 1 harga diperbarui, 4 baris ditolak', out.getvalue())
+        self.assertIn('baris 4: harga tidak valid', err.getvalue())
+        self.assertIn('baris 5: schedule tidak ditemukan', err.getvalue())
+        self.assertIn('baris 6: schedule sudah ada di baris 3', err.getvalue())
+        updated = EventPrice.objects.get(schedule=s[0])
+        self.assertEqual((updated.price, updated.capacity), (25000, 100))
+        self.assertIsNone(EventPrice.objects.get(schedule=s[1]).capacity)
+
+        call_command('import_event_prices', path, '--dry-run', stdout=StringIO(), stderr=StringIO())
+        self.assertEqual(EventPrice.objects.count(), 2)
+
+    def test_natural_key_import_runs_in_few_queries(self):
+        rows = ['category,team1,team2,date,time,price,capacity']
+        for s in self.schedules:
+            rows.append(f'futsal,{s.team1},{s.team2},{s.date.isoformat()},,{1000 + s.id},50')
+        rows.append('futsal,T0,FH,2030-01-01,23:00,1000,')
+        with CaptureQueriesContext(connection) as ctx:
+            with open(self._write_csv('\n'.join(rows) + '\n')) as f:
+                result = import_prices(f)
+        self.assertEqual((result.created, result.updated), (5, 1))
+        self.assertEqual(result.rejected, [(8, 'schedule tidak ditemukan')])
+        self.assertLessEqual(len(ctx.captured_queries), 8)
+
+    def test_price_only_csv_keeps_capacity(self):
+        s = self.schedules
+        path = self._write_csv(f'schedule_id,price\n{s[0].id},30000\n{s[1].id},12000\n')
+        with open(path) as f:
+            result = import_prices(f)
+        self.assertEqual((result.created, result.updated), (1, 1))
+        updated = EventPrice.objects.get(schedule=s[0])
+        self.assertEqual((updated.price, updated.capacity), (30000, 5))
+        self.assertIsNone(EventPrice.objects.get(schedule=s[1]).capacity)
+
+    def test_upload_endpoint_limits_to_own_schedules(self):
+        self.client.force_login(self.organizer)
+        upload = SimpleUploadedFile(
+            'harga.csv',
+            f'schedule_id,price\n{self.schedules[4].id},7000\n{self.foreign.id},7000\n'.encode(),
+            content_type='text/csv',
+        )
+        data = self.client.post(reverse('import_prices_ajax'), {'file': upload}).json()
+        self.assertEqual((data['created'], data['updated']), (1, 0))
+        self.assertEqual(data['rejected'], [{'line': 3, 'error': 'schedule tidak ditemukan'}])
+        self.assertFalse(EventPrice.objects.filter(schedule=self.foreign).exists())
+
+        bad = SimpleUploadedFile('harga.csv', b'foo,bar\n1,2\n', content_type='text/csv')
+        self.assertEqual(self.client.post(reverse('import_prices_ajax'), {'file': bad}).status_code, 400)
+
+    def test_upload_endpoint_rejects_malformed_csv_and_conflicts(self):
+        self.client.force_login(self.organizer)
+        # field melebihi csv.field_size_limit() -> csv.Error
+        huge = f'schedule_id,price\n{self.schedules[4].id},"{"9" * 200000}"\n'.encode()
+        response = self.client.post(reverse('import_prices_ajax'),
+                                    {'file': SimpleUploadedFile('harga.csv', huge, content_type='text/csv')})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('CSV tidak valid di baris', response.json()['error'])
+
+        def concurrent_insert(execute, sql, params, many, context):
+            # Import lain sudah membuat harga yang sama di antara lookup dan bulk_create
+            if sql.startswith('INSERT INTO "ticketing_eventprice"'):
+                raise IntegrityError('UNIQUE constraint failed: ticketing_eventprice.schedule_id')
+            return execute(sql, params, many, context)
+
+        upload = SimpleUploadedFile('harga.csv', f'schedule_id,price\n{self.schedules[4].id},7000\n'.encode(),
+                                    content_type='text/csv')
+        with connection.execute_wrapper(concurrent_insert):
+            response = self.client.post(reverse('import_prices_ajax'), {'file': upload})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['success'], False)
+        self.assertFalse(EventPrice.objects.filter(schedule=self.schedules[4]).exists())
+
+
+class FlashSaleLoadTestCommandTestCase(TransactionTestCase):
+
+    def test_small_run_reports_latency_and_no_anomalies(self):
+        out = StringIO()
+        # Satu worker: SQLite in-memory milik test runner mengunci per tabel
+        call_command('loadtest_flash_sale', buyers=12, capacity=8, workers=1, stdout=out)
+        output = out.getvalue()
+        self.assertIn('8 tiket terbayar', output)
+        self.assertRegex(output, r'buy +n=12 +p50=[\d.]+ms p95=[\d.]+ms p99=[\d.]+ms')
+        self.assertIn('409=4', output)
+        self.assertIn('rejected_used=8', output)
+        self.assertIn('Anomali: tidak ada', output)
+        self.assertFalse(Schedule.objects.filter(category='LOADTEST').exists())
+        self.assertFalse(User.objects.filter(username__startswith='loadtest-').exists())
+
+
+class TicketPassesTestCase(TestCase):
+
+    def setUp(self):
+        self.organizer = User.objects.create(username='cetak', email='cetak@example.com', role='organizer')
+        self.buyer = User.objects.create(username='vip', email='vip@example.com', role='user')
+        self.schedule = Schedule.objects.create(
+            category='BASKET', team1='FEB', team2='FIB', location='GOR',
+            date=timezone.localdate() + timedelta(days=3), time=time(10, 0), organizer=self.organizer,
+        )
+        self.tickets = [
+            Ticket.objects.create(schedule=self.schedule, buyer=self.buyer, price=0, payment_status=status)
+            for status in ('paid', 'paid', 'paid', 'unpaid')
+        ]
+
+    def _zip_names(self, content):
+        with zipfile.ZipFile(BytesIO(content)) as archive:
+            self.assertIsNone(archive.testzip())
+            return sorted(archive.namelist()), archive.read(archive.namelist()[0])
+
+    def test_command_renders_paid_passes_in_pool(self):
+        output = os.path.join(tempfile.mkdtemp(), 'passes.zip')
+        self.addCleanup(shutil.rmtree, os.path.dirname(output))
+        out = StringIO()
+        call_command('render_ticket_passes', self.schedule.id, output=output, processes=2, stdout=out)
+        self.assertIn('3 pass ditulis', out.getvalue())
+        self.assertIn('halaman/detik', out.getvalue())
+        with open(output, 'rb') as f:
+            names, png = self._zip_names(f.read())
+        self.assertEqual(names, sorted(f'pass-{t.id}.png' for t in self.tickets[:3]))
+        self.assertTrue(png.startswith(b'\x89PNG'))
+
+    def test_endpoint_streams_zip_for_organizer(self):
+        self.client.force_login(self.buyer)
+        self.assertEqual(self.client.get(reverse('ticket_passes_zip', args=[self.schedule.id])).status_code, 403)
+
+        self.client.force_login(self.organizer)
+        response = self.client.get(reverse('ticket_passes_zip', args=[self.schedule.id]), {'include_unpaid': '1'})
+        self.assertTrue(response.streaming)
+        names, _ = self._zip_names(b''.join(response.streaming_content))
+        self.assertEqual(len(names), 4)
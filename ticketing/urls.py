@@ -14,6 +14,7 @@ urlpatterns = [
     path('json/', views.ticket_list_json, name='ticket_list_json'),
     path('pay/<int:ticket_id>/', views.pay_ticket, name='pay_ticket'),  # <<-- endpoint AJAX yang baru
     path('set-price-ajax/', views.set_event_price_ajax, name='set_event_price_ajax'),
+    path('import-prices/', views.import_prices_ajax, name='import_prices_ajax'),
 
     # Flutter API Endpoints
     path('schedules/json/', views.schedules_json_flutter, name='schedules_json_flutter'),
@@ -21,5 +22,11 @@ urlpatterns = [
     path('buy-flutter/', views.buy_flutter, name='buy_flutter'),
     path('pay-flutter/<int:ticket_id>/', views.pay_flutter, name='pay_flutter'),
     path('scan-flutter/<int:ticket_id>/', views.scan_flutter, name='scan_flutter'),
+    path('scan-batch-flutter/', views.scan_batch_flutter, name='scan_batch_flutter'),
+    path('gate-manifest/<int:schedule_id>/', views.gate_manifest_flutter, name='gate_manifest_flutter'),
+    path('export/<int:schedule_id>/', views.export_tickets, name='export_tickets'),
+    path('passes/<int:schedule_id>/', views.ticket_passes_zip, name='ticket_passes_zip'),
+    path('sales-dashboard/', views.sales_dashboard_flutter, name='sales_dashboard_flutter'),
+    path('verify-qr-flutter/', views.verify_qr_flutter, name='verify_qr_flutter'),
     path('set-price-flutter/', views.set_price_flutter, name='set_price_flutter'),
 ]
\ No newline at end of file
@@ -1,17 +1,31 @@
 from django.shortcuts import render, redirect, get_object_or_404
-from django.utils import timezone
-from .models import Ticket, EventPrice
+from .models import Ticket, EventPrice, ScheduleSalesStats
 from .forms import TicketPurchaseForm, EventPriceForm
 from users.models import User 
 from scheduling.models import Schedule
 from django.contrib import messages
-from django.http import JsonResponse
-import qrcode, base64
-from io import BytesIO
+from django.http import JsonResponse, HttpResponse, HttpResponseNotModified, Http404, StreamingHttpResponse
 from django.template.loader import render_to_string
 from django.views.decorators.http import require_POST
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.csrf import csrf_exempt
+from django.db import transaction
+from django.db.models import Q
+from django.core.cache import cache
+from django.utils.cache import patch_vary_headers
+from django.utils.dateparse import parse_date
+from main.cursors import aware_datetime, decode_cursor, encode_cursor
+from .cache import schedules_version
+import csv
+import io
+import json
+import re
+from django.core.signing import BadSignature, SignatureExpired
+from . import qr, signing, manifest, passes
+from .idempotency import idempotent
+from .price_import import import_prices
+
+QR_CACHE_MAX_AGE = 60 * 60 * 24 * 30
 
 def get_user_from_session(request):
     try:
@@ -25,9 +39,36 @@ def get_price(request, schedule_id):
     try:
         event_price = EventPrice.objects.get(schedule__id=schedule_id)
         price = float(event_price.price)
+        capacity = event_price.capacity
+        remaining = event_price.remaining
     except EventPrice.DoesNotExist:
         price = 0.0
-    return JsonResponse({'price': price})
+        capacity = None
+        remaining = None
+    return JsonResponse({'price': price, 'capacity': capacity, 'remaining': remaining})
+
+def _create_ticket(buyer_id, schedule_id, payment_method):
+    """
+    Jalur beli tiket: 1 SELECT harga, 1 conditional UPDATE kuota, 1 INSERT tiket.
+    Return (ticket, None) kalau berhasil, atau (None, 'no_price' / 'sold_out').
+    """
+    price_row = EventPrice.objects.filter(schedule_id=schedule_id).values_list('id', 'price').first()
+    if price_row is None:
+        return None, 'no_price'
+    event_price_id, price = price_row
+
+    with transaction.atomic():
+        if not EventPrice.reserve_seat(event_price_id):
+            return None, 'sold_out'
+        ticket = Ticket.objects.create(
+            buyer_id=buyer_id,
+            schedule_id=schedule_id,
+            price=price,
+            payment_status='unpaid',
+            payment_method=payment_method,
+        )
+        ScheduleSalesStats.bump(schedule_id, tickets_sold=1)
+    return ticket, None
 
 def ticket_list(request):
     """
@@ -70,24 +111,58 @@ def ticket_list(request):
         'tickets': tickets,
         'payment_status': payment_status,
         'usage_status': usage_status,
+        'page_size': TICKETS_PAGE_SIZE,
     })
 
+@login_required
 def generate_qr(request, ticket_id):
-    ticket = Ticket.objects.get(id=ticket_id)
-    data = f"TIKET-{ticket.id}-{ticket.buyer.username}"
-    
-    qr = qrcode.make(data)
-    buffer = BytesIO()
-    qr.save(buffer, format='PNG')
-    img_str = base64.b64encode(buffer.getvalue()).decode()
-    
-    return JsonResponse({'qr_code': img_str})
+    """
+    GET /ticketing/generate_qr/<ticket_id>/[?format=png]
+    QR dibuat sekali lalu disimpan di disk (lihat ticketing/qr.py);
+    request berikutnya dilayani dari LRU/disk dengan ETag.
+    Hanya pembeli tiket dan organizer jadwalnya yang boleh melihat QR.
+    """
+    row = Ticket.objects.filter(
+        Q(buyer=request.user) | Q(schedule__organizer=request.user), id=ticket_id,
+    ).values_list('qr_code', 'schedule_id', 'schedule__date', 'schedule__time').first()
+    if row is None:
+        raise Http404("Ticket not found")
+    stored, schedule_id, event_date, event_time = row
+
+    # Masa berlaku di payload mengikuti tanggal/jam event, jadi digest dihitung
+    # ulang (HMAC + sha256, tanpa render) dan QR lama diganti kalau jadwal digeser.
+    payload = qr.qr_payload(ticket_id, schedule_id, event_date, event_time)
+    digest = qr.payload_digest(payload)
+    if stored != digest:
+        qr.store_qr(payload)
+        Ticket.objects.filter(id=ticket_id).update(qr_code=digest)
+
+    if request.headers.get('If-None-Match') == f'"{digest}"':
+        response = HttpResponseNotModified()
+    else:
+        try:
+            png, img_str = qr.load_qr(digest)
+        except FileNotFoundError:
+            # File hilang dari disk (mis. media dibersihkan): render ulang dari payload
+            qr.store_qr(payload)
+            png, img_str = qr.load_qr(digest)
+
+        if request.GET.get('format') == 'png':
+            response = HttpResponse(png, content_type='image/png')
+        else:
+            response = JsonResponse({'qr_code': img_str})
+
+    response['ETag'] = f'"{digest}"'
+    response['Cache-Control'] = f'private, max-age={QR_CACHE_MAX_AGE}'
+    return response
 
 def confirm_payment(request, ticket_id):
     ticket = get_object_or_404(Ticket, id=ticket_id)
     if request.method == 'POST':
-        ticket.payment_status = 'paid'
-        ticket.save()
+        try:
+            ticket.mark_paid()
+        except Ticket.DoesNotExist:
+            raise Http404('Tiket sudah kedaluwarsa.')
         return redirect('ticket_detail', ticket_id=ticket.id)
     return render(request, 'ticket_payment.html', {'ticket': ticket})
 
@@ -95,20 +170,46 @@ def ticket_detail(request, ticket_id):
     ticket = get_object_or_404(Ticket, id=ticket_id)
     return render(request, 'ticket_detail.html', {'ticket': ticket})
 
+SCAN_MESSAGES = {
+    'ok': "Tiket berhasil divalidasi! Selamat menonton!",
+    'unpaid': "Tiket belum dibayar, tidak bisa digunakan!",
+    'used': "Tiket sudah pernah digunakan!",
+    'not_found': "Ticket not found",
+    'invalid': "QR tiket tidak valid.",
+    'expired': "QR tiket sudah kedaluwarsa.",
+    'wrong_schedule': "Tiket ini bukan untuk jadwal ini.",
+}
+SCAN_BATCH_LIMIT = 500
+ACCEPTS_GZIP = re.compile(r'\bgzip\b')
+
 def scan_ticket(request, ticket_id):
     ticket = get_object_or_404(Ticket, id=ticket_id)
-    message = ""
-    if ticket.payment_status != 'paid':
-        message = "Tiket belum dibayar, tidak bisa digunakan!"
-    elif ticket.is_used:
-        message = "Tiket sudah pernah digunakan!"
-    else:
-        ticket.is_used = True
-        ticket.used_at = timezone.now()
-        ticket.save()
-        message = "Tiket berhasil divalidasi! Selamat menonton!"
+    result = Ticket.scan_many([ticket.id])[ticket.id]
+    if result == 'ok':
+        ticket.refresh_from_db(fields=['is_used', 'used_at'])
+    message = SCAN_MESSAGES[result]
     return render(request, 'ticket_scan.html', {'ticket': ticket, 'message': message})
 
+def _owned_schedules(user):
+    """
+    Schedule milik organizer `user`. Jadwal tanpa organizer (hasil import
+    populate_schedules) sengaja tidak ikut: data tiket/pembelinya hanya bisa
+    dibuka lewat admin atau management command.
+    """
+    return Schedule.objects.filter(organizer=user)
+
+def _organizer_prices(user):
+    """
+    Harga event upcoming milik organizer, diambil dengan satu query join
+    EventPrice + Schedule.
+    Data harga yang korup dibersihkan lewat `manage.py repair_event_prices`.
+    """
+    return (
+        EventPrice.objects.select_related('schedule')
+        .filter(schedule__status='upcoming', schedule__organizer=user)
+        .order_by('schedule__date', 'schedule__time')
+    )
+
 @login_required(login_url='users:login') # Otomatis cek login & redirect
 def set_event_price(request):
     
@@ -122,59 +223,19 @@ def set_event_price(request):
         if form.is_valid():
             schedule = form.cleaned_data['schedule']
             price = form.cleaned_data['price']
-            EventPrice.objects.update_or_create(
-                schedule=schedule,
-                defaults={'price': price} 
-            )
+            defaults = {'price': price}
+            # Kapasitas hanya diubah kalau field-nya dikirim; kosong = tanpa batas
+            if 'capacity' in request.POST:
+                defaults['capacity'] = form.cleaned_data.get('capacity')
+            EventPrice.objects.update_or_create(schedule=schedule, defaults=defaults)
             messages.success(request, f"Harga untuk {schedule} berhasil diatur/diperbarui!")
             return redirect('set_event_price') 
     else:
         form = EventPriceForm()
 
-    # Handle corrupt decimal data - use raw SQL to bypass ORM conversion
-    from django.db import connection
-    from decimal import InvalidOperation, Decimal
-    
-    valid_prices = []
-    corrupt_ids = []
-    
-    # Simple class to hold price data for template rendering
-    class PriceDisplay:
-        def __init__(self, schedule, price):
-            self.schedule = schedule
-            self.price = price
-    
-    # Get all EventPrice data using raw SQL to bypass ORM decimal conversion
-    with connection.cursor() as cursor:
-        cursor.execute("SELECT id, price, schedule_id FROM ticketing_eventprice ORDER BY id")
-        rows = cursor.fetchall()
-    
-    for row in rows:
-        ep_id, raw_price, schedule_id = row
-        try:
-            # Try to convert price to Decimal
-            if raw_price is not None and str(raw_price).strip() != '':
-                validated_price = Decimal(str(raw_price))
-            else:
-                # Empty or None price is considered corrupt
-                corrupt_ids.append(ep_id)
-                continue
-            # Get the schedule for display
-            try:
-                schedule = Schedule.objects.get(id=schedule_id)
-                valid_prices.append(PriceDisplay(schedule, validated_price))
-            except Schedule.DoesNotExist:
-                corrupt_ids.append(ep_id)  # Orphaned price, mark for deletion
-        except (InvalidOperation, ValueError, TypeError):
-            corrupt_ids.append(ep_id)
-    
-    # Delete corrupt entries
-    if corrupt_ids:
-        EventPrice.objects.filter(id__in=corrupt_ids).delete()
-    
     return render(request, 'set_price_form.html', {
         'form': form,
-        'prices': valid_prices
+        'prices': _organizer_prices(request.user),
     })
 
 @login_required(login_url='users:login') # Otomatis cek login
@@ -189,16 +250,17 @@ def buy_ticket(request):
     if request.method == 'POST':
         form = TicketPurchaseForm(request.POST)
         if form.is_valid():
-            ticket = form.save(commit=False)
-            ticket.buyer = buyer # Langsung set buyer
-            try:
-                event_price_obj = EventPrice.objects.get(schedule=ticket.schedule)
-                ticket.price = event_price_obj.price
-            except EventPrice.DoesNotExist:
+            ticket, error = _create_ticket(
+                buyer.id,
+                form.cleaned_data['schedule'].id,
+                form.cleaned_data['payment_method'],
+            )
+            if error == 'no_price':
                 messages.error(request, "Maaf, harga untuk event ini belum diatur oleh panitia.")
                 return render(request, 'ticket_form.html', {'form': form})
-            ticket.payment_status = 'unpaid'
-            ticket.save()
+            if error == 'sold_out':
+                messages.error(request, "Maaf, tiket untuk event ini sudah habis terjual.")
+                return render(request, 'ticket_form.html', {'form': form})
             return redirect('ticket_payment', ticket_id=ticket.id)
     else:
         form = TicketPurchaseForm()
@@ -206,34 +268,63 @@ def buy_ticket(request):
 
     return render(request, 'ticket_form.html', {'form': form})
 
+TICKETS_PAGE_SIZE = 50
+TICKETS_MAX_PAGE_SIZE = 200
+
+def _filter_tickets(tickets, payment_status, usage_status):
+    if payment_status in ('paid', 'unpaid'):
+        tickets = tickets.filter(payment_status=payment_status)
+    if usage_status == 'used':
+        tickets = tickets.filter(is_used=True)
+    elif usage_status == 'unused':
+        tickets = tickets.filter(is_used=False)
+    return tickets
+
+def _paginate_tickets(tickets, request):
+    """
+    Keyset pagination pada (purchase_date, id) terbaru dulu, memakai index
+    (buyer, purchase_date, id). Return (tickets_halaman_ini, next_cursor).
+    Tanpa limit dan cursor semua tiket dikembalikan seperti sebelum ada
+    pagination, supaya client lama tidak diam-diam terpotong.
+    """
+    tickets = tickets.order_by('-purchase_date', '-id')
+    cursor = request.GET.get('cursor')
+    if not cursor and not request.GET.get('limit'):
+        return list(tickets), None
+
+    limit = int(request.GET.get('limit') or TICKETS_PAGE_SIZE)
+    limit = max(1, min(limit, TICKETS_MAX_PAGE_SIZE))
+    if cursor:
+        purchase_date, ticket_id = decode_cursor(cursor, aware_datetime, int)
+        tickets = tickets.filter(
+            Q(purchase_date__lt=purchase_date) | Q(purchase_date=purchase_date, id__lt=ticket_id)
+        )
+
+    page = list(tickets[:limit + 1])
+    last = page[limit - 1] if len(page) > limit else None
+    next_cursor = encode_cursor(last.purchase_date, last.id) if last else None
+    return page[:limit], next_cursor
+
 def ticket_list_json(request):
     """
     View AJAX GET untuk mengambil daftar tiket dalam bentuk JSON.
-    Mendukung dual filter: payment_status dan usage_status.
+    Mendukung dual filter: payment_status dan usage_status,
+    serta pagination ?cursor=&limit= (lihat next_cursor di response).
     """
     payment_status = request.GET.get('payment_status', 'all')
     usage_status = request.GET.get('usage_status', 'all')
 
     if request.user.is_authenticated and request.user.role == 'user':
-        buyer = request.user
-        tickets = Ticket.objects.filter(buyer=buyer)
-
-        # Filter Payment Status
-        if payment_status == 'paid':
-            tickets = tickets.filter(payment_status='paid')
-        elif payment_status == 'unpaid':
-            tickets = tickets.filter(payment_status='unpaid')
-
-        # Filter Usage Status
-        if usage_status == 'used':
-            tickets = tickets.filter(is_used=True)
-        elif usage_status == 'unused':
-            tickets = tickets.filter(is_used=False)
-
-        tickets = tickets.order_by('-purchase_date')
+        tickets = Ticket.objects.filter(buyer=request.user).select_related('schedule')
+        tickets = _filter_tickets(tickets, payment_status, usage_status)
     else:
         tickets = Ticket.objects.none()
 
+    try:
+        tickets, next_cursor = _paginate_tickets(tickets, request)
+    except ValueError:
+        return JsonResponse({'status': 'error', 'message': 'Parameter cursor/limit tidak valid.'}, status=400)
+
     # Build JSON response
     tickets_data = []
     for t in tickets:
@@ -254,6 +345,7 @@ def ticket_list_json(request):
     return JsonResponse({
         'status': 'success',
         'tickets': tickets_data,
+        'next_cursor': next_cursor,
         'payment_status': payment_status,
         'usage_status': usage_status,
     })
@@ -264,9 +356,10 @@ def pay_ticket(request, ticket_id):
     ticket = get_object_or_404(Ticket, id=ticket_id)
     # pastikan only owner dapat mengubah? (opsional)
     try:
-        ticket.payment_status = 'paid'
-        ticket.save()
+        ticket.mark_paid()
         return JsonResponse({'success': True, 'ticket_id': ticket.id})
+    except Ticket.DoesNotExist:
+        return JsonResponse({'success': False, 'error': 'Tiket sudah kedaluwarsa.'}, status=404)
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)}, status=500)
     
@@ -279,88 +372,164 @@ def set_event_price_ajax(request):
     if request.method == 'POST':
         schedule_id = request.POST.get('schedule_id')
         price = request.POST.get('price')
+        capacity = request.POST.get('capacity') or None
 
         if not schedule_id or not price:
             return JsonResponse({'success': False, 'error': 'Data tidak lengkap.'})
 
+        if capacity is not None:
+            try:
+                capacity = int(capacity)
+                if capacity < 0:
+                    raise ValueError
+            except ValueError:
+                return JsonResponse({'success': False, 'error': 'Kapasitas tidak valid.'})
+
         try:
-            from decimal import Decimal, InvalidOperation
-            from django.db import connection
-            
             schedule = Schedule.objects.get(id=schedule_id)
-            obj, created = EventPrice.objects.update_or_create(
-                schedule=schedule,
-                defaults={'price': price}
-            )
-            
-            # Simple class to hold price data for template rendering
-            class PriceDisplay:
-                def __init__(self, schedule, price):
-                    self.schedule = schedule
-                    self.price = price
-            
-            # Get all prices safely using raw SQL
-            valid_prices = []
-            with connection.cursor() as cursor:
-                cursor.execute("SELECT id, price, schedule_id FROM ticketing_eventprice ORDER BY id")
-                rows = cursor.fetchall()
-            
-            for row in rows:
-                ep_id, raw_price, sched_id = row
-                try:
-                    if raw_price is not None and str(raw_price).strip() != '':
-                        validated_price = Decimal(str(raw_price))
-                        try:
-                            sched = Schedule.objects.get(id=sched_id)
-                            valid_prices.append(PriceDisplay(sched, validated_price))
-                        except Schedule.DoesNotExist:
-                            pass
-                except (InvalidOperation, ValueError, TypeError):
-                    pass
+            defaults = {'price': price}
+            # Kapasitas hanya diubah kalau field-nya dikirim; kosong = tanpa batas
+            if 'capacity' in request.POST:
+                defaults['capacity'] = capacity
+            obj, created = EventPrice.objects.update_or_create(schedule=schedule, defaults=defaults)
             
-            html = render_to_string('partials/event_price_list.html', {'prices': valid_prices})
+            html = render_to_string('partials/event_price_list.html', {'prices': _organizer_prices(request.user)})
             return JsonResponse({'success': True, 'html': html, 'created': created})
         except Schedule.DoesNotExist:
             return JsonResponse({'success': False, 'error': 'Schedule tidak ditemukan.'})
     return JsonResponse({'success': False, 'error': 'Metode tidak valid.'})
 
 
+PRICE_IMPORT_MAX_BYTES = 5 * 1024 * 1024
+
+@csrf_exempt
+@login_required(login_url='users:login')
+@require_POST
+def import_prices_ajax(request):
+    """
+    Upload CSV harga (field 'file') untuk banyak schedule sekaligus.
+    Format kolom: lihat ticketing/price_import.py.
+    """
+    if request.user.role != 'organizer':
+        return JsonResponse({'success': False, 'error': 'Hanya organizer yang dapat mengimpor harga.'}, status=403)
+    upload = request.FILES.get('file')
+    if upload is None:
+        return JsonResponse({'success': False, 'error': 'File CSV belum dipilih.'}, status=400)
+    if upload.size > PRICE_IMPORT_MAX_BYTES:
+        return JsonResponse({'success': False, 'error': 'File CSV terlalu besar (maks 5 MB).'}, status=400)
+
+    try:
+        lines = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+        result = import_prices(lines, organizer=request.user, dry_run=request.POST.get('dry_run') == '1')
+    except UnicodeDecodeError:
+        return JsonResponse({'success': False, 'error': 'File harus berupa CSV UTF-8.'}, status=400)
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+
+    return JsonResponse({
+        'success': True,
+        'created': result.created,
+        'updated': result.updated,
+        'rejected': [{'line': line, 'error': error} for line, error in result.rejected],
+    })
+
+
 # ============================================
 # FLUTTER API ENDPOINTS
 # ============================================
 
+SCHEDULES_JSON_CACHE_TIMEOUT = 60
+SCHEDULES_JSON_MAX_LIMIT = 500
+
+def _parse_date_param(value):
+    """'YYYY-MM-DD' -> date, kosong -> None, format salah -> ValueError."""
+    if not value:
+        return None
+    parsed = parse_date(value)
+    if parsed is None:
+        raise ValueError(f"Invalid date: {value}")
+    return parsed
+
 @csrf_exempt
 def schedules_json_flutter(request):
     """
-    GET /ticketing/schedules/json/
-    Returns all schedules with their prices for Flutter app.
+    GET /ticketing/schedules/json/?status=&date_from=&date_to=&limit=&offset=
+    Returns schedules with their prices for Flutter app.
+    Schedules and prices come from one query; the serialized payload is cached
+    per data version (bumped on every Schedule/EventPrice write).
     """
-    schedules = Schedule.objects.all().order_by('date', 'time')
-    
-    result = []
-    for s in schedules:
-        # Get price if exists
-        try:
-            event_price = EventPrice.objects.get(schedule=s)
-            price = float(event_price.price)
-        except EventPrice.DoesNotExist:
-            price = None
-        
-        result.append({
-            'id': s.id,
-            'category': s.category,
-            'team1': s.team1,
-            'team2': s.team2,
-            'location': s.location,
-            'date': s.date.strftime('%Y-%m-%d'),
-            'time': s.time.strftime('%H:%M:%S'),
-            'status': s.status,
-            'image_url': s.image_url or '',
-            'caption': s.caption or '',
-            'price': price,
-        })
-    
-    return JsonResponse({'schedules': result})
+    status = request.GET.get('status') or None
+    try:
+        date_from = _parse_date_param(request.GET.get('date_from'))
+        date_to = _parse_date_param(request.GET.get('date_to'))
+        limit = int(request.GET['limit']) if request.GET.get('limit') else None
+        offset = int(request.GET.get('offset') or 0)
+    except ValueError:
+        return JsonResponse({'status': 'error', 'message': 'Invalid filter or pagination parameter'}, status=400)
+    if limit is not None:
+        limit = max(1, min(limit, SCHEDULES_JSON_MAX_LIMIT))
+    offset = max(0, offset)
+
+    key = f"ticketing:schedules_json:{schedules_version()}:{status}:{date_from}:{date_to}:{limit}:{offset}"
+    body = cache.get(key)
+    if body is None:
+        schedules = Schedule.objects.order_by('date', 'time', 'id')
+        if status:
+            schedules = schedules.filter(status=status)
+        if date_from:
+            schedules = schedules.filter(date__gte=date_from)
+        if date_to:
+            schedules = schedules.filter(date__lte=date_to)
+
+        rows = schedules.values(
+            'id', 'category', 'team1', 'team2', 'location', 'date', 'time',
+            'status', 'image_url', 'caption', 'price_info__price',
+        )
+        # Ambil satu baris ekstra untuk tahu apakah masih ada halaman berikutnya
+        rows = list(rows[offset:offset + limit + 1] if limit is not None else rows[offset:])
+        has_more = limit is not None and len(rows) > limit
+        if has_more:
+            rows = rows[:limit]
+
+        result = [{
+            'id': s['id'],
+            'category': s['category'],
+            'team1': s['team1'],
+            'team2': s['team2'],
+            'location': s['location'],
+            'date': s['date'].strftime('%Y-%m-%d'),
+            'time': s['time'].strftime('%H:%M:%S'),
+            'status': s['status'],
+            'image_url': s['image_url'] or '',
+            'caption': s['caption'] or '',
+            'price': float(s['price_info__price']) if s['price_info__price'] is not None else None,
+        } for s in rows]
+
+        payload = {'schedules': result}
+        if limit is not None:
+            payload['next_offset'] = offset + limit if has_more else None
+        body = json.dumps(payload).encode()
+        cache.set(key, body, SCHEDULES_JSON_CACHE_TIMEOUT)
+
+    return HttpResponse(body, content_type='application/json')
+
+
+def _serialize_ticket_flutter(ticket, buyer_username):
+    schedule = ticket.schedule
+    return {
+        'id': str(ticket.id),
+        'event_name': f"{schedule.category.upper()}: {schedule.team1} vs {schedule.team2}",
+        'schedule': str(schedule),
+        'price': float(ticket.price),
+        'status': ticket.payment_status,
+        'is_used': ticket.is_used,
+        'buyer_username': buyer_username,
+        'category': schedule.category,
+        'date': schedule.date.strftime('%Y-%m-%d'),
+        'time': schedule.time.strftime('%H:%M:%S'),
+        'location': schedule.location,
+        'schedule_image': schedule.image_url or '',
+    }
 
 
 @csrf_exempt
@@ -368,6 +537,8 @@ def tickets_flutter(request):
     """
     GET /ticketing/tickets-flutter/?username=xxx&ticket_id=xxx
     Returns tickets for a specific user or a specific ticket.
+    User lists support payment_status/usage_status filters and
+    keyset pagination via ?cursor=&limit= (see next_cursor).
     """
     username = request.GET.get('username')
     ticket_id = request.GET.get('ticket_id')
@@ -375,22 +546,9 @@ def tickets_flutter(request):
     if ticket_id:
         # Get specific ticket
         try:
-            ticket = Ticket.objects.get(id=ticket_id)
-            schedule = ticket.schedule
-            tickets_data = [{
-                'id': str(ticket.id),
-                'event_name': f"{schedule.category.upper()}: {schedule.team1} vs {schedule.team2}",
-                'schedule': str(schedule),
-                'price': float(ticket.price),
-                'status': ticket.payment_status,
-                'is_used': ticket.is_used,
-                'buyer_username': ticket.buyer.username if ticket.buyer else '',
-                'category': schedule.category,
-                'date': schedule.date.strftime('%Y-%m-%d'),
-                'time': schedule.time.strftime('%H:%M:%S'),
-                'location': schedule.location,
-                'schedule_image': schedule.image_url or '',
-            }]
+            ticket = Ticket.objects.select_related('schedule', 'buyer').get(id=ticket_id)
+            buyer_username = ticket.buyer.username if ticket.buyer else ''
+            tickets_data = [_serialize_ticket_flutter(ticket, buyer_username)]
             return JsonResponse({'status': 'success', 'tickets': tickets_data})
         except Ticket.DoesNotExist:
             return JsonResponse({'status': 'error', 'message': 'Ticket not found', 'tickets': []})
@@ -398,112 +556,97 @@ def tickets_flutter(request):
     if not username:
         return JsonResponse({'status': 'error', 'message': 'Username required', 'tickets': []})
     
+    tickets = Ticket.objects.filter(buyer__username=username).select_related('schedule')
+    tickets = _filter_tickets(
+        tickets,
+        request.GET.get('payment_status', 'all'),
+        request.GET.get('usage_status', 'all'),
+    )
     try:
-        user = User.objects.get(username=username)
-        tickets = Ticket.objects.filter(buyer=user).order_by('-purchase_date')
-        
-        tickets_data = []
-        for t in tickets:
-            schedule = t.schedule
-            tickets_data.append({
-                'id': str(t.id),
-                'event_name': f"{schedule.category.upper()}: {schedule.team1} vs {schedule.team2}",
-                'schedule': str(schedule),
-                'price': float(t.price),
-                'status': t.payment_status,
-                'is_used': t.is_used,
-                'buyer_username': t.buyer.username if t.buyer else '',
-                'category': schedule.category,
-                'date': schedule.date.strftime('%Y-%m-%d'),
-                'time': schedule.time.strftime('%H:%M:%S'),
-                'location': schedule.location,
-                'schedule_image': schedule.image_url or '',
-            })
-        
-        return JsonResponse({'status': 'success', 'tickets': tickets_data})
-    except User.DoesNotExist:
+        tickets, next_cursor = _paginate_tickets(tickets, request)
+    except ValueError:
+        return JsonResponse({'status': 'error', 'message': 'Invalid cursor or limit', 'tickets': []}, status=400)
+
+    # Halaman kosong bisa berarti user tidak ada; cek hanya di jalur ini
+    if not tickets and not User.objects.filter(username=username).exists():
         return JsonResponse({'status': 'error', 'message': 'User not found', 'tickets': []})
 
+    tickets_data = [_serialize_ticket_flutter(t, username) for t in tickets]
+    return JsonResponse({'status': 'success', 'tickets': tickets_data, 'next_cursor': next_cursor})
+
 
 @csrf_exempt
+@idempotent
 def buy_flutter(request):
     """
     POST /ticketing/buy-flutter/
     Body JSON: {schedule_id, payment_method, username}
-    Creates a new ticket for Flutter app.
+    Creates a new ticket for Flutter app. Honors the Idempotency-Key header.
     """
     if request.method != 'POST':
         return JsonResponse({'status': 'error', 'message': 'POST required'}, status=405)
     
+    # Error tak terduga (mis. "database is locked") sengaja tidak ditangkap:
+    # jadi 500, tidak disimpan oleh @idempotent, dan retry dengan key sama dijalankan ulang.
     try:
-        import json
         data = json.loads(request.body)
-        schedule_id = data.get('schedule_id')
-        payment_method = data.get('payment_method', 'ewallet')
-        username = data.get('username')
-        
-        if not schedule_id or not username:
-            return JsonResponse({'status': 'error', 'message': 'schedule_id and username required'})
-        
-        try:
-            user = User.objects.get(username=username)
-        except User.DoesNotExist:
-            return JsonResponse({'status': 'error', 'message': 'User not found'})
-        
-        try:
-            schedule = Schedule.objects.get(id=schedule_id)
-        except Schedule.DoesNotExist:
-            return JsonResponse({'status': 'error', 'message': 'Schedule not found'})
-        
-        # Get price
-        try:
-            event_price = EventPrice.objects.get(schedule=schedule)
-            price = event_price.price
-        except EventPrice.DoesNotExist:
-            return JsonResponse({'status': 'error', 'message': 'Harga belum diatur untuk event ini'})
-        
-        # Create ticket
-        ticket = Ticket.objects.create(
-            buyer=user,
-            schedule=schedule,
-            price=price,
-            payment_status='unpaid',
-            payment_method=payment_method,
-        )
-        
-        return JsonResponse({
-            'status': 'success',
-            'message': 'Tiket berhasil dibuat',
-            'ticket_id': ticket.id,
-        })
     except json.JSONDecodeError:
         return JsonResponse({'status': 'error', 'message': 'Invalid JSON'})
-    except Exception as e:
-        return JsonResponse({'status': 'error', 'message': str(e)})
+    schedule_id = data.get('schedule_id')
+    payment_method = data.get('payment_method', 'ewallet')
+    username = data.get('username')
+
+    if not schedule_id or not username:
+        return JsonResponse({'status': 'error', 'message': 'schedule_id and username required'})
+    try:
+        schedule_id = int(schedule_id)
+    except (TypeError, ValueError):
+        return JsonResponse({'status': 'error', 'message': 'Invalid schedule_id'}, status=400)
+
+    user_id = User.objects.filter(username=username).values_list('id', flat=True).first()
+    if user_id is None:
+        return JsonResponse({'status': 'error', 'message': 'User not found'})
+
+    ticket, error = _create_ticket(user_id, schedule_id, payment_method)
+    if error == 'no_price':
+        if not Schedule.objects.filter(id=schedule_id).exists():
+            return JsonResponse({'status': 'error', 'message': 'Schedule not found'})
+        return JsonResponse({'status': 'error', 'message': 'Harga belum diatur untuk event ini'})
+    if error == 'sold_out':
+        return JsonResponse({
+            'status': 'error',
+            'code': 'sold_out',
+            'message': 'Tiket untuk event ini sudah habis terjual',
+        }, status=409)
+
+    return JsonResponse({
+        'status': 'success',
+        'message': 'Tiket berhasil dibuat',
+        'ticket_id': ticket.id,
+    })
 
 
 @csrf_exempt
+@idempotent
 def pay_flutter(request, ticket_id):
     """
     POST /ticketing/pay-flutter/<ticket_id>/
-    Confirms payment for Flutter app.
+    Confirms payment for Flutter app. Honors the Idempotency-Key header.
     """
     if request.method != 'POST':
         return JsonResponse({'status': 'error', 'message': 'POST required'}, status=405)
     
+    # Seperti buy_flutter: error tak terduga dibiarkan jadi 500 supaya bisa di-retry
     try:
         ticket = Ticket.objects.get(id=ticket_id)
-        ticket.payment_status = 'paid'
-        ticket.save()
-        return JsonResponse({
-            'status': 'success',
-            'message': 'Pembayaran berhasil dikonfirmasi',
-            'ticket_id': ticket.id,
-        })
+        ticket.mark_paid()
     except Ticket.DoesNotExist:
         return JsonResponse({'status': 'error', 'message': 'Ticket not found'}, status=404)
-    except Exception as e:
-        return JsonResponse({'status': 'error', 'message': str(e)})
+    return JsonResponse({
+        'status': 'success',
+        'message': 'Pembayaran berhasil dikonfirmasi',
+        'ticket_id': ticket.id,
+    })
 
 
 @csrf_exempt
@@ -512,31 +655,304 @@ def scan_flutter(request, ticket_id):
     GET /ticketing/scan-flutter/<ticket_id>/
     Validates/scans a ticket for Flutter app.
     """
+    result = Ticket.scan_many([ticket_id])[ticket_id]
+    if result == 'not_found':
+        return JsonResponse({'status': 'error', 'message': SCAN_MESSAGES[result]}, status=404)
+    return JsonResponse({
+        'status': 'success' if result == 'ok' else 'error',
+        'message': SCAN_MESSAGES[result],
+    })
+
+
+@csrf_exempt
+def scan_batch_flutter(request):
+    """
+    POST /ticketing/scan-batch-flutter/
+    Body JSON: {ticket_ids: [...], payloads: [...], schedule_id}
+    Scans a queue of tickets from a gate device in one request (owning organizer only).
+    Signed payloads are verified locally first; invalid ones never hit the DB.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'status': 'error', 'message': 'POST required'}, status=405)
+    if not request.user.is_authenticated or getattr(request.user, 'role', None) != 'organizer':
+        return JsonResponse({'status': 'error', 'message': 'Hanya organizer yang dapat memindai tiket'}, status=403)
+
     try:
-        ticket = Ticket.objects.get(id=ticket_id)
-        
-        if ticket.payment_status != 'paid':
-            return JsonResponse({
-                'status': 'error',
-                'message': 'Tiket belum dibayar, tidak bisa digunakan!',
-            })
-        
-        if ticket.is_used:
-            return JsonResponse({
-                'status': 'error',
-                'message': 'Tiket sudah pernah digunakan!',
-            })
-        
-        ticket.is_used = True
-        ticket.used_at = timezone.now()
-        ticket.save()
-        
-        return JsonResponse({
-            'status': 'success',
-            'message': 'Tiket berhasil divalidasi! Selamat menonton!',
+        data = json.loads(request.body)
+    except json.JSONDecodeError:
+        return JsonResponse({'status': 'error', 'message': 'Invalid JSON'}, status=400)
+
+    ticket_ids = data.get('ticket_ids') or []
+    payloads = data.get('payloads') or []
+    schedule_id = data.get('schedule_id')
+    if not isinstance(ticket_ids, list) or not isinstance(payloads, list):
+        return JsonResponse({'status': 'error', 'message': 'ticket_ids and payloads must be lists'}, status=400)
+    if len(ticket_ids) + len(payloads) > SCAN_BATCH_LIMIT:
+        return JsonResponse({'status': 'error', 'message': f'Maksimal {SCAN_BATCH_LIMIT} tiket per batch'}, status=400)
+    try:
+        schedule_id = int(schedule_id)
+    except (TypeError, ValueError):
+        return JsonResponse({'status': 'error', 'message': 'schedule_id required'}, status=400)
+    if not _owned_schedules(request.user).filter(id=schedule_id).exists():
+        return JsonResponse({'status': 'error', 'message': 'Schedule not found'}, status=404)
+
+    # (kunci hasil, ticket_id) sesuai urutan input
+    entries = []
+    for raw_id in ticket_ids:
+        try:
+            entries.append((raw_id, int(raw_id), None))
+        except (TypeError, ValueError):
+            entries.append((raw_id, None, 'invalid'))
+    for payload in payloads:
+        try:
+            signed = signing.verify_ticket(str(payload), schedule_id=schedule_id)
+            entries.append((payload, signed.ticket_id, None))
+        except SignatureExpired:
+            entries.append((payload, None, 'expired'))
+        except (BadSignature, ValueError):
+            entries.append((payload, None, 'invalid'))
+
+    # ticket_ids polos juga dibatasi ke schedule_id, sama seperti payload
+    outcomes = Ticket.scan_many(
+        [ticket_id for _, ticket_id, error in entries if error is None], schedule_id=schedule_id,
+    )
+
+    results = []
+    seen = set()
+    for key, ticket_id, error in entries:
+        if error is None:
+            # Tiket yang muncul dua kali dalam satu batch hanya lolos sekali;
+            # duplikat tiket yang ditolak tetap melaporkan alasan aslinya
+            error = outcomes[ticket_id]
+            if ticket_id in seen and error == 'ok':
+                error = 'used'
+            seen.add(ticket_id)
+        results.append({
+            'key': key,
+            'ticket_id': ticket_id,
+            'status': 'success' if error == 'ok' else 'error',
+            'reason': error,
+            'message': SCAN_MESSAGES[error],
         })
-    except Ticket.DoesNotExist:
-        return JsonResponse({'status': 'error', 'message': 'Ticket not found'}, status=404)
+
+    return JsonResponse({
+        'status': 'success',
+        'admitted': sum(1 for r in results if r['reason'] == 'ok'),
+        'results': results,
+    })
+
+
+def gate_manifest_flutter(request, schedule_id):
+    """
+    GET /ticketing/gate-manifest/<schedule_id>/[?since=N]
+    Manifest of paid ticket ids for offline gate devices (owning organizer only).
+    Gzip'd when the client sends Accept-Encoding: gzip, plain JSON otherwise.
+    With `since`, returns only tickets paid after manifest version N.
+    """
+    if not request.user.is_authenticated or getattr(request.user, 'role', None) != 'organizer':
+        return JsonResponse({'status': 'error', 'message': 'Hanya organizer yang dapat mengunduh manifest'}, status=403)
+    if not _owned_schedules(request.user).filter(id=schedule_id).exists():
+        return JsonResponse({'status': 'error', 'message': 'Schedule not found'}, status=404)
+
+    compress = bool(ACCEPTS_GZIP.search(request.headers.get('Accept-Encoding', '')))
+    version = manifest.manifest_version(schedule_id)
+    since = request.GET.get('since')
+    etag = f'"manifest-{schedule_id}-{version}-{since or "full"}{"-gz" if compress else ""}"'
+    if request.headers.get('If-None-Match') == etag:
+        response = HttpResponseNotModified()
+        patch_vary_headers(response, ('Accept-Encoding',))
+        return response
+
+    if since is not None:
+        try:
+            since = int(since)
+        except ValueError:
+            return JsonResponse({'status': 'error', 'message': 'since must be an integer'}, status=400)
+        body = manifest.iter_manifest_diff(schedule_id, since, version, compress=compress)
+    else:
+        body = manifest.iter_manifest(schedule_id, version, compress=compress)
+
+    response = StreamingHttpResponse(body, content_type='application/json')
+    if compress:
+        response['Content-Encoding'] = 'gzip'
+    patch_vary_headers(response, ('Accept-Encoding',))
+    response['ETag'] = etag
+    response['X-Manifest-Version'] = str(version)
+    return response
+
+
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_COLUMNS = ['ticket_id', 'buyer', 'fakultas', 'price', 'payment_status', 'is_used', 'used_at', 'purchase_date']
+
+
+class _Echo:
+    """Pseudo-buffer untuk csv.writer: writerow langsung mengembalikan barisnya."""
+    def write(self, value):
+        return value
+
+
+def _export_rows(schedule_id):
+    rows = (
+        Ticket.objects.filter(schedule_id=schedule_id)
+        .order_by('id')
+        .values_list(
+            'id', 'buyer__username', 'buyer__fakultas', 'price',
+            'payment_status', 'is_used', 'used_at', 'purchase_date',
+        )
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+    for ticket_id, buyer, fakultas, price, payment_status, is_used, used_at, purchase_date in rows:
+        yield [
+            ticket_id, buyer or '', fakultas or '', str(price), payment_status, is_used,
+            used_at.isoformat() if used_at else None,
+            purchase_date.isoformat() if purchase_date else None,
+        ]
+
+
+def _batched(lines, size=EXPORT_CHUNK_SIZE):
+    """Gabungkan baris teks per `size` supaya tiap chunk respons tidak terlalu kecil."""
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) >= size:
+            yield ''.join(batch)
+            batch = []
+    if batch:
+        yield ''.join(batch)
+
+
+def _csv_lines(schedule_id):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_COLUMNS)
+    for row in _export_rows(schedule_id):
+        row[5] = 'yes' if row[5] else 'no'
+        yield writer.writerow(row)
+
+
+def _ndjson_lines(schedule_id):
+    for row in _export_rows(schedule_id):
+        yield json.dumps(dict(zip(EXPORT_COLUMNS, row))) + '\n'
+
+
+def export_tickets(request, schedule_id):
+    """
+    GET /ticketing/export/<schedule_id>/[?format=csv|ndjson]
+    Streams every ticket of a schedule (organizer only) in constant memory.
+    """
+    if not request.user.is_authenticated or getattr(request.user, 'role', None) != 'organizer':
+        return JsonResponse({'status': 'error', 'message': 'Hanya organizer yang dapat mengekspor tiket'}, status=403)
+    if not _owned_schedules(request.user).filter(id=schedule_id).exists():
+        return JsonResponse({'status': 'error', 'message': 'Schedule not found'}, status=404)
+
+    export_format = request.GET.get('format', 'csv')
+    if export_format == 'csv':
+        lines, content_type, extension = _csv_lines(schedule_id), 'text/csv; charset=utf-8', 'csv'
+    elif export_format == 'ndjson':
+        lines, content_type, extension = _ndjson_lines(schedule_id), 'application/x-ndjson', 'ndjson'
+    else:
+        return JsonResponse({'status': 'error', 'message': 'format must be csv or ndjson'}, status=400)
+
+    response = StreamingHttpResponse(_batched(lines), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="tickets-{schedule_id}.{extension}"'
+    return response
+
+
+def ticket_passes_zip(request, schedule_id):
+    """
+    GET /ticketing/passes/<schedule_id>/[?include_unpaid=1]
+    Streams a zip of printable QR passes for a schedule (organizer only),
+    rendered inline in this request; big events go through `render_ticket_passes`.
+    """
+    if not request.user.is_authenticated or getattr(request.user, 'role', None) != 'organizer':
+        return JsonResponse({'status': 'error', 'message': 'Hanya organizer yang dapat mencetak pass'}, status=403)
+    schedule = (
+        _owned_schedules(request.user).filter(id=schedule_id)
+        .first()
+    )
+    if schedule is None:
+        return JsonResponse({'status': 'error', 'message': 'Schedule not found'}, status=404)
+
+    # Tanpa process pool di proses web: render satu per satu sambil di-stream
+    jobs = passes.iter_pass_jobs(schedule, paid_only=request.GET.get('include_unpaid') != '1')
+    response = StreamingHttpResponse(passes.iter_zip(passes.render_passes(jobs, processes=1)), content_type='application/zip')
+    response['Content-Disposition'] = f'attachment; filename="passes-{schedule_id}.zip"'
+    return response
+
+
+def sales_dashboard_flutter(request):
+    """
+    GET /ticketing/sales-dashboard/
+    Per-schedule sales counters for the organizer's events, read in one query.
+    """
+    if not request.user.is_authenticated or getattr(request.user, 'role', None) != 'organizer':
+        return JsonResponse({'status': 'error', 'message': 'Hanya organizer yang dapat melihat dashboard'}, status=403)
+
+    # LEFT JOIN ke ScheduleSalesStats & EventPrice; schedule tanpa penjualan tetap muncul dengan 0
+    rows = (
+        _owned_schedules(request.user)
+        .order_by('-date', '-time')
+        .values(
+            'id', 'category', 'team1', 'team2', 'date', 'time', 'status',
+            'price_info__capacity',
+            'sales_stats__tickets_sold', 'sales_stats__tickets_paid',
+            'sales_stats__tickets_used', 'sales_stats__revenue',
+        )
+    )
+
+    data = []
+    totals = {'tickets_sold': 0, 'tickets_paid': 0, 'tickets_used': 0, 'revenue': 0}
+    for row in rows:
+        sold = row['sales_stats__tickets_sold'] or 0
+        paid = row['sales_stats__tickets_paid'] or 0
+        used = row['sales_stats__tickets_used'] or 0
+        revenue = row['sales_stats__revenue'] or 0
+        totals['tickets_sold'] += sold
+        totals['tickets_paid'] += paid
+        totals['tickets_used'] += used
+        totals['revenue'] += revenue
+        data.append({
+            'schedule_id': row['id'],
+            'category': row['category'],
+            'team1': row['team1'],
+            'team2': row['team2'],
+            'date': row['date'].isoformat() if row['date'] else None,
+            'time': row['time'].strftime('%H:%M') if row['time'] else None,
+            'status': row['status'],
+            'capacity': row['price_info__capacity'],
+            'tickets_sold': sold,
+            'tickets_paid': paid,
+            'tickets_unpaid': sold - paid,
+            'tickets_used': used,
+            'revenue': float(revenue),
+        })
+
+    totals['revenue'] = float(totals['revenue'])
+    return JsonResponse({'status': 'success', 'totals': totals, 'schedules': data})
+
+
+@csrf_exempt
+def verify_qr_flutter(request):
+    """
+    GET/POST /ticketing/verify-qr-flutter/?payload=xxx&schedule_id=xxx
+    Verifies a signed QR payload without touching the database.
+    """
+    params = request.POST if request.method == 'POST' else request.GET
+    payload = params.get('payload', '')
+    schedule_id = params.get('schedule_id') or None
+
+    try:
+        signed = signing.verify_ticket(payload, schedule_id=schedule_id)
+    except SignatureExpired as e:
+        return JsonResponse({'status': 'error', 'reason': 'expired', 'message': str(e)})
+    except (BadSignature, ValueError) as e:
+        return JsonResponse({'status': 'error', 'reason': 'invalid', 'message': str(e)})
+
+    return JsonResponse({
+        'status': 'success',
+        'ticket_id': signed.ticket_id,
+        'schedule_id': signed.schedule_id,
+        'expires': signed.expires,
+    })
 
 
 @csrf_exempt
@@ -554,10 +970,19 @@ def set_price_flutter(request):
         data = json.loads(request.body)
         schedule_id = data.get('schedule_id')
         price = data.get('price')
+        capacity = data.get('capacity')
         username = data.get('username')
         
         if not schedule_id or price is None:
             return JsonResponse({'status': 'error', 'message': 'schedule_id and price required'})
+
+        if capacity is not None:
+            try:
+                capacity = int(capacity)
+                if capacity < 0:
+                    raise ValueError
+            except (TypeError, ValueError):
+                return JsonResponse({'status': 'error', 'message': 'capacity must be a non-negative integer'})
         
         # Check if user is organizer
         if username:
@@ -574,10 +999,11 @@ def set_price_flutter(request):
             return JsonResponse({'status': 'error', 'message': 'Schedule not found'})
         
         # Update or create price
-        EventPrice.objects.update_or_create(
-            schedule=schedule,
-            defaults={'price': price}
-        )
+        defaults = {'price': price}
+        # Client lama hanya mengirim harga: jangan hapus kapasitas yang sudah ada
+        if 'capacity' in data:
+            defaults['capacity'] = capacity
+        EventPrice.objects.update_or_create(schedule=schedule, defaults=defaults)
         
         return JsonResponse({
             'status': 'success',
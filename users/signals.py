@@ -0,0 +1,14 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from main.responsive_images import load_manifest, media_root, schedule_media_variants
+
+from .models import User
+
+
+@receiver(post_save, sender=User)
+def build_profile_picture_variants(sender, instance, raw=False, **kwargs):
+    # Hanya foto yang belum punya varian; save biasa (mis. update last_login) cukup cek manifest
+    name = instance.profile_picture.name
+    if not raw and name and name not in load_manifest(media_root()):
+        schedule_media_variants(name)